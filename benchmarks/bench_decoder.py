@@ -0,0 +1,56 @@
+"""
+对比 WebSocketSession.run 原先的解码方式（json.loads + 每帧构建 TypeAdapter(Event)）与 EventDecoder，
+以及只读取信封字段时的延迟解码（EventDecoder(lazy=True)）
+
+用法: python benchmarks/bench_decoder.py [次数]
+"""
+import json
+import sys
+import timeit
+from pydantic import TypeAdapter
+
+from onebot11protocol.communication.decoder import EventDecoder
+from onebot11protocol.event import Event
+
+
+def _group_message(text: str):
+    return json.dumps({
+        "time": 1700000000, "self_id": 10000, "post_type": "message", "message_type": "group", "sub_type": "normal",
+        "message_id": 123456, "group_id": 114514, "user_id": 1919810, "anonymous": None,
+        "message": [{"type": "reply", "data": {"id": "123"}}, {"type": "at", "data": {"qq": "10000"}},
+                    {"type": "text", "data": {"text": text}}, {"type": "face", "data": {"id": "14"}}],
+        "raw_message": f"[CQ:reply,id=123][CQ:at,qq=10000]{text}[CQ:face,id=14]", "font": 0,
+        "sender": {"user_id": 1919810, "nickname": "测试", "card": "", "sex": "unknown", "age": 0, "area": "", "level": "1", "role": "member", "title": ""},
+    }, ensure_ascii=False)
+
+
+FRAMES = {
+    "group_message": _group_message("hello world " * 4),
+    "heartbeat": json.dumps({"time": 1700000000, "self_id": 10000, "post_type": "meta_event", "meta_event_type": "heartbeat",
+                             "status": {"online": True, "good": True}, "interval": 5000}),
+    "poke": json.dumps({"time": 1700000000, "self_id": 10000, "post_type": "notice", "notice_type": "notify",
+                        "sub_type": "poke", "group_id": 114514, "user_id": 1919810, "target_id": 10000}),
+}
+
+
+def legacy_decode(data: str):
+    return TypeAdapter(Event).validate_python(json.loads(data))
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    decoder = EventDecoder()
+    lazyDecoder = EventDecoder(lazy=True)
+    print(f"{'frame':<16}{'legacy (us)':>14}{'decoder (us)':>14}{'decoder bytes (us)':>20}{'lazy (us)':>12}{'speedup':>10}")
+    for name, frame in FRAMES.items():
+        assert legacy_decode(frame) == decoder.decode(frame)
+        frameBytes = frame.encode()
+        legacy = min(timeit.repeat(lambda: legacy_decode(frame), number=number, repeat=3)) / number
+        fast = min(timeit.repeat(lambda: decoder.decode(frame), number=number, repeat=3)) / number
+        fastBytes = min(timeit.repeat(lambda: decoder.decode(frameBytes), number=number, repeat=3)) / number
+        lazy = min(timeit.repeat(lambda: lazyDecoder.decode(frameBytes), number=number, repeat=3)) / number
+        print(f"{name:<16}{legacy * 1e6:>14.2f}{fast * 1e6:>14.2f}{fastBytes * 1e6:>20.2f}{lazy * 1e6:>12.2f}{legacy / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
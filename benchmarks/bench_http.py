@@ -0,0 +1,60 @@
+"""
+HTTPSession 对本地 HTTP API 替身的吞吐量
+
+用法: python benchmarks/bench_http.py [请求数] [并发数]
+"""
+import asyncio
+import sys
+import time
+
+from onebot11protocol.api.public import GetLoginInfoReq, SendGroupMsgReq
+from onebot11protocol.communication.http import HTTPConnectionPool, HTTPEndpoint, HTTPSession
+from onebot11protocol.message.segment import TextData, build_message
+from onebot11protocol.testing.http_api import StandInHTTPAPIServer
+
+
+CONFIGS = [
+    # (名称, 每主机连接数, pipeline 深度)
+    ("1 connection", 1, 1),
+    ("1 connection, pipelined", 1, 16),
+    ("8 connections", 8, 1),
+    ("8 connections, pipelined", 8, 16),
+]
+
+
+async def _run(server: StandInHTTPAPIServer, maxConnections: int, pipelineDepth: int, request, count: int, concurrency: int):
+    loop = asyncio.get_running_loop()
+    pool = HTTPConnectionPool(max_connections=maxConnections)
+    session = HTTPSession(loop, HTTPEndpoint(server.url, pipeline_depth=pipelineDepth), pool=pool)
+    remaining = count
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await session.send(request)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await session.disconnect()
+    await pool.close()
+    return count / elapsed
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    requests = {
+        "get_login_info": GetLoginInfoReq(),
+        "send_group_msg": SendGroupMsgReq(group_id=114514, message=build_message(TextData(text="hello " * 8))),
+    }
+    async with StandInHTTPAPIServer() as server:
+        print(f"{'config':<28}" + "".join(f"{name + ' (req/s)':>26}" for name in requests))
+        for name, maxConnections, pipelineDepth in CONFIGS:
+            rates = [await _run(server, maxConnections, pipelineDepth, request, count, concurrency) for request in requests.values()]
+            print(f"{name:<28}" + "".join(f"{rate:>26.0f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
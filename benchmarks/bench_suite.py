@@ -0,0 +1,246 @@
+"""
+模型、编解码与 session 往返的微基准
+
+每项报告吞吐量（ops/s）、单次耗时的 p50/p90/p99（us）、单次操作的内存峰值（tracemalloc）与净增的内存块数，
+可以保存为 JSON 基线并与之后的运行比较
+
+用法: python benchmarks/bench_suite.py [--filter 子串] [--quick] [--save 基线.json] [--compare 基线.json] [--replay 录制目录]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable
+
+from pydantic import TypeAdapter
+import websockets
+
+from onebot11protocol.api import public
+from onebot11protocol.api.hidden import HandleQuickOperationReq
+from onebot11protocol.communication.base import EventHandler
+from onebot11protocol.communication.codec import dump_model, encode_quick_operation_params, get_default_codec
+from onebot11protocol.communication.recorder import FrameReplayer
+from onebot11protocol.communication.ws import WebSocketCommunication, WebSocketEndpoint
+from onebot11protocol.event import Event
+from onebot11protocol.event.message import GroupMessageEvent, GroupMessageEventQuickOperation
+from onebot11protocol.message import Message
+from onebot11protocol.message.cqcode import _parse as parse_uncached, dumps as dump_cq, parse as parse_cq
+from onebot11protocol.message.segment import (AtData, FaceData, NodeCustomData, ReceivedImageData, TextData,
+                                              build_message)
+from onebot11protocol.testing.samples import sample_events, sample_model
+
+
+type Case = tuple[str, Callable[[], Any], int]
+type AsyncCase = tuple[str, Callable[[], Awaitable[Any]], int]
+
+API_REQUESTS = [public.SendGroupMsgReq, public.SendPrivateMsgReq, public.DeleteMsgReq, public.SetGroupBanReq,
+                public.GetGroupMemberInfoReq, public.GetGroupMemberListReq, public.GetLoginInfoReq, public.SetGroupAddRequestReq]
+
+
+def _message(size: int) -> Message:
+    segments = [TextData(text="hello world"), FaceData(id="14"), AtData(qq="10000"),
+                ReceivedImageData(file="a.jpg", url="https://example.com/a.jpg")]
+    return build_message(*(segments[i % len(segments)] for i in range(size)))
+
+
+def _forward(width: int, depth: int) -> Message:
+    content = _message(width)
+    for _ in range(depth):
+        content = build_message(*(NodeCustomData(user_id="10000", nickname="bot", content=content) for _ in range(width)))
+    return content
+
+
+def _cases(quick: bool) -> list[Case]:
+    scale = 10 if quick else 1
+    cases: list[Case] = []
+
+    eventAdapter = TypeAdapter(Event)
+    for eventType, sample in sample_events().items():
+        data = json.dumps(sample).encode()
+        cases.append((f"event/{eventType.__name__}", lambda data=data: eventAdapter.validate_json(data), 2000 // scale))
+
+    messageAdapter = TypeAdapter(Message)
+    messages = {f"{size} segments": _message(size) for size in (1, 10, 100)}
+    messages["forward 5x2"] = _forward(5, 2)
+    for name, message in messages.items():
+        encoded = messageAdapter.dump_json(message)
+        number = max(20, 2000 // max(1, len(encoded) // 200)) // scale
+        cases.append((f"message/encode {name}", lambda message=message: messageAdapter.dump_json(message), number))
+        cases.append((f"message/decode {name}", lambda encoded=encoded: messageAdapter.validate_json(encoded), number))
+        if not name.startswith("forward"):
+            cq = dump_cq(message)
+            cases.append((f"message/cq dump {name}", lambda message=message: dump_cq(message), number))
+            cases.append((f"message/cq parse {name}", lambda cq=cq: parse_uncached(cq), number))
+            cases.append((f"message/cq parse cached {name}", lambda cq=cq: parse_cq(cq), number))
+
+    for requestType in API_REQUESTS:
+        request = requestType.model_validate(sample_model(requestType))
+        cases.append((f"api/dump {requestType.__name__}", lambda request=request: dump_model(request), 5000 // scale))
+
+    event = GroupMessageEvent.model_validate(sample_events()[GroupMessageEvent])
+    event = event.model_copy(update={"message": _message(20)})
+    operation = GroupMessageEventQuickOperation(reply=_message(1), at_sender=True)
+    codec = get_default_codec()
+    cases.append(("quick operation/HandleQuickOperationReq",
+                  lambda: HandleQuickOperationReq(context=event, operation=operation), 2000 // scale))
+    cases.append(("quick operation/HandleQuickOperationReq dump",
+                  lambda: dump_model(HandleQuickOperationReq(context=event, operation=operation)), 2000 // scale))
+    cases.append(("quick operation/minimal context", lambda: encode_quick_operation_params(codec, event, operation), 2000 // scale))
+    return cases
+
+
+def _percentile(samples: list[float], fraction: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def _summarize(durations: list[float], peak: int, blocks: float) -> dict[str, float]:
+    durations.sort()
+    total = sum(durations)
+    return {
+        "ops_per_sec": len(durations) / total if total else float("inf"),
+        "p50_us": _percentile(durations, 0.5) * 1e6,
+        "p90_us": _percentile(durations, 0.9) * 1e6,
+        "p99_us": _percentile(durations, 0.99) * 1e6,
+        "peak_bytes": peak,
+        "blocks_per_op": blocks,
+    }
+
+
+def measure(function: Callable[[], Any], number: int) -> dict[str, float]:
+    for _ in range(min(number, 50)):
+        function()
+    gc.collect()
+    durations = []
+    blocksBefore = sys.getallocatedblocks()
+    for _ in range(number):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    blocks = (sys.getallocatedblocks() - blocksBefore - 1) / number
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    function()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return _summarize(durations, peak, blocks)
+
+
+async def measure_async(function: Callable[[], Awaitable[Any]], number: int) -> dict[str, float]:
+    for _ in range(min(number, 50)):
+        await function()
+    gc.collect()
+    durations = []
+    blocksBefore = sys.getallocatedblocks()
+    for _ in range(number):
+        start = time.perf_counter()
+        await function()
+        durations.append(time.perf_counter() - start)
+    blocks = (sys.getallocatedblocks() - blocksBefore - 1) / number
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    await function()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return _summarize(durations, peak, blocks)
+
+
+async def _serve_api(websocket):
+    async for data in websocket:
+        request = json.loads(data)
+        if request["action"] == "get_login_info":
+            responseData = {"user_id": 10000, "nickname": "bot"}
+        else:
+            responseData = {"message_id": 1}
+        await websocket.send(json.dumps({"status": "ok", "retcode": 0, "data": responseData, "echo": request["echo"]}))
+
+
+async def _session_cases(quick: bool, selected: Callable[[str], bool]) -> dict[str, dict[str, float]]:
+    """WebSocketSession.send 对进程内替身的完整往返"""
+    results: dict[str, dict[str, float]] = {}
+    number = 200 if quick else 2000
+    async with websockets.serve(_serve_api, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        session = WebSocketCommunication().create(WebSocketEndpoint(f"ws://127.0.0.1:{port}"), None)
+        async with session:
+            runner = asyncio.create_task(session.run())
+            await asyncio.sleep(0)
+            cases: list[AsyncCase] = [
+                ("session/send get_login_info", lambda: session.send(public.GetLoginInfoReq()), number),
+                ("session/send send_group_msg 10 segments",
+                 lambda message=_message(10): session.send(public.SendGroupMsgReq(group_id=1, message=message)), number),
+            ]
+            for name, function, count in cases:
+                if selected(name):
+                    results[name] = await measure_async(function, count)
+        await asyncio.gather(runner, return_exceptions=True)
+    return results
+
+
+class _NullHandler(EventHandler):
+    async def on_event(self, session, event):
+        pass
+
+
+async def _replay_case(directory: str) -> dict[str, float]:
+    """以最快速度回放 FrameRecorder 录制的真实流量，经过解码与 dispatcher"""
+    stats = await FrameReplayer(directory).replay(_NullHandler(), speed=None)
+    print(f"replayed {stats.frames} frames, {stats.events} events, {stats.invalid} invalid")
+    return {"ops_per_sec": stats.events / stats.duration if stats.duration else float("inf"),
+            "p50_us": 0.0, "p90_us": 0.0, "p99_us": 0.0, "peak_bytes": 0, "blocks_per_op": 0.0}
+
+
+def _print(name: str, result: dict[str, float], baseline: dict[str, dict[str, float]] | None):
+    line = (f"{name:<56}{result['ops_per_sec']:>12.0f}{result['p50_us']:>10.1f}{result['p90_us']:>10.1f}{result['p99_us']:>10.1f}"
+            f"{result['peak_bytes']:>10}{result['blocks_per_op']:>8.1f}")
+    if baseline is not None and name in baseline:
+        change = result["ops_per_sec"] / baseline[name]["ops_per_sec"] - 1
+        line += f"{change:>+10.1%}"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="只运行名称包含该子串的项目")
+    parser.add_argument("--quick", action="store_true", help="减少次数，用于快速检查")
+    parser.add_argument("--save", help="将结果保存为 JSON 基线")
+    parser.add_argument("--compare", help="与 JSON 基线比较吞吐量")
+    parser.add_argument("--replay", help="回放 FrameRecorder 录制的目录，报告事件吞吐量")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+
+    def selected(name: str) -> bool:
+        return args.filter in name
+
+    print(f"{'benchmark':<56}{'ops/s':>12}{'p50 us':>10}{'p90 us':>10}{'p99 us':>10}{'peak B':>10}{'blocks':>8}"
+          + (f"{'vs base':>10}" if baseline is not None else ""))
+    results: dict[str, dict[str, float]] = {}
+    for name, function, number in _cases(args.quick):
+        if selected(name):
+            results[name] = measure(function, number)
+            _print(name, results[name], baseline)
+    for name, result in asyncio.run(_session_cases(args.quick, selected)).items():
+        results[name] = result
+        _print(name, result, baseline)
+    if args.replay:
+        name = f"replay/{args.replay}"
+        results[name] = asyncio.run(_replay_case(args.replay))
+        _print(name, results[name], baseline)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"python": sys.version, "time": time.time(), "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
-from typing import Literal
-from pydantic import model_validator
+from typing import Any, Literal
+from pydantic import BaseModel, SerializeAsAny, model_validator
 from ..event import Event, QuickOperationsUnion, EventDiscriminatorMap, MessageTypeQuickOperationMap
 from .shared import APIRequest, EmptyResp
 
 
 class HandleQuickOperationReq(APIRequest[Literal[".handle_quick_operation"], EmptyResp]):
-    context: Event
+    # 按实际类型序列化，使 LazyEvent 等子类输出完整的字段
+    context: SerializeAsAny[Event]
     operation: QuickOperationsUnion
 
     @model_validator(mode="after")
@@ -18,3 +19,30 @@ class HandleQuickOperationReq(APIRequest[Literal[".handle_quick_operation"], Emp
         if not isinstance(self.operation, expectQuickOperation):
             raise ValueError("Unmatched event and operation")
         return self
+
+
+QuickOperationContextFields = ("time", "self_id", "post_type", "message_type", "request_type", "sub_type",
+                               "message_id", "group_id", "user_id", "anonymous", "flag", "sender")
+"""实现处理快速操作时会读取的事件字段"""
+QuickOperationContextSenderFields = ("user_id",)
+"""sender 中保留的字段，at_sender 时实现以 sender.user_id 构造 at"""
+
+
+def quick_operation_context(event: Event) -> dict[str, Any]:
+    """
+    只包含 QuickOperationContextFields 的精简事件，用于代替 HandleQuickOperationReq 中完整的 context
+
+    直接读取实例中保存的值，延迟事件中尚未校验的字段不会因此被校验
+    """
+    values = event.__dict__
+    context = {}
+    for name in QuickOperationContextFields:
+        value = values.get(name)
+        if value is None:
+            continue
+        if name == "sender":
+            # 延迟事件中 sender 仍是原始 JSON 值
+            sender = value.__dict__ if isinstance(value, BaseModel) else value
+            value = {key: sender[key] for key in QuickOperationContextSenderFields if sender.get(key) is not None}
+        context[name] = value.model_dump() if isinstance(value, BaseModel) else value
+    return context
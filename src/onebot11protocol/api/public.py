@@ -2,6 +2,7 @@ from typing import Annotated, Literal, Optional, Union
 from .shared import APIRequest, EmptyResp, Status
 from pydantic import BaseModel, ConfigDict, Field, RootModel, model_validator
 from ..message import Message
+from ..message.compact import SendingMessage
 from ..event.message import PrivateSenderInfo, GroupSenderInfo, AnonymousInfo
 
 
@@ -11,7 +12,7 @@ class SendPrivateMsgResp(BaseModel):
 
 class SendPrivateMsgReq(APIRequest[Literal["send_private_msg"], SendPrivateMsgResp]):
     user_id: int
-    message: Message
+    message: SendingMessage
     auto_escape: Optional[bool] = None
     """
     默认值为 false
@@ -26,7 +27,7 @@ class SendGroupMsgResp(BaseModel):
 
 class SendGroupMsgReq(APIRequest[Literal["send_group_msg"], SendGroupMsgResp]):
     group_id: int
-    message: Message
+    message: SendingMessage
     auto_escape: Optional[bool] = None
     """
     默认值为 false
@@ -38,7 +39,7 @@ class SendGroupMsgReq(APIRequest[Literal["send_group_msg"], SendGroupMsgResp]):
 class SendMsgPrivateArgs(BaseModel):
     message_type: Literal["private"]
     user_id: int
-    message: Message
+    message: SendingMessage
     auto_escape: Optional[bool] = None
     """
     默认值为 false
@@ -50,7 +51,7 @@ class SendMsgPrivateArgs(BaseModel):
 class SendMsgGroupArgs(BaseModel):
     message_type: Literal["group"]
     group_id: int
-    message: Message
+    message: SendingMessage
     auto_escape: Optional[bool] = None
     """
     默认值为 false
@@ -39,6 +39,59 @@ class EventHandler(ABC):
     async def on_event(self, session: CommunicationSessionBase, event: Event):
         pass
 
+    async def on_disconnected(self, session: CommunicationSessionBase, exception: Optional[BaseException]):
+        """连接意外断开、session 即将尝试重连时调用"""
+        pass
+
+    async def on_reconnected(self, session: CommunicationSessionBase):
+        """重连成功、进行中的请求已重发后调用"""
+        pass
+
+
+class SessionLayer(CommunicationSessionBase, EventHandler):
+    """
+    包装另一个 session 的中间层，如缓存、限流等
+
+    构造时接管 inner 的 event_handler，事件以中间层自身作为 session 转交给原处理器，
+    这样处理器中发出的请求也会经过中间层；未覆盖的属性与方法转发给 inner
+    inner 没有事件来源时（如 HTTPSession），可以把中间层同时作为 HTTPPostReceiver 的 eventHandler 与 session
+    """
+
+    def __init__(self, inner: CommunicationSessionBase, eventHandler: Optional[EventHandler] = None) -> None:
+        self.inner = inner
+        self.event_handler = eventHandler or getattr(inner, "event_handler", None)
+        if hasattr(inner, "event_handler"):
+            inner.event_handler = self
+
+    def __getattr__(self, name: str):
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    async def send[Name, RespType](self, request: APIRequest[Name, RespType], **options) -> RespType:
+        return await self.inner.send(request, **options)
+
+    async def run(self):
+        await self.inner.run()
+
+    async def connect(self):
+        await self.inner.connect()
+
+    async def disconnect(self):
+        await self.inner.disconnect()
+
+    async def on_event(self, session: CommunicationSessionBase, event: Event):
+        if self.event_handler is not None:
+            return await self.event_handler.on_event(self, event)
+
+    async def on_disconnected(self, session: CommunicationSessionBase, exception: Optional[BaseException]):
+        if self.event_handler is not None:
+            await self.event_handler.on_disconnected(self, exception)
+
+    async def on_reconnected(self, session: CommunicationSessionBase):
+        if self.event_handler is not None:
+            await self.event_handler.on_reconnected(self)
+
 
 class CommunicationBase[TEndpoint, TSession](ABC):
     @abstractmethod
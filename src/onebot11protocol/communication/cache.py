@@ -0,0 +1,133 @@
+from collections import OrderedDict
+import time
+from typing import Any, Optional
+
+from ..api.shared import APIRequest
+from ..event import Event
+from ..event.notice import (FriendAddNoticeEvent, GroupAdminNoticeEvent, GroupBanNoticeEvent, GroupDecreaseNoticeEvent,
+                            GroupIncreaseNoticeEvent)
+from .base import CommunicationSessionBase, EventHandler, SessionLayer
+
+
+DEFAULT_CACHE_TTLS: dict[str, float] = {
+    "get_login_info": 3600,
+    "get_stranger_info": 300,
+    "get_friend_list": 60,
+    "get_group_info": 60,
+    "get_group_list": 60,
+    "get_group_member_info": 60,
+    "get_group_member_list": 60,
+}
+"""api 名 -> 缓存时间（秒），不在其中的 api 不缓存"""
+
+type _CacheKey = tuple[str, tuple[tuple[str, Any], ...]]
+
+
+class CachedSession(SessionLayer):
+    """
+    缓存只读 api 响应的 session 中间层
+
+    缓存键为 api 名与去掉 no_cache 后的参数，每个 api 有各自的缓存时间，总条目数超过 max_entries 时淘汰最久未使用的条目。
+    请求的 no_cache 为 true 时不读缓存，但会用新的响应刷新缓存
+
+    群成员增减、管理员变动、禁言与新增好友的通知事件会使相关条目失效，
+    请求进行中发生失效时，该请求的响应不会写入缓存
+    缓存的响应对象是共享的，不要修改
+    """
+
+    def __init__(self, inner: CommunicationSessionBase, eventHandler: Optional[EventHandler] = None,
+                 ttls: Optional[dict[str, float]] = None, max_entries: int = 4096) -> None:
+        super().__init__(inner, eventHandler)
+        self.ttls = DEFAULT_CACHE_TTLS if ttls is None else ttls
+        self.max_entries = max_entries
+        self.entries: OrderedDict[_CacheKey, tuple[float, Any]] = OrderedDict()
+        # (api 名,) 与 (api 名, 参数名, 参数值) -> 键，用于按参数失效
+        self.index: dict[tuple, set[_CacheKey]] = {}
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    async def send[Name, RespType](self, request: APIRequest[Name, RespType], **options) -> RespType:
+        apiName = request.typeParameters[0].__args__[0]
+        ttl = self.ttls.get(apiName)
+        if ttl is None:
+            return await self.inner.send(request, **options)
+
+        params = request.model_dump(exclude_none=True)
+        noCache = params.pop("no_cache", False)
+        key: _CacheKey = (apiName, tuple(sorted(params.items())))
+        if not noCache:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires, response = entry
+                if expires > time.monotonic():
+                    self.hits += 1
+                    self.entries.move_to_end(key)
+                    return response
+                self._remove(key)
+        self.misses += 1
+
+        generation = self.generation
+        response = await self.inner.send(request, **options)
+        if generation == self.generation:
+            self._store(key, time.monotonic() + ttl, response)
+        return response
+
+    def _tags(self, key: _CacheKey) -> list[tuple]:
+        apiName, params = key
+        return [(apiName,), *((apiName, name, value) for name, value in params)]
+
+    def _store(self, key: _CacheKey, expires: float, response: Any):
+        if key not in self.entries:
+            for tag in self._tags(key):
+                self.index.setdefault(tag, set()).add(key)
+        self.entries[key] = (expires, response)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, key: _CacheKey):
+        del self.entries[key]
+        for tag in self._tags(key):
+            keys = self.index[tag]
+            keys.discard(key)
+            if not keys:
+                del self.index[tag]
+
+    def invalidate(self, apiName: Optional[str] = None, **params: Any):
+        """使 apiName 的参数包含 params 的条目失效，apiName 为 None 时清空缓存"""
+        self.generation += 1
+        if apiName is None:
+            self.entries.clear()
+            self.index.clear()
+            return
+        tags = [(apiName, name, value) for name, value in params.items()] or [(apiName,)]
+        candidates = min((self.index.get(tag, set()) for tag in tags), key=len)
+        expected = params.items()
+        for key in list(candidates):
+            if expected <= dict(key[1]).items():
+                self._remove(key)
+
+    def invalidate_by_event(self, event: Event):
+        if isinstance(event, (GroupIncreaseNoticeEvent, GroupDecreaseNoticeEvent)):
+            self.invalidate("get_group_member_info", group_id=event.group_id, user_id=event.user_id)
+            self.invalidate("get_group_member_list", group_id=event.group_id)
+            # 成员数与所在的群都可能变化
+            self.invalidate("get_group_info", group_id=event.group_id)
+            self.invalidate("get_group_list")
+        elif isinstance(event, (GroupAdminNoticeEvent, GroupBanNoticeEvent)):
+            self.invalidate("get_group_member_info", group_id=event.group_id, user_id=event.user_id)
+            self.invalidate("get_group_member_list", group_id=event.group_id)
+        elif isinstance(event, FriendAddNoticeEvent):
+            self.invalidate("get_friend_list")
+            self.invalidate("get_stranger_info", user_id=event.user_id)
+
+    async def on_event(self, session: CommunicationSessionBase, event: Event):
+        if event.post_type == "notice":
+            self.invalidate_by_event(event)
+        return await super().on_event(session, event)
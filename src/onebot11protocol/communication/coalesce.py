@@ -0,0 +1,60 @@
+import asyncio
+from typing import Any, Iterable, Optional
+
+from ..api.shared import APIRequest
+from .base import CommunicationSessionBase, EventHandler, SessionLayer
+from .codec import dump_model
+from .ws import _is_idempotent_action
+
+
+class CoalescingSession(SessionLayer):
+    """
+    合并同时进行的相同只读请求的 session 中间层
+
+    api 名与序列化后的参数都相同的请求在前一个完成前再次发出时，不再发出新的请求，
+    而是等待同一个结果，响应只校验一次，所有调用方得到同一个对象，不要修改
+    超时等选项以最先发出的调用为准，某个调用方被取消不影响其他调用方
+
+    request_types 指定参与合并的请求类型，只能是只读（get_*）的 api，为 None 时合并所有只读 api
+    """
+
+    def __init__(self, inner: CommunicationSessionBase, eventHandler: Optional[EventHandler] = None,
+                 request_types: Optional[Iterable[type[APIRequest]]] = None) -> None:
+        super().__init__(inner, eventHandler)
+        if request_types is not None:
+            request_types = frozenset(request_types)
+            for requestType in request_types:
+                apiName = requestType.typeParameters[0].__args__[0]
+                if not _is_idempotent_action(apiName):
+                    raise ValueError(f"Api \"{apiName}\" is not read-only and cannot be coalesced")
+        self.request_types: Optional[frozenset[type[APIRequest]]] = request_types
+        self.in_flight: dict[tuple[str, bytes], asyncio.Task] = {}
+        self.coalesced = 0
+
+    def _should_coalesce(self, request: APIRequest, apiName: str) -> bool:
+        if self.request_types is not None:
+            return type(request) in self.request_types
+        return _is_idempotent_action(apiName)
+
+    async def send[Name, RespType](self, request: APIRequest[Name, RespType], **options) -> RespType:
+        apiName = request.typeParameters[0].__args__[0]
+        if not self._should_coalesce(request, apiName):
+            return await self.inner.send(request, **options)
+
+        key = (apiName, dump_model(request))
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.get_running_loop().create_task(self.inner.send(request, **options))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda task: self._finish(key, task))
+        # 调用方被取消时不取消共享的请求
+        return await asyncio.shield(task)
+
+    def _finish(self, key: tuple[str, bytes], task: asyncio.Task):
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        if not task.cancelled():
+            # 所有调用方都已取消时避免未取得异常的警告
+            task.exception()
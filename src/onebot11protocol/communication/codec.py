@@ -0,0 +1,92 @@
+from abc import ABC, abstractmethod
+from functools import cache
+import json
+from typing import Any
+from pydantic import BaseModel
+
+from ..api.hidden import quick_operation_context
+from ..event import Event
+from .decoder import Frame
+
+
+class JSONCodec(ABC):
+    """帧与 api 响应的 JSON 编解码后端"""
+
+    name: str
+
+    @abstractmethod
+    def loads(self, data: Frame) -> Any:
+        pass
+
+    @abstractmethod
+    def dumps(self, obj: Any) -> bytes:
+        pass
+
+
+class StdlibJSONCodec(JSONCodec):
+    name = "json"
+
+    def loads(self, data: Frame) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class OrjsonCodec(JSONCodec):
+    """需要安装 orjson"""
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+        self.orjson = orjson
+
+    def loads(self, data: Frame) -> Any:
+        return self.orjson.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.orjson.dumps(obj)
+
+
+class MsgspecCodec(JSONCodec):
+    """需要安装 msgspec"""
+
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        import msgspec
+        self.decoder = msgspec.json.Decoder()
+        self.encoder = msgspec.json.Encoder()
+
+    def loads(self, data: Frame) -> Any:
+        return self.decoder.decode(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.encoder.encode(obj)
+
+
+@cache
+def get_default_codec() -> JSONCodec:
+    """按 orjson、msgspec、标准库的顺序选择可用的后端"""
+    for codecType in (OrjsonCodec, MsgspecCodec):
+        try:
+            return codecType()
+        except ImportError:
+            continue
+    return StdlibJSONCodec()
+
+
+def dump_model(model: BaseModel, exclude_none: bool = False) -> bytes:
+    """由 pydantic 直接序列化为 bytes，不经过中间的 dict 与 str"""
+    return model.__pydantic_serializer__.to_json(model, exclude_none=exclude_none)
+
+
+def encode_api_request(action: str, params: bytes, echo: str) -> bytes:
+    """直接拼接 api 调用的信封，action 与 echo 由本库生成，不含需要转义的字符"""
+    return b'{"action":"%s","params":%s,"echo":"%s"}' % (action.encode(), params, echo.encode())
+
+
+def encode_quick_operation_params(codec: JSONCodec, event: Event, operation: BaseModel) -> bytes:
+    """.handle_quick_operation 的参数，context 只包含实现需要的字段，不序列化整个事件"""
+    return b'{"context":%s,"operation":%s}' % (codec.dumps(quick_operation_context(event)), dump_model(operation, exclude_none=True))
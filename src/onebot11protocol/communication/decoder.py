@@ -0,0 +1,128 @@
+from functools import cache
+import re
+from typing import Annotated, Any, Callable, Optional, Union, get_args, get_origin
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from ..event import Event
+from ..event.base import EventDiscriminatorMap
+from ..event.lazy import LazyEventMap
+
+
+type Frame = str | bytes
+type EventValidator = Callable[[Frame], Any]
+
+
+def _field_pattern(fieldName: str):
+    # 只匹配未转义的键，字符串值中的 "post_type" 会被转义为 \"post_type\"，不会误判
+    pattern = rf'"{fieldName}"\s*:\s*"([^"\\]*)"'
+    return re.compile(pattern), re.compile(pattern.encode())
+
+
+def _response_pattern():
+    # api 响应在顶层总有 retcode，本库发出的调用还总带有 echo；事件模型中没有这两个键
+    pattern = r'"(?:retcode|echo)"\s*:'
+    return re.compile(pattern), re.compile(pattern.encode())
+
+
+def _union_members(annotated) -> tuple[tuple, Optional[str]]:
+    """展开 Annotated[Union[...], Field(discriminator=...)]，返回成员与 discriminator"""
+    discriminator = None
+    if get_origin(annotated) is Annotated:
+        annotated, *metadata = get_args(annotated)
+        for info in metadata:
+            discriminator = getattr(info, "discriminator", None) or discriminator
+    if get_origin(annotated) is Union:
+        return get_args(annotated), discriminator
+    return (annotated,), discriminator
+
+
+def _literal_value(model: type[BaseModel], fieldName: str) -> str:
+    return get_args(model.model_fields[fieldName].annotation)[0]
+
+
+def _first_model(member) -> type[BaseModel]:
+    while not isinstance(member, type):
+        member = _union_members(member)[0][0]
+    return member
+
+
+class EventDecoder:
+    """
+    预编译的事件解码器
+
+    构造时根据 Event 的 discriminated union 生成 post_type -> discriminator 值 -> 具体模型的分派表，
+    解码时先从原始帧中嗅探 post_type 与对应的 discriminator，再直接以 validate_json 校验具体模型，
+    嗅探失败或具体模型校验失败时回退到完整的 Event 校验，因此结果与 TypeAdapter(Event) 一致
+
+    lazy 为 true 时，对 LazyEventMap 中登记了延迟版本的事件，解码为延迟校验 message 等重字段的子类
+    """
+
+    def __init__(self, lazy: bool = False) -> None:
+        self.lazy = lazy
+        self.adapter: TypeAdapter[Event] = TypeAdapter(Event)
+        self.post_type_patterns = _field_pattern("post_type")
+        self.response_patterns = _response_pattern()
+        self.dispatch_table: dict[str, tuple[tuple[re.Pattern, re.Pattern], dict[str, EventValidator]]] = {}
+
+        for postTypeUnion in _union_members(Event)[0]:
+            members, discriminator = _union_members(postTypeUnion)
+            postType = _literal_value(_first_model(members[0]), "post_type")
+            assert discriminator == EventDiscriminatorMap[postType], f"Unmatched discriminator for post_type {postType}"
+            validators: dict[str, EventValidator] = {}
+            for member in members:
+                discriminatorValue = _literal_value(_first_model(member), discriminator)
+                if isinstance(member, type):
+                    if lazy:
+                        member = LazyEventMap.get(member, member)
+                    validators[discriminatorValue] = member.model_validate_json
+                else:
+                    # 嵌套的 union（如 notify 通知），交给 pydantic 在这一层内分派
+                    validators[discriminatorValue] = TypeAdapter(member).validate_json
+            self.dispatch_table[postType] = (_field_pattern(discriminator), validators)
+
+    @staticmethod
+    def _sniff(patterns: tuple[re.Pattern, re.Pattern], data: Frame) -> Optional[str]:
+        if isinstance(data, str):
+            match = patterns[0].search(data)
+            return match[1] if match else None
+        match = patterns[1].search(data)
+        return match[1].decode() if match else None
+
+    def is_api_response(self, data: Frame) -> bool:
+        return (self.response_patterns[0] if isinstance(data, str) else self.response_patterns[1]).search(data) is not None
+
+    def post_type_of(self, data: Frame) -> Optional[str]:
+        """
+        返回帧的 post_type，不是事件（如 api 响应）时返回 None
+
+        先按 retcode / echo 识别 api 响应，get_msg 等响应的 data 中可能嵌套带有 post_type 的完整事件
+        """
+        if self.is_api_response(data):
+            return None
+        return self._sniff(self.post_type_patterns, data)
+
+    def validator_of(self, data: Frame, postType: Optional[str] = None) -> Optional[EventValidator]:
+        if postType is None:
+            postType = self.post_type_of(data)
+        entry = self.dispatch_table.get(postType) if postType is not None else None
+        if entry is None:
+            return None
+        discriminatorPatterns, validators = entry
+        discriminatorValue = self._sniff(discriminatorPatterns, data)
+        return validators.get(discriminatorValue) if discriminatorValue is not None else None
+
+    def decode(self, data: Frame, postType: Optional[str] = None) -> Event:
+        """从原始帧解码事件，失败时抛出 ValidationError"""
+        validator = self.validator_of(data, postType)
+        if validator is not None:
+            try:
+                return validator(data)
+            except ValidationError:
+                pass
+        return self.adapter.validate_json(data)
+
+
+@cache
+def get_default_decoder() -> EventDecoder:
+    """进程内共享的解码器，避免每个 session 重复构建 schema"""
+    return EventDecoder()
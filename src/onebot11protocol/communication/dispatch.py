@@ -0,0 +1,174 @@
+import asyncio
+from collections import deque
+import time
+from typing import Hashable, Literal, Optional
+
+from ..event import Event
+from .base import CommunicationSessionBase, EventHandler
+from .metrics import ProtocolMetrics
+from .tracing import ParentSpan, Span, use_span
+
+
+type OverflowPolicy = Literal["block", "drop_oldest", "drop_meta_first"]
+"""
+队列满时的处理方式
+
+block: 等待队列有空位，背压会传导到接收循环。此时接收循环不再读取 api 响应，
+若处理器会等待同一连接上的 api 调用，队列满时会互相等待，只应在处理器不调用 api 时使用
+
+drop_oldest: 丢弃队列中最早的事件
+
+drop_meta_first: 优先丢弃队列中的元事件，其次是新到达的元事件，都没有时丢弃最早的事件
+"""
+
+type _Item = tuple[CommunicationSessionBase, EventHandler, Event, Optional[Span]]
+
+
+def conversation_key(event: Event) -> Hashable:
+    """事件所属的会话，同一会话中的事件按到达顺序处理"""
+    if event.post_type != "request":
+        groupId = getattr(event, "group_id", None)
+        if groupId is not None:
+            return (event.self_id, "group", groupId)
+    userId = getattr(event, "user_id", None)
+    if userId is not None:
+        return (event.self_id, "user", userId)
+    return (event.self_id, event.post_type)
+
+
+class _Shard:
+    def __init__(self) -> None:
+        self.items: deque[_Item] = deque()
+        self.readable = asyncio.Event()
+        self.writable = asyncio.Event()
+        self.writable.set()
+
+
+class EventDispatcher:
+    """
+    有界、按会话保序的事件分发池
+
+    事件按 conversation_key 分片到固定数量的 worker，同一会话总是落在同一个 worker 上顺序处理，
+    不同会话之间并行处理，每个 worker 的队列长度不超过 queue_size
+    """
+
+    def __init__(self, worker_count: int = 8, queue_size: int = 256, overflow_policy: OverflowPolicy = "drop_meta_first",
+                 metrics: Optional[ProtocolMetrics] = None) -> None:
+        assert worker_count > 0 and queue_size > 0, "Invalid dispatcher size"
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.registry.gauge("onebot_dispatch_queue_depth", "Events waiting in the dispatcher queues",
+                                   callback=lambda: self.queue_depth)
+        self.shards = [_Shard() for _ in range(worker_count)]
+        self.workers: list[asyncio.Task] = []
+        self.dropped = 0
+        self.unfinished = 0
+        self.finished = asyncio.Event()
+        self.finished.set()
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(shard.items) for shard in self.shards)
+
+    @property
+    def queue_depths(self) -> list[int]:
+        return [len(shard.items) for shard in self.shards]
+
+    def start(self):
+        if self.workers:
+            return
+        loop = asyncio.get_running_loop()
+        self.workers = [loop.create_task(self._work(shard)) for shard in self.shards]
+
+    async def stop(self):
+        """停止所有 worker，尚未处理的事件会被丢弃"""
+        workers, self.workers = self.workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for shard in self.shards:
+            self._task_done(len(shard.items))
+            shard.items.clear()
+            shard.writable.set()
+
+    async def join(self):
+        """等待已提交的事件全部处理完毕"""
+        await self.finished.wait()
+
+    async def submit(self, session: CommunicationSessionBase, handler: EventHandler, event: Event,
+                     span: Optional[ParentSpan] = None) -> bool:
+        """
+        提交事件，返回事件是否被接受，span 为接收该事件的 span 时，处理器在其子 span 中执行，
+        为 UNSAMPLED 时处理器中也不再追踪
+        """
+        self.start()
+        shard = self.shards[hash(conversation_key(event)) % len(self.shards)]
+        if len(shard.items) >= self.queue_size:
+            if self.overflow_policy == "block":
+                while len(shard.items) >= self.queue_size:
+                    shard.writable.clear()
+                    await shard.writable.wait()
+            elif not self._drop_one(shard, event):
+                self.dropped += 1
+                if self.metrics is not None:
+                    self.metrics.dispatch_dropped.inc()
+                return False
+        shard.items.append((session, handler, event, span))
+        self.unfinished += 1
+        self.finished.clear()
+        shard.readable.set()
+        return True
+
+    def _drop_one(self, shard: _Shard, incoming: Event) -> bool:
+        """为新事件腾出位置，返回 False 表示应当丢弃新事件本身"""
+        if self.overflow_policy == "drop_meta_first":
+            for index, (_, _, event, _) in enumerate(shard.items):
+                if event.post_type == "meta_event":
+                    del shard.items[index]
+                    break
+            else:
+                if incoming.post_type == "meta_event":
+                    return False
+                shard.items.popleft()
+        else:
+            shard.items.popleft()
+        self.dropped += 1
+        if self.metrics is not None:
+            self.metrics.dispatch_dropped.inc()
+        self._task_done()
+        return True
+
+    def _task_done(self, count: int = 1):
+        self.unfinished -= count
+        if self.unfinished == 0:
+            self.finished.set()
+
+    async def _work(self, shard: _Shard):
+        while True:
+            while not shard.items:
+                shard.readable.clear()
+                await shard.readable.wait()
+            session, handler, event, span = shard.items.popleft()
+            shard.writable.set()
+            metrics = self.metrics
+            if metrics is not None:
+                start = time.perf_counter()
+            if isinstance(span, Span):
+                span = span.tracer.start_span("onebot.handle", span, {"event": type(event).__name__})
+            error = None
+            try:
+                with use_span(span):
+                    await handler.on_event(session, event)
+            except Exception as e:
+                error = e
+                if metrics is not None:
+                    metrics.handler_failures.inc((event.post_type,))
+                print(f"Event handler failed on {type(event).__name__}: {e!r}")
+            finally:
+                if metrics is not None:
+                    metrics.handler_duration.observe(time.perf_counter() - start, (event.post_type,))
+                if isinstance(span, Span):
+                    span.end(error)
+                self._task_done()
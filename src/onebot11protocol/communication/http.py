@@ -0,0 +1,346 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+import time
+from typing import Callable, Optional
+from pydantic import BaseModel
+from urllib.parse import urlsplit
+
+from ..api.shared import APIRequest
+from ..event import Event
+from ..event.base import EventQuickOperationMap
+from .base import CommunicationBase, CommunicationSessionBase, EventHandler
+from .codec import JSONCodec, dump_model, encode_quick_operation_params, get_default_codec
+from .metrics import ProtocolMetrics
+from .tracing import Tracer, current_parent
+from .ws import BadAPIResponseException, RawAPIResponse, _is_bad_retcode, _is_idempotent_action
+
+
+@dataclass
+class HTTPEndpoint:
+    url: str
+    """OneBot 实现的 HTTP API 地址，如 http://127.0.0.1:5700"""
+    access_token: Optional[str] = None
+    pipeline_depth: int = 1
+    """
+    默认值为 1
+
+    每个连接上最多同时进行的只读请求（get_*）数量，大于 1 时启用 HTTP pipelining，其他请求不会进入 pipeline
+    """
+
+
+type _HTTPResponse = tuple[int, bytes]
+
+
+async def _read_response(reader: asyncio.StreamReader) -> tuple[int, dict[str, str], bytes]:
+    while True:
+        statusLine = await reader.readline()
+        if not statusLine:
+            raise ConnectionError("Connection closed by server")
+        status = int(statusLine.split(b" ", 2)[1])
+        headers: dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.partition(b":")
+            headers[name.strip().lower().decode("latin-1")] = value.strip().decode("latin-1")
+        if 100 <= status < 200:
+            # 跳过 100 Continue 等中间响应
+            continue
+        break
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks: list[bytes] = []
+        while True:
+            size = int((await reader.readline()).split(b";", 1)[0], 16)
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        body = b"".join(chunks)
+    elif "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    else:
+        body = await reader.read()
+        headers["connection"] = "close"
+    return status, headers, body
+
+
+class _HTTPConnection:
+    """
+    一个 keep-alive 连接，请求按写入顺序排队，由读任务按顺序匹配响应，因此可以 pipelining
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, onIdle: Callable[[], None]) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.on_idle = onIdle
+        self.pending: deque[tuple[asyncio.Future[_HTTPResponse], bool]] = deque()
+        self.reusable = True
+        self.last_used = time.monotonic()
+        self.reader_task = asyncio.get_running_loop().create_task(self._read_responses())
+
+    def can_accept(self, idempotent: bool, pipelineDepth: int) -> bool:
+        if not self.reusable:
+            return False
+        if not self.pending:
+            return True
+        # 只在只读请求之间 pipelining，连接断开时无法确定哪些非只读请求已被执行
+        return idempotent and len(self.pending) < pipelineDepth and all(pendingIdempotent for _, pendingIdempotent in self.pending)
+
+    def send(self, data: bytes, idempotent: bool) -> asyncio.Future[_HTTPResponse]:
+        """同步地登记并写入请求，保证登记顺序与写入顺序一致"""
+        future: asyncio.Future[_HTTPResponse] = asyncio.get_running_loop().create_future()
+        self.pending.append((future, idempotent))
+        self.writer.write(data)
+        return future
+
+    async def _read_responses(self):
+        error: BaseException = ConnectionError("Connection closed")
+        try:
+            while self.reusable:
+                status, headers, body = await _read_response(self.reader)
+                if not self.pending:
+                    raise ConnectionError("Unexpected response without request")
+                future, _ = self.pending.popleft()
+                if headers.get("connection", "").lower() == "close":
+                    self.reusable = False
+                if not future.done():
+                    future.set_result((status, body))
+                self.last_used = time.monotonic()
+                self.on_idle()
+        except (OSError, EOFError, ValueError, IndexError, asyncio.IncompleteReadError) as e:
+            error = ConnectionError(f"HTTP connection failed: {e!r}")
+        finally:
+            self.reusable = False
+            self.writer.close()
+            while self.pending:
+                future, _ = self.pending.popleft()
+                if not future.done():
+                    future.set_exception(error)
+            self.on_idle()
+
+    def abort(self):
+        """不再使用该连接，排队中的其他请求以 ConnectionError 失败"""
+        self.reusable = False
+        self.writer.close()
+        self.reader_task.cancel()
+
+    async def close(self):
+        self.abort()
+        await asyncio.gather(self.reader_task, return_exceptions=True)
+
+
+class _HostPool:
+    def __init__(self, host: str, port: int, ssl: bool, maxConnections: int, idleTimeout: float) -> None:
+        self.host = host
+        self.port = port
+        self.ssl = ssl
+        self.max_connections = maxConnections
+        self.idle_timeout = idleTimeout
+        self.connections: list[_HTTPConnection] = []
+        self.opening = 0
+        self.available = asyncio.Event()
+
+    def _pick(self, idempotent: bool, pipelineDepth: int) -> Optional[_HTTPConnection]:
+        now = time.monotonic()
+        candidates = []
+        for connection in self.connections:
+            if not connection.pending and now - connection.last_used > self.idle_timeout:
+                # 服务端很可能已关闭长时间空闲的连接
+                connection.reusable = False
+                connection.writer.close()
+            if connection.can_accept(idempotent, pipelineDepth):
+                candidates.append(connection)
+        self.connections = [connection for connection in self.connections if connection.reusable]
+        return min(candidates, key=lambda connection: len(connection.pending), default=None)
+
+    async def request(self, data: bytes, idempotent: bool, pipelineDepth: int) -> _HTTPResponse:
+        while True:
+            connection = self._pick(idempotent, pipelineDepth)
+            if connection is not None:
+                break
+            if len(self.connections) + self.opening < self.max_connections:
+                self.opening += 1
+                try:
+                    reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None)
+                finally:
+                    self.opening -= 1
+                    # 连接失败时等待中的请求自行重试，连接成功时它们可能可以 pipelining
+                    self.available.set()
+                connection = _HTTPConnection(reader, writer, self.available.set)
+                self.connections.append(connection)
+                break
+            self.available.clear()
+            await self.available.wait()
+        future = connection.send(data, idempotent)
+        try:
+            await connection.writer.drain()
+            return await future
+        except asyncio.CancelledError:
+            # 超时或取消的请求仍占据连接上的顺序，其响应可能永远不会到来，只能放弃整个连接
+            connection.abort()
+            raise
+
+    async def close(self):
+        connections, self.connections = self.connections, []
+        await asyncio.gather(*(connection.close() for connection in connections))
+
+
+class HTTPConnectionPool:
+    """
+    按主机划分的 keep-alive 连接池，可以在多个 HTTPSession 之间共享
+
+    每个主机最多 max_connections 个连接，空闲超过 idle_timeout 秒的连接不再复用
+    """
+
+    def __init__(self, max_connections: int = 8, idle_timeout: float = 10) -> None:
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.hosts: dict[tuple[str, int, bool], _HostPool] = {}
+
+    async def request(self, host: str, port: int, ssl: bool, data: bytes, idempotent: bool, pipelineDepth: int = 1) -> _HTTPResponse:
+        key = (host, port, ssl)
+        hostPool = self.hosts.get(key)
+        if hostPool is None:
+            hostPool = self.hosts[key] = _HostPool(host, port, ssl, self.max_connections, self.idle_timeout)
+        try:
+            return await hostPool.request(data, idempotent, pipelineDepth)
+        except ConnectionError:
+            if not idempotent:
+                raise
+            # 只读请求可以安全地在新连接上重试一次
+            return await hostPool.request(data, idempotent, 1)
+
+    async def close(self):
+        hosts, self.hosts = self.hosts, {}
+        await asyncio.gather(*(hostPool.close() for hostPool in hosts.values()))
+
+
+class HTTPSession(CommunicationSessionBase):
+    """
+    通过 HTTP API 调用 OneBot 实现，每次调用 POST 到 /<action>
+
+    HTTP API 不推送事件，run 只是等待 disconnect，事件需要通过 HTTP POST 上报接收
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, endpoint: HTTPEndpoint, eventHandler: Optional[EventHandler] = None,
+                 pool: Optional[HTTPConnectionPool] = None, timeout: Optional[float] = 30,
+                 action_timeouts: Optional[dict[str, float]] = None, codec: Optional[JSONCodec] = None,
+                 metrics: Optional[ProtocolMetrics] = None, tracer: Optional[Tracer] = None) -> None:
+        super().__init__()
+        self.loop = loop
+        self.codec = codec or get_default_codec()
+        self.metrics = metrics
+        self.tracer = tracer
+        self.endpoint = endpoint
+        self.event_handler = eventHandler
+        self.owns_pool = pool is None
+        self.pool = pool or HTTPConnectionPool()
+        self.timeout = timeout
+        self.action_timeouts = action_timeouts or {}
+        self.timeouts = 0
+        self.closed = asyncio.Event()
+
+        url = urlsplit(endpoint.url)
+        assert url.scheme in ("http", "https"), f"Unsupported scheme {url.scheme}"
+        self.ssl = url.scheme == "https"
+        self.host = url.hostname
+        self.port = url.port or (443 if self.ssl else 80)
+        self.path_prefix = url.path.rstrip("/")
+        hostHeader = url.netloc.rpartition("@")[2]
+        authorization = f"Authorization: Bearer {endpoint.access_token}\r\n" if endpoint.access_token else ""
+        self.header_suffix = (f" HTTP/1.1\r\nHost: {hostHeader}\r\nContent-Type: application/json\r\n"
+                              f"{authorization}Connection: keep-alive\r\nContent-Length: ").encode()
+
+    async def send[Name, RespType](self, request: APIRequest[Name, RespType], timeout: Optional[float] = None) -> RespType:
+        """timeout 未指定时使用 action_timeouts 中对应的值或 session 的默认值，超时抛出 TimeoutError"""
+        apiNameLiteral, respType = request.typeParameters
+        response = await self._call(apiNameLiteral.__args__[0], dump_model(request), timeout)
+        return respType.model_validate(response["data"])
+
+    async def _call(self, apiName: str, body: bytes, timeout: Optional[float]) -> RawAPIResponse:
+        span = self.tracer.start_span("onebot.api", current_parent(), {"action": apiName}) if self.tracer is not None else None
+        if span is None:
+            return await self._request(apiName, body, timeout)
+        try:
+            response = await self._request(apiName, body, timeout)
+        except BaseException as e:
+            span.end(e)
+            raise
+        span.set_attribute("retcode", response["retcode"])
+        span.end()
+        return response
+
+    async def _request(self, apiName: str, body: bytes, timeout: Optional[float]) -> RawAPIResponse:
+        data = b"".join((f"POST {self.path_prefix}/{apiName}".encode(),
+                        self.header_suffix, str(len(body)).encode(), b"\r\n\r\n", body))
+        idempotent = _is_idempotent_action(apiName)
+        if timeout is None:
+            timeout = self.action_timeouts.get(apiName, self.timeout)
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.api_in_flight.inc()
+            start = time.perf_counter()
+        try:
+            async with asyncio.timeout(timeout):
+                status, responseBody = await self.pool.request(
+                    self.host, self.port, self.ssl, data, idempotent,
+                    self.endpoint.pipeline_depth if idempotent else 1)
+        except TimeoutError:
+            self.timeouts += 1
+            if metrics is not None:
+                metrics.api_failures.inc((apiName, "timeout"))
+            raise TimeoutError(f"Api \"{apiName}\" timed out after {timeout}s") from None
+        finally:
+            if metrics is not None:
+                metrics.api_in_flight.inc((), -1)
+        if metrics is not None:
+            metrics.api_latency.observe(time.perf_counter() - start, (apiName,))
+
+        if status != 200:
+            if metrics is not None:
+                metrics.api_failures.inc((apiName, "status"))
+            # 与 WebSocket 的约定一致，HTTP 状态码映射为 14xx 的 retcode
+            response = RawAPIResponse(status="failed", retcode=1000 + status, data=None, echo="")
+            raise BadAPIResponseException(
+                f"Api \"{apiName}\" invocation failed with HTTP status: {status}", response=response)
+        response: RawAPIResponse = self.codec.loads(responseBody)
+        retcode = response["retcode"]
+        if _is_bad_retcode(retcode):
+            if metrics is not None:
+                metrics.api_failures.inc((apiName, "retcode"))
+            raise BadAPIResponseException(
+                f"Api \"{apiName}\" invocation failed with retcode: {retcode}", response=response)
+        return response
+
+    async def quick_operation(self, event: Event, operation: Optional[BaseModel] = None, timeout: Optional[float] = None, **kwargs):
+        """同 WebSocketSession.quick_operation"""
+        if operation is None:
+            operation = EventQuickOperationMap[type(event)](**kwargs)
+        await self._call(".handle_quick_operation", encode_quick_operation_params(self.codec, event, operation), timeout)
+
+    async def run(self):
+        await self.closed.wait()
+
+    async def connect(self):
+        self.closed.clear()
+
+    async def disconnect(self):
+        self.closed.set()
+        if self.owns_pool:
+            await self.pool.close()
+
+
+class HTTPCommunication(CommunicationBase[HTTPEndpoint, HTTPSession]):
+    def __init__(self, **sessionOptions) -> None:
+        """sessionOptions 会原样传给每个创建的 HTTPSession，如 pool、timeout"""
+        super().__init__()
+        self.session_options = sessionOptions
+
+    def create(self, endpoint: HTTPEndpoint, eventHandler: EventHandler) -> HTTPSession:
+        loop = asyncio.get_event_loop()
+        return HTTPSession(loop, endpoint, eventHandler, **self.session_options)
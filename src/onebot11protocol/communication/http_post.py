@@ -0,0 +1,158 @@
+import asyncio
+from dataclasses import dataclass
+import hashlib
+import hmac
+import time
+from typing import Optional
+from pydantic import BaseModel, ValidationError
+
+from ..event.base import EventQuickOperationMap
+from .base import CommunicationSessionBase, EventHandler
+from .decoder import EventDecoder, get_default_decoder
+from .metrics import ProtocolMetrics
+
+
+@dataclass
+class HTTPPostEndpoint:
+    host: str = "127.0.0.1"
+    port: int = 8080
+    secret: Optional[str] = None
+    """上报时用于计算 X-Signature（HMAC-SHA1）的密钥，为空时不校验"""
+
+
+_REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Content Too Large", 500: "Internal Server Error"}
+
+
+class HTTPPostReceiver:
+    """
+    接收 HTTP POST 上报的事件
+
+    事件由共享的解码器直接从请求体解码，处理器 on_event 若返回该事件对应的快速操作模型，
+    会被序列化为响应体，由 OneBot 实现执行，省去一次 api 调用；返回 None 时响应 204
+
+    session 会作为 on_event 的 session 参数传给处理器，通常是同一实现的 HTTPSession
+    请求体在校验签名前读入内存，Content-Length 超过 max_body_size 字节的请求以 413 拒绝，不读取请求体
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, endpoint: HTTPPostEndpoint, eventHandler: EventHandler,
+                 session: Optional[CommunicationSessionBase] = None, decoder: Optional[EventDecoder] = None,
+                 metrics: Optional[ProtocolMetrics] = None, max_body_size: int = 4 << 20) -> None:
+        self.loop = loop
+        self.max_body_size = max_body_size
+        self.metrics = metrics
+        self.endpoint = endpoint
+        self.event_handler = eventHandler
+        self.session = session
+        self.decoder = decoder or get_default_decoder()
+        self.secret = endpoint.secret.encode() if endpoint.secret else None
+        self.server: Optional[asyncio.Server] = None
+        self.connections: set[asyncio.StreamWriter] = set()
+        self.signature_failures = 0
+
+    @property
+    def port(self) -> int:
+        """实际监听的端口，endpoint.port 为 0 时由系统分配"""
+        return self.server.sockets[0].getsockname()[1]
+
+    def _verify(self, signature: Optional[str], body: bytes) -> bool:
+        if self.secret is None:
+            return True
+        if signature is None or not signature.startswith("sha1="):
+            return False
+        # hmac 直接读取请求体，不产生额外的副本
+        expected = hmac.new(self.secret, body, hashlib.sha1).hexdigest()
+        return hmac.compare_digest(expected, signature[5:])
+
+    async def _process(self, method: str, headers: dict[str, str], body: bytes) -> tuple[int, bytes]:
+        if method != "POST":
+            return 405, b""
+        if not self._verify(headers.get("x-signature"), body):
+            self.signature_failures += 1
+            return 403 if "x-signature" in headers else 401, b""
+        metrics = self.metrics
+        if metrics is not None:
+            start = time.perf_counter()
+        try:
+            event = self.decoder.decode(body)
+        except ValidationError as e:
+            if metrics is not None:
+                metrics.validation_failures.inc((self.decoder.post_type_of(body) or "",))
+            print(f"Cannot parse event from data {body}: {e}, discarding")
+            return 400, b""
+        if metrics is not None:
+            decoded = time.perf_counter()
+            metrics.record_event(event, decoded - start)
+        try:
+            operation = await self.event_handler.on_event(self.session, event)
+        except Exception as e:
+            if metrics is not None:
+                metrics.handler_failures.inc((event.post_type,))
+            print(f"Event handler failed on {type(event).__name__}: {e!r}")
+            return 500, b""
+        finally:
+            if metrics is not None:
+                metrics.handler_duration.observe(time.perf_counter() - decoded, (event.post_type,))
+        if operation is None:
+            return 204, b""
+        expectOperation = EventQuickOperationMap.get(type(event))
+        if not isinstance(operation, BaseModel) or expectOperation is None or not isinstance(operation, expectOperation):
+            print(f"Handler returned {type(operation).__name__} which is not the quick operation of {type(event).__name__}, ignoring")
+            return 204, b""
+        return 200, operation.model_dump_json(exclude_none=True).encode()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections.add(writer)
+        try:
+            while True:
+                requestLine = await reader.readline()
+                if not requestLine:
+                    break
+                method = requestLine.split(b" ", 1)[0].decode("latin-1")
+                headers: dict[str, str] = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = headers.get("content-length", "0")
+                if not length.isascii() or not length.isdigit():
+                    # 无法确定请求体的边界，回应后关闭连接
+                    status, responseBody, keepAlive = 400, b"", False
+                elif int(length) > self.max_body_size:
+                    status, responseBody, keepAlive = 413, b"", False
+                else:
+                    body = await reader.readexactly(int(length))
+                    status, responseBody = await self._process(method, headers, body)
+                    keepAlive = headers.get("connection", "keep-alive").lower() != "close"
+                contentType = "Content-Type: application/json\r\n" if responseBody else ""
+                writer.write(f"HTTP/1.1 {status} {_REASONS.get(status, "Unknown")}\r\n{contentType}"
+                             f"Content-Length: {len(responseBody)}\r\n"
+                             f"Connection: {"keep-alive" if keepAlive else "close"}\r\n\r\n".encode() + responseBody)
+                await writer.drain()
+                if not keepAlive:
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    async def connect(self):
+        """开始监听"""
+        self.server = await asyncio.start_server(self._handle, self.endpoint.host, self.endpoint.port)
+
+    async def run(self):
+        await self.server.serve_forever()
+
+    async def disconnect(self):
+        self.server.close()
+        # 关闭实现保持的 keep-alive 连接，否则 wait_closed 会一直等待
+        for writer in list(self.connections):
+            writer.close()
+        await self.server.wait_closed()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *excInfo):
+        await self.disconnect()
@@ -0,0 +1,227 @@
+from collections import deque
+from dataclasses import dataclass
+import itertools
+import re
+from typing import Any, Awaitable, Callable, Iterable, Literal, Optional
+
+from ..event import Event
+from .base import CommunicationSessionBase, EventHandler
+
+
+type RuleKind = Literal["prefix", "keyword", "regex"]
+type MatchHandler = Callable[[CommunicationSessionBase, Event, "CommandMatch"], Awaitable[Any]]
+
+_regexMetaCharacters = frozenset(".^$*+?{}[]\\|()")
+
+
+@dataclass(eq=False)
+class Rule:
+    kind: RuleKind
+    pattern: str
+    handler: MatchHandler
+    order: int
+    regex: Optional[re.Pattern] = None
+    hint: Optional[str] = None
+    """regex 必须包含的字面量，文本中没有出现时跳过该 regex"""
+
+
+@dataclass
+class CommandMatch:
+    rule: Rule
+    position: int
+    """匹配在文本中的起始位置"""
+    argument: Optional[str] = None
+    """prefix 规则中前缀之后去掉首尾空白的部分"""
+    match: Optional[re.Match] = None
+    """regex 规则的匹配结果"""
+
+
+class _Node:
+    __slots__ = ("children", "rules", "fail", "output")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = {}
+        self.rules: list[Rule] = []
+        self.fail: Optional[_Node] = None
+        self.output: Optional[_Node] = None
+        """沿失败链最近的一个有规则的节点"""
+
+
+class _Trie:
+    def __init__(self) -> None:
+        self.root = _Node()
+
+    def insert(self, pattern: str, rule: Rule):
+        node = self.root
+        for character in pattern:
+            node = node.children.setdefault(character, _Node())
+        node.rules.append(rule)
+
+    def remove(self, pattern: str, rule: Rule):
+        path = [self.root]
+        for character in pattern:
+            path.append(path[-1].children[character])
+        path[-1].rules.remove(rule)
+        # 删除不再有用的叶节点
+        for index in range(len(pattern), 0, -1):
+            if path[index].rules or path[index].children:
+                break
+            del path[index - 1].children[pattern[index - 1]]
+
+
+def _literal_hint(pattern: str, flags: int) -> Optional[str]:
+    """regex 开头的字面量，用于在自动机中预筛选"""
+    if flags & (re.IGNORECASE | re.VERBOSE) or "|" in pattern:
+        return None
+    hint = []
+    for character in pattern:
+        if character in _regexMetaCharacters:
+            if character in "*?{" and hint:
+                # 最后一个字符被量词修饰，不一定出现
+                hint.pop()
+            break
+        hint.append(character)
+    return "".join(hint) or None
+
+
+def message_text(message: Iterable[Any]) -> str:
+    """拼接消息中所有文本段的内容，也接受 CompactSegment"""
+    return "".join(segment.data["text"] if isinstance(segment.data, dict) else segment.data.text
+                   for segment in message if segment.type == "text")
+
+
+class CommandMatcher(EventHandler):
+    """
+    多模式的命令与关键词匹配器
+
+    prefix 规则匹配文本开头（忽略开头空白）的前缀，保存在一棵前缀树中；
+    keyword 规则与 regex 的字面量前缀保存在一个 Aho-Corasick 自动机中，一次扫描即可找出所有出现的关键词，
+    只有字面量出现时才会执行对应的 regex，没有字面量的 regex 每次都会执行
+
+    增删规则时直接修改前缀树，失败链在下次匹配时重新计算
+
+    作为 EventHandler 使用时，对带 message 的事件调用所有匹配规则的处理器
+    """
+
+    def __init__(self) -> None:
+        self.prefixes = _Trie()
+        self.automaton = _Trie()
+        self.unhinted_regexes: list[Rule] = []
+        self.rules: set[Rule] = set()
+        self.counter = itertools.count()
+        self.dirty = False
+
+    def add_prefix(self, prefix: str, handler: MatchHandler) -> Rule:
+        assert prefix, "Empty prefix"
+        rule = Rule("prefix", prefix, handler, next(self.counter))
+        self.prefixes.insert(prefix, rule)
+        self.rules.add(rule)
+        return rule
+
+    def add_keyword(self, keyword: str, handler: MatchHandler) -> Rule:
+        assert keyword, "Empty keyword"
+        rule = Rule("keyword", keyword, handler, next(self.counter))
+        self.automaton.insert(keyword, rule)
+        self.rules.add(rule)
+        self.dirty = True
+        return rule
+
+    def add_regex(self, pattern: str, handler: MatchHandler, flags: int = 0) -> Rule:
+        regex = re.compile(pattern, flags)
+        rule = Rule("regex", pattern, handler, next(self.counter), regex, _literal_hint(pattern, flags))
+        if rule.hint is not None:
+            self.automaton.insert(rule.hint, rule)
+            self.dirty = True
+        else:
+            self.unhinted_regexes.append(rule)
+        self.rules.add(rule)
+        return rule
+
+    def remove(self, rule: Rule):
+        self.rules.remove(rule)
+        if rule.kind == "prefix":
+            self.prefixes.remove(rule.pattern, rule)
+        elif rule.kind == "keyword" or rule.hint is not None:
+            self.automaton.remove(rule.hint or rule.pattern, rule)
+            self.dirty = True
+        else:
+            self.unhinted_regexes.remove(rule)
+
+    def _build(self):
+        root = self.automaton.root
+        root.fail = None
+        queue: deque[_Node] = deque()
+        for child in root.children.values():
+            child.fail = root
+            child.output = None
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for character, child in node.children.items():
+                fail = node.fail
+                while fail is not None and character not in fail.children:
+                    fail = fail.fail
+                child.fail = fail.children[character] if fail is not None else root
+                child.output = child.fail if child.fail.rules else child.fail.output
+                queue.append(child)
+        self.dirty = False
+
+    def _match_prefixes(self, text: str, result: list[CommandMatch]):
+        start = len(text) - len(text.lstrip())
+        node = self.prefixes.root
+        for index in range(start, len(text)):
+            node = node.children.get(text[index])
+            if node is None:
+                break
+            for rule in node.rules:
+                result.append(CommandMatch(rule, start, argument=text[index + 1:].strip()))
+
+    def _match_automaton(self, text: str, result: list[CommandMatch]):
+        if self.dirty:
+            self._build()
+        root = self.automaton.root
+        if not root.children:
+            return
+        node = root
+        found: dict[Rule, int] = {}
+        for index, character in enumerate(text):
+            while node is not root and character not in node.children:
+                node = node.fail
+            node = node.children.get(character, root)
+            output = node if node.rules else node.output
+            while output is not None:
+                for rule in output.rules:
+                    if rule not in found:
+                        found[rule] = index + 1 - len(rule.hint or rule.pattern)
+                output = output.output
+        for rule, position in found.items():
+            if rule.kind == "keyword":
+                result.append(CommandMatch(rule, position))
+            else:
+                match = rule.regex.search(text, position)
+                if match is not None:
+                    result.append(CommandMatch(rule, match.start(), match=match))
+
+    def match(self, message: str | Iterable[Any]) -> list[CommandMatch]:
+        """对文本或消息的文本部分执行一次匹配，返回所有命中的规则，按注册顺序排列"""
+        text = message if isinstance(message, str) else message_text(message)
+        result: list[CommandMatch] = []
+        self._match_prefixes(text, result)
+        self._match_automaton(text, result)
+        for rule in self.unhinted_regexes:
+            match = rule.regex.search(text)
+            if match is not None:
+                result.append(CommandMatch(rule, match.start(), match=match))
+        if len(result) > 1:
+            result.sort(key=lambda item: item.rule.order)
+        return result
+
+    async def on_event(self, session: CommunicationSessionBase, event: Event):
+        message = getattr(event, "message", None)
+        if not message:
+            return
+        for match in self.match(message):
+            try:
+                await match.rule.handler(session, event, match)
+            except Exception as e:
+                print(f"Command handler {match.rule.handler!r} failed on {match.rule.pattern!r}: {e!r}")
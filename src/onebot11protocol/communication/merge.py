@@ -0,0 +1,155 @@
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import time
+from typing import Any, Hashable, Optional
+
+from ..api.public import GetLoginInfoReq, SendGroupMsgReq, SendPrivateMsgReq
+from ..api.shared import APIRequest
+from ..message import Message
+from ..message.segment import NodeCustomData, NodeSegment, TextData, TextSegment
+from .base import CommunicationSessionBase, EventHandler, SessionLayer
+
+
+MERGEABLE_SEGMENT_TYPES = frozenset(("text", "face", "image", "at"))
+"""可以与其他消息拼接的消息段类型，含有其他类型（如回复、合并转发、音乐分享）的消息总是单独发送"""
+
+
+@dataclass(eq=False)
+class _Batch:
+    requests: list[SendGroupMsgReq | SendPrivateMsgReq] = field(default_factory=list)
+    futures: list[asyncio.Future] = field(default_factory=list)
+    options: dict[str, Any] = field(default_factory=dict)
+    timer: Optional[asyncio.TimerHandle] = None
+
+    def add(self, request: SendGroupMsgReq | SendPrivateMsgReq) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.requests.append(request)
+        self.futures.append(future)
+        return future
+
+
+def _text_length(message: Message) -> int:
+    return sum(len(segment.data.text) for segment in message if segment.type == "text")
+
+
+class MessageMergingSession(SessionLayer):
+    """
+    合并发往同一对象的短消息的 session 中间层
+
+    发往某个群或用户的消息距上一条不足 window 秒时，不立即发送，而是等待 window 秒，
+    期间发往同一对象的消息以 separator 分隔拼接为一条消息发送，不频繁发送的对象不会增加延迟
+    拼接后文本超过 max_length 或消息段超过 max_segments 时，改为以合并转发的形式发送，
+    每条原消息是一个自定义节点，节点的发送者为 forward_sender，未指定时为当前登录的账号
+    一批最多合并 max_batch 条消息，所有被合并的调用方都得到同一个 message_id
+
+    只合并 SendGroupMsgReq 与 SendPrivateMsgReq 中仅含 MERGEABLE_SEGMENT_TYPES 的消息，
+    其他请求直接发送，发往同一对象的其他消息会先发出已合并的部分，以保持顺序
+    """
+
+    def __init__(self, inner: CommunicationSessionBase, eventHandler: Optional[EventHandler] = None,
+                 window: float = 0.05, max_batch: int = 10, max_length: int = 1000, max_segments: int = 50,
+                 separator: Optional[str] = "\n", forward_sender: Optional[tuple[int, str]] = None) -> None:
+        super().__init__(inner, eventHandler)
+        self.window = window
+        self.max_batch = max_batch
+        self.max_length = max_length
+        self.max_segments = max_segments
+        self.separator = separator
+        self.forward_sender = forward_sender
+        self.batches: dict[Hashable, _Batch] = {}
+        self.flushing: dict[Hashable, asyncio.Task] = {}
+        # 按发送时间排序，超过 window 的记录与没有记录等价，随时清除
+        self.last_sent: OrderedDict[Hashable, float] = OrderedDict()
+        self.merged = 0
+        self.forwarded = 0
+
+    @staticmethod
+    def _target(request: APIRequest) -> Optional[Hashable]:
+        if not isinstance(request, (SendGroupMsgReq, SendPrivateMsgReq)):
+            return None
+        # 其他参数（如 auto_escape）不同的请求不合并
+        return (type(request), *sorted(request.model_dump(exclude={"message"}).items()))
+
+    async def send[Name, RespType](self, request: APIRequest[Name, RespType], **options) -> RespType:
+        target = self._target(request)
+        if target is None:
+            return await self.inner.send(request, **options)
+
+        now = time.monotonic()
+        lastSent = self.last_sent.pop(target, None)
+        while self.last_sent and now - next(iter(self.last_sent.values())) >= self.window:
+            self.last_sent.popitem(last=False)
+        self.last_sent[target] = now
+        batch = self.batches.get(target)
+        mergeable = all(segment.type in MERGEABLE_SEGMENT_TYPES for segment in request.message)
+        if not mergeable or (batch is None and (lastSent is None or now - lastSent >= self.window)):
+            # 单独发送，但排在已合并的消息之后
+            self._schedule_flush(target)
+            single = _Batch(options=options)
+            future = single.add(request)
+            self._start(target, single)
+            return await future
+
+        if batch is None:
+            batch = self.batches[target] = _Batch(options=options)
+            batch.timer = asyncio.get_running_loop().call_later(self.window, self._schedule_flush, target)
+        future = batch.add(request)
+        if len(batch.requests) >= self.max_batch:
+            self._schedule_flush(target)
+        return await future
+
+    def _schedule_flush(self, target: Hashable):
+        batch = self.batches.pop(target, None)
+        if batch is not None:
+            batch.timer.cancel()
+            self._start(target, batch)
+
+    def _start(self, target: Hashable, batch: _Batch):
+        # 同一对象的批次依次发送
+        previous = self.flushing.get(target)
+        task = asyncio.get_running_loop().create_task(self._send_batch(batch, previous))
+        self.flushing[target] = task
+        task.add_done_callback(lambda task: self.flushing.pop(target, None) if self.flushing.get(target) is task else None)
+
+    async def _send_batch(self, batch: _Batch, previous: Optional[asyncio.Task]):
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        try:
+            response = await self.inner.send(await self._merge(batch.requests), **batch.options)
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.merged += len(batch.requests) - 1
+        for future in batch.futures:
+            if not future.done():
+                future.set_result(response)
+
+    async def _merge(self, requests: list[SendGroupMsgReq | SendPrivateMsgReq]) -> APIRequest:
+        if len(requests) == 1:
+            return requests[0]
+        message: Message = []
+        for request in requests:
+            if message and self.separator:
+                message.append(TextSegment(data=TextData(text=self.separator)))
+            message.extend(request.message)
+        if _text_length(message) > self.max_length or len(message) > self.max_segments:
+            userId, nickname = await self._forward_sender()
+            message = [NodeSegment(data=NodeCustomData(user_id=str(userId), nickname=nickname, content=request.message))
+                       for request in requests]
+            self.forwarded += 1
+        return requests[0].model_copy(update={"message": message})
+
+    async def _forward_sender(self) -> tuple[int, str]:
+        if self.forward_sender is None:
+            login = await self.inner.send(GetLoginInfoReq())
+            self.forward_sender = (login.user_id, login.nickname)
+        return self.forward_sender
+
+    async def disconnect(self):
+        for target in list(self.batches):
+            self._schedule_flush(target)
+        await asyncio.gather(*self.flushing.values(), return_exceptions=True)
+        await super().disconnect()
@@ -0,0 +1,279 @@
+import asyncio
+from bisect import bisect_left
+from dataclasses import dataclass, field
+import json
+import math
+import time
+from typing import Any, Callable, Literal, Optional
+
+from ..event import Event
+from ..event.base import EventDiscriminatorMap
+
+
+type MetricKind = Literal["counter", "gauge", "histogram"]
+type Labels = tuple[str, ...]
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+"""api 往返与事件处理耗时的桶上界，单位秒"""
+DECODE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+"""事件解码耗时的桶上界，单位秒"""
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        # 最后一项对应 +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, fraction: float) -> float:
+        """按桶内线性分布估计分位数，落在 +Inf 桶时返回最大的有限上界"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+@dataclass(eq=False)
+class MetricFamily:
+    """
+    一个指标及其所有标签组合的值
+
+    callbacks 不为空时，值在导出时由各个 callback 读取，每个 callback 返回单个数值或 标签 -> 数值，
+    同一标签的值相加，因此共享同一个 registry 的多个组件（如两个 dispatcher）导出的是总和
+    """
+    name: str
+    kind: MetricKind
+    help: str
+    label_names: tuple[str, ...] = ()
+    buckets: tuple[float, ...] = LATENCY_BUCKETS
+    callbacks: list[Callable[[], float | dict[Labels, float]]] = field(default_factory=list)
+    values: dict[Labels, Any] = field(default_factory=dict)
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def set(self, value: float, labels: Labels = ()):
+        self.values[labels] = value
+
+    def observe(self, value: float, labels: Labels = ()):
+        histogram = self.values.get(labels)
+        if histogram is None:
+            histogram = self.values[labels] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def collect(self) -> dict[Labels, Any]:
+        if not self.callbacks:
+            return self.values
+        total: dict[Labels, float] = {}
+        for callback in self.callbacks:
+            value = callback()
+            for labels, amount in (value.items() if isinstance(value, dict) else (((), value),)):
+                total[labels] = total.get(labels, 0) + amount
+        return total
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _label_text(names: tuple[str, ...], values: Labels, extra: str = "") -> str:
+    parts = [f"{name}=\"{_escape_label(str(value))}\"" for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    指标的注册表，可导出为 Prometheus 文本格式或 snapshot 字典
+
+    同名的指标只注册一次，重复注册返回已有的 MetricFamily，
+    其他组件的状态可以注册为带 callback 的指标，重复注册时 callback 被追加，导出各 callback 的总和，如
+    registry.gauge("onebot_scheduler_queue_depth", "...", callback=lambda: scheduled.queue_depth)
+    """
+
+    def __init__(self) -> None:
+        self.families: dict[str, MetricFamily] = {}
+        self.created = time.time()
+
+    def _register(self, name: str, kind: MetricKind, help: str, labelNames: tuple[str, ...], **options) -> MetricFamily:
+        callback = options.pop("callback", None)
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = MetricFamily(name, kind, help, labelNames, **options)
+        elif family.kind != kind or family.label_names != labelNames:
+            raise ValueError(f"Metric {name} already registered as {family.kind} with labels {family.label_names}")
+        if callback is not None:
+            family.callbacks.append(callback)
+        return family
+
+    def counter(self, name: str, help: str, label_names: tuple[str, ...] = (),
+                callback: Optional[Callable[[], Any]] = None) -> MetricFamily:
+        options = {"callback": callback} if callback is not None else {}
+        return self._register(name, "counter", help, label_names, **options)
+
+    def gauge(self, name: str, help: str, label_names: tuple[str, ...] = (),
+              callback: Optional[Callable[[], Any]] = None) -> MetricFamily:
+        options = {"callback": callback} if callback is not None else {}
+        return self._register(name, "gauge", help, label_names, **options)
+
+    def histogram(self, name: str, help: str, label_names: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = LATENCY_BUCKETS) -> MetricFamily:
+        return self._register(name, "histogram", help, label_names, buckets=buckets)
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        所有指标当前值的 JSON 兼容字典
+
+        直方图给出 count、sum、估计的 p50/p90/p99 与各桶的累计数
+        """
+        result: dict[str, Any] = {}
+        for family in self.families.values():
+            samples = []
+            for labels, value in family.collect().items():
+                if isinstance(value, Histogram):
+                    cumulative = 0
+                    buckets = {}
+                    for bound, count in zip((*value.buckets, math.inf), value.counts):
+                        cumulative += count
+                        buckets[_number(bound)] = cumulative
+                    value = {"count": value.count, "sum": value.sum, "p50": value.quantile(0.5),
+                             "p90": value.quantile(0.9), "p99": value.quantile(0.99), "buckets": buckets}
+                samples.append({"labels": dict(zip(family.label_names, labels)), "value": value})
+            result[family.name] = {"type": family.kind, "help": family.help, "samples": samples}
+        return result
+
+    def to_prometheus(self) -> str:
+        """Prometheus 文本格式（0.0.4）"""
+        lines = []
+        for family in self.families.values():
+            lines.append(f"# HELP {family.name} {family.help.replace("\\", "\\\\").replace("\n", "\\n")}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for labels, value in family.collect().items():
+                if isinstance(value, Histogram):
+                    cumulative = 0
+                    for bound, count in zip((*value.buckets, math.inf), value.counts):
+                        cumulative += count
+                        lines.append(f"{family.name}_bucket{_label_text(family.label_names, labels, f"le=\"{_number(bound)}\"")} "
+                                     f"{cumulative}")
+                    labelText = _label_text(family.label_names, labels)
+                    lines.append(f"{family.name}_sum{labelText} {_number(value.sum)}")
+                    lines.append(f"{family.name}_count{labelText} {value.count}")
+                else:
+                    lines.append(f"{family.name}{_label_text(family.label_names, labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class ProtocolMetrics:
+    """
+    session、解码器与 dispatcher 上报的指标，传给 WebSocketSession、HTTPSession、HTTPPostReceiver、
+    EventDispatcher 或 ScheduledSession 的 metrics 参数即可启用，多个组件可以共享同一个 ProtocolMetrics
+
+    events_total 按 post_type 与 discriminator 的值（如 message_type、notice_type）计数，
+    每秒事件数由 Prometheus 的 rate() 计算
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None) -> None:
+        self.registry = registry = registry or MetricsRegistry()
+        self.api_latency = registry.histogram(
+            "onebot_api_latency_seconds", "API round trip time by action", ("action",))
+        self.api_failures = registry.counter(
+            "onebot_api_failures_total", "Failed API calls by action and reason (timeout, retcode, status)", ("action", "reason"))
+        self.api_in_flight = registry.gauge(
+            "onebot_api_in_flight", "API calls waiting for a response")
+        self.events = registry.counter(
+            "onebot_events_total", "Received events by post_type and detail type", ("post_type", "detail_type"))
+        self.decode_time = registry.histogram(
+            "onebot_event_decode_seconds", "Time spent decoding and validating an event frame", ("post_type",),
+            buckets=DECODE_BUCKETS)
+        self.validation_failures = registry.counter(
+            "onebot_event_validation_failures_total", "Event frames discarded because validation failed", ("post_type",))
+        self.handler_duration = registry.histogram(
+            "onebot_handler_duration_seconds", "Event handler run time by post_type", ("post_type",))
+        self.handler_failures = registry.counter(
+            "onebot_handler_failures_total", "Event handlers that raised by post_type", ("post_type",))
+        self.dispatch_dropped = registry.counter(
+            "onebot_dispatch_dropped_total", "Events dropped because the dispatcher queue was full")
+        self.scheduler_wait = registry.histogram(
+            "onebot_scheduler_wait_seconds", "Time API requests waited in the scheduler queue by priority", ("priority",))
+
+    def record_event(self, event: Event, decodeTime: float):
+        postType = event.post_type
+        self.events.inc((postType, getattr(event, EventDiscriminatorMap[postType], "")))
+        self.decode_time.observe(decodeTime, (postType,))
+
+
+class MetricsServer:
+    """
+    以 HTTP 导出指标的本地服务器，GET /metrics 返回 Prometheus 文本格式，GET /metrics.json 返回 snapshot
+    """
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9464) -> None:
+        self.registry = registry
+        self.host = host
+        self.requested_port = port
+        self.server: Optional[asyncio.Server] = None
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.requested_port)
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *excInfo):
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            requestLine = await reader.readline()
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            method, path, *_ = requestLine.decode("latin-1").split(" ") + ["", ""]
+            path = path.split("?", 1)[0]
+            if method != "GET":
+                status, contentType, body = "405 Method Not Allowed", "text/plain", b""
+            elif path == "/metrics":
+                status, contentType, body = "200 OK", "text/plain; version=0.0.4", self.registry.to_prometheus().encode()
+            elif path == "/metrics.json":
+                status, contentType, body = "200 OK", "application/json", json.dumps(self.registry.snapshot()).encode()
+            else:
+                status, contentType, body = "404 Not Found", "text/plain", b""
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {contentType}\r\nContent-Length: {len(body)}\r\n"
+                         f"Connection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,238 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import mmap
+import os
+import struct
+import time
+from typing import BinaryIO, Iterator, Optional
+import zlib
+from pydantic import ValidationError
+
+from .base import CommunicationSessionBase, EventHandler
+from .decoder import EventDecoder, Frame, get_default_decoder
+from .dispatch import EventDispatcher
+
+
+SEGMENT_PREFIX = "frames-"
+SEGMENT_SUFFIX = ".log"
+
+_blockHeader = struct.Struct("<4sII")
+"""magic、压缩后的长度、帧数"""
+_blockMagic = b"OBF1"
+_frameHeader = struct.Struct("<qI")
+"""time.time_ns() 的时间戳、帧的字节数"""
+
+
+def _segment_index(name: str) -> Optional[int]:
+    if not name.startswith(SEGMENT_PREFIX) or not name.endswith(SEGMENT_SUFFIX):
+        return None
+    try:
+        return int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+    except ValueError:
+        return None
+
+
+def segment_paths(directory: str) -> list[str]:
+    """目录中按顺序排列的分段文件"""
+    indexed = [(index, name) for name in os.listdir(directory) if (index := _segment_index(name)) is not None]
+    return [os.path.join(directory, name) for _, name in sorted(indexed)]
+
+
+class FrameRecorder:
+    """
+    将收到的原始帧连同时间戳追加到分段、压缩的日志中
+
+    日志是 directory 中的一组分段文件，每个文件由若干独立的 zlib 压缩块组成，块内是 (时间戳, 长度, 帧) 的序列，
+    分段超过 segment_size 字节时开始新的分段，已有的分段不会被修改
+    record 只把帧放入内存缓冲，缓冲超过 block_size 字节或第一帧等待超过 flush_interval 秒时，
+    由单独的线程编码、压缩并写入，接收循环不会等待磁盘
+    """
+
+    def __init__(self, directory: str, segment_size: int = 64 << 20, block_size: int = 256 << 10,
+                 flush_interval: float = 1.0, compress_level: int = 1) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_size = segment_size
+        self.block_size = block_size
+        self.flush_interval = flush_interval
+        self.compress_level = compress_level
+        existing = segment_paths(directory)
+        self.segment_index = _segment_index(os.path.basename(existing[-1])) + 1 if existing else 0
+        self.file: Optional[BinaryIO] = None
+        self.buffer: list[tuple[int, Frame]] = []
+        self.buffered_bytes = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+        # 单线程保证块按顺序写入
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="frame-recorder")
+        self.frames = 0
+        self.blocks = 0
+        self.closed = False
+
+    def record(self, frame: Frame):
+        if self.closed:
+            return
+        self.buffer.append((time.time_ns(), frame))
+        self.buffered_bytes += len(frame)
+        self.frames += 1
+        if self.buffered_bytes >= self.block_size:
+            self.flush()
+        elif self.timer is None and self.flush_interval is not None:
+            try:
+                self.timer = asyncio.get_running_loop().call_later(self.flush_interval, self.flush)
+            except RuntimeError:
+                # 不在事件循环中时只按大小刷新
+                pass
+
+    def flush(self):
+        """将缓冲的帧交给写线程"""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.buffer:
+            return
+        buffer, self.buffer, self.buffered_bytes = self.buffer, [], 0
+        self.executor.submit(self._write_block, buffer)
+
+    def _write_block(self, buffer: list[tuple[int, Frame]]):
+        try:
+            parts = []
+            for timestamp, frame in buffer:
+                data = frame.encode() if isinstance(frame, str) else frame
+                parts.append(_frameHeader.pack(timestamp, len(data)))
+                parts.append(data)
+            compressed = zlib.compress(b"".join(parts), self.compress_level)
+            if self.file is None or self.file.tell() >= self.segment_size:
+                self._rotate()
+            self.file.write(_blockHeader.pack(_blockMagic, len(compressed), len(buffer)))
+            self.file.write(compressed)
+            self.file.flush()
+            self.blocks += 1
+        except Exception as e:
+            print(f"Cannot record {len(buffer)} frames: {e!r}, discarding")
+
+    def _rotate(self):
+        if self.file is not None:
+            self.file.close()
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{self.segment_index:08d}{SEGMENT_SUFFIX}")
+        self.segment_index += 1
+        self.file = open(path, "ab")
+
+    def close(self):
+        """写出剩余的帧并关闭日志"""
+        if self.closed:
+            return
+        self.flush()
+        self.closed = True
+        self._shutdown()
+
+    async def aclose(self):
+        """同 close，但不阻塞事件循环"""
+        if self.closed:
+            return
+        # 定时器只能在事件循环的线程中取消，因此 flush 在这里调用，只有等待写线程与关闭文件交给其他线程
+        self.flush()
+        self.closed = True
+        await asyncio.get_running_loop().run_in_executor(None, self._shutdown)
+
+    def _shutdown(self):
+        self.executor.shutdown(wait=True)
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excInfo):
+        self.close()
+
+
+def read_segment(path: str) -> Iterator[tuple[int, bytes]]:
+    """以 mmap 读取一个分段，逐帧返回 (时间戳, 帧)，末尾不完整的块（如写入时崩溃）被忽略"""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                offset = 0
+                while offset + _blockHeader.size <= len(mapped):
+                    magic, length, count = _blockHeader.unpack_from(mapped, offset)
+                    offset += _blockHeader.size
+                    if magic != _blockMagic or offset + length > len(mapped):
+                        break
+                    block = zlib.decompress(view[offset:offset + length])
+                    offset += length
+                    position = 0
+                    for _ in range(count):
+                        timestamp, size = _frameHeader.unpack_from(block, position)
+                        position += _frameHeader.size
+                        yield timestamp, block[position:position + size]
+                        position += size
+            finally:
+                view.release()
+
+
+@dataclass
+class ReplayStats:
+    frames: int = 0
+    events: int = 0
+    skipped: int = 0
+    """不是事件的帧，如 api 响应"""
+    invalid: int = 0
+    duration: float = 0
+
+
+class FrameReplayer:
+    """
+    回放 FrameRecorder 录制的日志
+
+    帧按录制时的间隔除以 speed 送入解码器与 dispatcher，speed 为 None 时不等待，尽可能快地回放，
+    处理器收到的 session 为 replay 的 session 参数
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    def frames(self) -> Iterator[tuple[int, bytes]]:
+        for path in segment_paths(self.directory):
+            yield from read_segment(path)
+
+    async def replay(self, handler: EventHandler, session: Optional[CommunicationSessionBase] = None, speed: Optional[float] = 1.0,
+                     decoder: Optional[EventDecoder] = None, dispatcher: Optional[EventDispatcher] = None) -> ReplayStats:
+        """回放所有帧并等待处理完毕"""
+        assert speed is None or speed > 0, "Invalid replay speed"
+        decoder = decoder or get_default_decoder()
+        ownsDispatcher = dispatcher is None
+        dispatcher = dispatcher or EventDispatcher(overflow_policy="block")
+        stats = ReplayStats()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        firstTimestamp: Optional[int] = None
+        try:
+            for timestamp, frame in self.frames():
+                stats.frames += 1
+                if speed is not None:
+                    if firstTimestamp is None:
+                        firstTimestamp = timestamp
+                    delay = start + (timestamp - firstTimestamp) / 1e9 / speed - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                postType = decoder.post_type_of(frame)
+                if postType is None:
+                    stats.skipped += 1
+                    continue
+                try:
+                    event = decoder.decode(frame, postType)
+                except ValidationError:
+                    stats.invalid += 1
+                    continue
+                stats.events += 1
+                await dispatcher.submit(session, handler, event)
+            await dispatcher.join()
+        finally:
+            if ownsDispatcher:
+                await dispatcher.stop()
+        stats.duration = loop.time() - start
+        return stats
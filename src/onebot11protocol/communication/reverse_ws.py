@@ -0,0 +1,135 @@
+import asyncio
+from dataclasses import dataclass
+import hmac
+from http import HTTPStatus
+from typing import Any, Optional
+import websockets
+
+from .base import CommunicationBase, EventHandler
+from .decoder import EventDecoder, get_default_decoder
+from .dispatch import EventDispatcher
+from .ws import WebSocketSession
+
+
+@dataclass
+class ReverseWebSocketEndpoint:
+    host: str = "127.0.0.1"
+    port: int = 8080
+    access_token: Optional[str] = None
+
+
+class ReverseWebSocketSession(WebSocketSession):
+    """
+    由 OneBot 实现主动连入的 session，对应一个 X-Self-ID
+
+    同一账号重新连入时复用同一个 session 对象，处理器持有的引用在重连后仍然有效，
+    连接只能由实现发起，因此不支持 reconnect_policy
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, endpoint: ReverseWebSocketEndpoint, self_id: int,
+                 eventHandler: EventHandler, **sessionOptions) -> None:
+        super().__init__(loop, endpoint, eventHandler, **sessionOptions)
+        self.self_id = self_id
+        self.connection_lock = asyncio.Lock()
+
+    async def connect(self):
+        raise Exception("Reverse websocket session is connected by the implementation, cannot connect actively")
+
+    async def receive_events(self, websocket: Any):
+        """处理 X-Client-Role 为 Event 的连接，这类连接只上报事件"""
+        await self._receive(websocket)
+
+
+class ReverseWebSocketServer:
+    """
+    反向 WebSocket 服务器
+
+    在一个进程中接受多个 OneBot 实现的连接，按 X-Self-ID 路由到各自的 session，
+    所有 session 共享同一个事件循环、解码器与 dispatcher
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, endpoint: ReverseWebSocketEndpoint, eventHandler: EventHandler,
+                 decoder: Optional[EventDecoder] = None, dispatcher: Optional[EventDispatcher] = None, **sessionOptions) -> None:
+        if sessionOptions.get("reconnect_policy") is not None:
+            # 断开后由实现重新连入，session 无法主动重连
+            raise ValueError("reconnect_policy is not supported by reverse websocket sessions")
+        self.loop = loop
+        self.endpoint = endpoint
+        self.event_handler = eventHandler
+        self.decoder = decoder or get_default_decoder()
+        self.dispatcher = dispatcher or EventDispatcher(metrics=sessionOptions.get("metrics"))
+        self.session_options = sessionOptions
+        self.sessions: dict[int, ReverseWebSocketSession] = {}
+        self.server = None
+
+    @property
+    def port(self) -> int:
+        """实际监听的端口，endpoint.port 为 0 时由系统分配"""
+        return self.server.sockets[0].getsockname()[1]
+
+    def get_session(self, selfId: int) -> ReverseWebSocketSession:
+        session = self.sessions.get(selfId)
+        if session is None:
+            session = self.sessions[selfId] = ReverseWebSocketSession(
+                self.loop, self.endpoint, selfId, self.event_handler,
+                decoder=self.decoder, dispatcher=self.dispatcher, **self.session_options)
+        return session
+
+    def _process_request(self, connection: Any, request: Any):
+        if self.endpoint.access_token:
+            authorization = request.headers.get("Authorization", "")
+            if not hmac.compare_digest(authorization.encode(), f"Bearer {self.endpoint.access_token}".encode()):
+                return connection.respond(HTTPStatus.UNAUTHORIZED, "Invalid access token\n")
+        try:
+            int(request.headers["X-Self-ID"])
+        except (KeyError, ValueError):
+            return connection.respond(HTTPStatus.BAD_REQUEST, "Missing or ill formed X-Self-ID\n")
+        return None
+
+    async def _handle(self, websocket: Any):
+        headers = websocket.request.headers
+        session = self.get_session(int(headers["X-Self-ID"]))
+        role = headers.get("X-Client-Role", "Universal")
+        try:
+            if role == "Event":
+                await session.receive_events(websocket)
+                return
+            if session.is_listening:
+                # 同一账号的新连接替换旧连接，旧连接上的 run 随之结束
+                await session.websocket.close()
+            async with session.connection_lock:
+                session.websocket = websocket
+                await session.run()
+        except websockets.ConnectionClosed:
+            pass
+
+    async def connect(self):
+        """开始监听"""
+        self.server = await websockets.serve(self._handle, self.endpoint.host, self.endpoint.port,
+                                             process_request=self._process_request)
+
+    async def run(self):
+        await self.server.serve_forever()
+
+    async def disconnect(self):
+        self.server.close()
+        await self.server.wait_closed()
+        await self.dispatcher.stop()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *excInfo):
+        await self.disconnect()
+
+
+class ReverseWebSocketCommunication(CommunicationBase[ReverseWebSocketEndpoint, ReverseWebSocketServer]):
+    def __init__(self, **sessionOptions) -> None:
+        """sessionOptions 会原样传给每个连入账号的 ReverseWebSocketSession"""
+        super().__init__()
+        self.session_options = sessionOptions
+
+    def create(self, endpoint: ReverseWebSocketEndpoint, eventHandler: EventHandler) -> ReverseWebSocketServer:
+        loop = asyncio.get_event_loop()
+        return ReverseWebSocketServer(loop, endpoint, eventHandler, **self.session_options)
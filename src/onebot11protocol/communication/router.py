@@ -0,0 +1,147 @@
+from dataclasses import dataclass, field
+import itertools
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from ..event import Event
+from ..event.base import EventDiscriminatorMap
+from .base import CommunicationSessionBase, EventHandler
+
+
+type RouteHandler = Callable[[CommunicationSessionBase, Event], Awaitable[Any]]
+
+
+@dataclass(eq=False)
+class Route:
+    handler: RouteHandler
+    post_type: Optional[str]
+    detail_type: Optional[str]
+    sub_type: Optional[str]
+    group_ids: Optional[frozenset[int]]
+    user_ids: Optional[frozenset[int]]
+    order: int
+
+
+@dataclass
+class _Bucket:
+    """同一 (post_type, detail_type, sub_type) 下的路由，再按 group_id、user_id 建立索引"""
+    unfiltered: list[Route] = field(default_factory=list)
+    by_group: dict[int, list[Route]] = field(default_factory=dict)
+    by_user: dict[int, list[Route]] = field(default_factory=dict)
+
+    def add(self, route: Route):
+        if route.group_ids is not None:
+            for groupId in route.group_ids:
+                self.by_group.setdefault(groupId, []).append(route)
+        elif route.user_ids is not None:
+            for userId in route.user_ids:
+                self.by_user.setdefault(userId, []).append(route)
+        else:
+            self.unfiltered.append(route)
+
+    def collect(self, groupId: Optional[int], userId: Optional[int], result: list[Route]):
+        result.extend(self.unfiltered)
+        if groupId is not None and self.by_group:
+            # 同时限定了 user_ids 的路由只登记在 by_group 中，在这里补充检查
+            result.extend(route for route in self.by_group.get(groupId, ())
+                          if route.user_ids is None or userId in route.user_ids)
+        if userId is not None and self.by_user:
+            result.extend(self.by_user.get(userId, ()))
+
+
+type _Index = dict[Optional[str], dict[Optional[str], dict[Optional[str], _Bucket]]]
+
+
+class EventRouter(EventHandler):
+    """
+    按事件类型分派的 EventHandler
+
+    路由按 post_type、detail_type（即 EventDiscriminatorMap 中记录的 message_type、notice_type 等字段的值）、
+    sub_type 注册，为 None 的条件匹配任意值，另外可以限定 group_ids、user_ids。
+    注册的路由在首次分派时编译为嵌套的 dict 索引，每个事件只需常数次查找，与路由数量无关
+
+    匹配的处理器按注册顺序依次调用，处理器抛出的异常不影响后续处理器，
+    on_event 返回第一个非 None 的返回值，可用作 HTTP POST 上报的快速操作
+    """
+
+    def __init__(self) -> None:
+        self.routes: list[Route] = []
+        self.index: Optional[_Index] = None
+        self.counter = itertools.count()
+
+    def add(self, handler: RouteHandler, post_type: Optional[str] = None, detail_type: Optional[str] = None, sub_type: Optional[str] = None,
+            group_ids: Optional[Iterable[int]] = None, user_ids: Optional[Iterable[int]] = None) -> Route:
+        if post_type is not None and post_type not in EventDiscriminatorMap:
+            raise ValueError(f"Unknown post_type: {post_type}")
+        if post_type is None and (detail_type is not None or sub_type is not None):
+            raise ValueError("detail_type and sub_type require post_type")
+        route = Route(handler, post_type, detail_type, sub_type,
+                      frozenset(group_ids) if group_ids is not None else None,
+                      frozenset(user_ids) if user_ids is not None else None,
+                      next(self.counter))
+        self.routes.append(route)
+        self.index = None
+        return route
+
+    def on(self, post_type: Optional[str] = None, detail_type: Optional[str] = None, sub_type: Optional[str] = None,
+           group_ids: Optional[Iterable[int]] = None, user_ids: Optional[Iterable[int]] = None):
+        """add 的装饰器形式"""
+        def decorator(handler: RouteHandler) -> RouteHandler:
+            self.add(handler, post_type, detail_type, sub_type, group_ids, user_ids)
+            return handler
+        return decorator
+
+    def remove(self, route: Route):
+        self.routes.remove(route)
+        self.index = None
+
+    def compile(self) -> _Index:
+        index: _Index = {}
+        for route in self.routes:
+            buckets = index.setdefault(route.post_type, {}).setdefault(route.detail_type, {})
+            buckets.setdefault(route.sub_type, _Bucket()).add(route)
+        self.index = index
+        return index
+
+    def match(self, event: Event) -> list[Route]:
+        """返回匹配事件的路由，按注册顺序排列"""
+        index = self.index if self.index is not None else self.compile()
+        postType = event.post_type
+        detailType = getattr(event, EventDiscriminatorMap[postType])
+        subType = getattr(event, "sub_type", None)
+        groupId = getattr(event, "group_id", None)
+        userId = getattr(event, "user_id", None)
+
+        result: list[Route] = []
+        for postKey in (postType, None):
+            detailIndex = index.get(postKey)
+            if detailIndex is None:
+                continue
+            for detailKey in (detailType, None):
+                subIndex = detailIndex.get(detailKey)
+                if subIndex is None:
+                    continue
+                for subKey in (subType, None):
+                    bucket = subIndex.get(subKey)
+                    if bucket is not None:
+                        bucket.collect(groupId, userId, result)
+                    if subKey is None:
+                        break
+                if detailKey is None:
+                    break
+            if postKey is None:
+                break
+        if len(result) > 1:
+            result.sort(key=lambda route: route.order)
+        return result
+
+    async def on_event(self, session: CommunicationSessionBase, event: Event):
+        response = None
+        for route in self.match(event):
+            try:
+                result = await route.handler(session, event)
+            except Exception as e:
+                print(f"Event handler {route.handler!r} failed on {type(event).__name__}: {e!r}")
+                continue
+            if response is None:
+                response = result
+        return response
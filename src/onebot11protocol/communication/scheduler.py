@@ -0,0 +1,279 @@
+import asyncio
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+from pydantic import BaseModel
+
+from ..api.shared import APIRequest
+from ..event import Event
+from .base import CommunicationSessionBase, EventHandler, SessionLayer
+from .metrics import ProtocolMetrics
+from .writer import PRIORITY_ACTIONS
+from .ws import _is_idempotent_action
+
+
+HIGH_PRIORITY = 0
+NORMAL_PRIORITY = 1
+LOW_PRIORITY = 2
+
+
+@dataclass
+class RateLimit:
+    rate: float
+    """每秒补充的令牌数"""
+    burst: float
+    """桶的容量，即允许的突发请求数"""
+
+
+DEFAULT_ACCOUNT_LIMIT = RateLimit(rate=5, burst=10)
+DEFAULT_TARGET_LIMIT = RateLimit(rate=1, burst=5)
+DEFAULT_ACTION_LIMITS: dict[str, RateLimit] = {
+    "send_like": RateLimit(rate=0.2, burst=1),
+    "set_group_kick": RateLimit(rate=0.5, burst=3),
+    "set_group_ban": RateLimit(rate=1, burst=5),
+}
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, limit: RateLimit, now: float) -> None:
+        self.rate = limit.rate
+        self.burst = limit.burst
+        self.tokens = limit.burst
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """距离下一个令牌可用的秒数，为 0 时表示可以立即取走"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        """已补满的桶与新建的桶等价，可以丢弃"""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+@dataclass
+class LatencyStats:
+    """请求从进入队列到发出所等待的时间，单位秒"""
+    count: int = 0
+    total: float = 0
+    max: float = 0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def record(self, latency: float):
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+
+
+@dataclass(eq=False)
+class _Job:
+    call: Callable[[], Awaitable[Any]]
+    action: str
+    target: Optional[Hashable]
+    priority: int
+    limited: bool
+    enqueued: float
+    future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+def request_target(request: APIRequest) -> Optional[Hashable]:
+    """请求的对象，群相关的 api 以群为对象，否则以用户为对象"""
+    groupId = getattr(request, "group_id", None)
+    if groupId is not None:
+        return ("group", groupId)
+    userId = getattr(request, "user_id", None)
+    if userId is not None:
+        return ("user", userId)
+    return None
+
+
+class ScheduledSession(SessionLayer):
+    """
+    对发出的请求限速并按优先级调度的 session 中间层
+
+    非只读的请求需要同时从账号、对象（group_id 或 user_id）与 api（如果 action_limits 中有）的令牌桶各取一个令牌才能发出，
+    只读请求不限速，但同样排队，对象的令牌耗尽时，同一对象队列中的只读请求越过等待令牌的请求先发出
+    每个优先级中按对象分队列轮流调度，某个对象的令牌耗尽时跳过它调度其他对象，因此一个群的大量消息不会阻塞其他群；
+    高优先级的请求总是先于低优先级的请求调度
+    quick_operation 同样排队，按事件的群或用户限速
+
+    优先级默认由 PRIORITY_ACTIONS 决定为 HIGH_PRIORITY，其余为 NORMAL_PRIORITY，
+    可以用 priorities 按 api 名覆盖，或在 send 时传入 priority
+    指定 metrics 时导出各优先级的排队时间与队列长度
+    """
+
+    def __init__(self, inner: CommunicationSessionBase, eventHandler: Optional[EventHandler] = None,
+                 account_limit: Optional[RateLimit] = DEFAULT_ACCOUNT_LIMIT, target_limit: Optional[RateLimit] = DEFAULT_TARGET_LIMIT,
+                 action_limits: Optional[dict[str, RateLimit]] = None, priorities: Optional[dict[str, int]] = None,
+                 metrics: Optional[ProtocolMetrics] = None) -> None:
+        super().__init__(inner, eventHandler)
+        now = time.monotonic()
+        self.account_bucket = TokenBucket(account_limit, now) if account_limit is not None else None
+        self.target_limit = target_limit
+        self.action_limits = DEFAULT_ACTION_LIMITS if action_limits is None else action_limits
+        self.priorities = priorities or {}
+        self.target_buckets: dict[Hashable, TokenBucket] = {}
+        self.action_buckets: dict[str, TokenBucket] = {}
+        # 每隔 sweep_interval 秒丢弃已补满的桶，否则每个发送过消息的对象都会留下一个桶
+        self.sweep_interval = 60.0
+        self.last_sweep = now
+        # 优先级 -> 对象 -> 队列，OrderedDict 的顺序即轮转顺序
+        self.queues: dict[int, OrderedDict[Optional[Hashable], deque[_Job]]] = {}
+        self.latency: dict[int, LatencyStats] = {}
+        self.wakeup = asyncio.Event()
+        self.scheduler: Optional[asyncio.Task] = None
+        self.running: set[asyncio.Task] = set()
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.registry.gauge("onebot_scheduler_queue_depth", "API requests waiting in the scheduler queues",
+                                   callback=lambda: self.queue_depth)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queues in self.queues.values() for queue in queues.values())
+
+    def priority_of(self, action: str) -> int:
+        priority = self.priorities.get(action)
+        if priority is not None:
+            return priority
+        return HIGH_PRIORITY if action in PRIORITY_ACTIONS else NORMAL_PRIORITY
+
+    async def send[Name, RespType](self, request: APIRequest[Name, RespType], priority: Optional[int] = None, **options) -> RespType:
+        action = request.typeParameters[0].__args__[0]
+        return await self._enqueue(lambda: self.inner.send(request, **options), action, request_target(request), priority)
+
+    async def quick_operation(self, event: Event, operation: Optional[BaseModel] = None, timeout: Optional[float] = None,
+                              priority: Optional[int] = None, **kwargs):
+        await self._enqueue(lambda: self.inner.quick_operation(event, operation, timeout, **kwargs),
+                            ".handle_quick_operation", request_target(event), priority)
+
+    async def _enqueue(self, call: Callable[[], Awaitable[Any]], action: str, target: Optional[Hashable], priority: Optional[int]) -> Any:
+        if priority is None:
+            priority = self.priority_of(action)
+        job = _Job(call, action, target, priority, not _is_idempotent_action(action), time.monotonic())
+        self.queues.setdefault(priority, OrderedDict()).setdefault(target, deque()).append(job)
+        if self.scheduler is None:
+            self.scheduler = asyncio.get_running_loop().create_task(self._schedule())
+        self.wakeup.set()
+        return await job.future
+
+    def _buckets(self, job: _Job, now: float) -> list[TokenBucket]:
+        buckets = []
+        if job.target is not None and self.target_limit is not None:
+            bucket = self.target_buckets.get(job.target)
+            if bucket is None:
+                bucket = self.target_buckets[job.target] = TokenBucket(self.target_limit, now)
+            buckets.append(bucket)
+        limit = self.action_limits.get(job.action)
+        if limit is not None:
+            bucket = self.action_buckets.get(job.action)
+            if bucket is None:
+                bucket = self.action_buckets[job.action] = TokenBucket(limit, now)
+            buckets.append(bucket)
+        return buckets
+
+    def _sweep(self, now: float):
+        self.last_sweep = now
+        for buckets in (self.target_buckets, self.action_buckets):
+            for key in [key for key, bucket in buckets.items() if bucket.is_full(now)]:
+                del buckets[key]
+
+    def _pick(self, now: float) -> tuple[Optional[_Job], Optional[float]]:
+        """返回可以发出的请求，没有时返回最短的等待时间，队列为空时为 None"""
+        if now - self.last_sweep >= self.sweep_interval:
+            self._sweep(now)
+        shortestWait: Optional[float] = None
+        for priority in sorted(self.queues):
+            queues = self.queues[priority]
+            for target in list(queues):
+                queue = queues[target]
+                while queue and queue[0].future.done():
+                    # 调用方已取消
+                    queue.popleft()
+                if not queue:
+                    del queues[target]
+                    continue
+                job = queue[0]
+                if job.limited:
+                    buckets = self._buckets(job, now)
+                    if self.account_bucket is not None:
+                        buckets.append(self.account_bucket)
+                    wait = max((bucket.wait_time(now) for bucket in buckets), default=0)
+                    if wait > 0:
+                        shortestWait = wait if shortestWait is None else min(shortestWait, wait)
+                        # 不限速的请求不必等待排在前面的限速请求
+                        unlimited = next((queued for queued in queue if not queued.limited and not queued.future.done()), None)
+                        if unlimited is None:
+                            continue
+                        queue.remove(unlimited)
+                        job = unlimited
+                    else:
+                        for bucket in buckets:
+                            bucket.consume()
+                        queue.popleft()
+                else:
+                    queue.popleft()
+                # 轮到下一个对象
+                if queue:
+                    queues.move_to_end(target)
+                else:
+                    del queues[target]
+                return job, None
+            if not queues:
+                del self.queues[priority]
+        return None, shortestWait
+
+    async def _schedule(self):
+        while True:
+            self.wakeup.clear()
+            now = time.monotonic()
+            job, wait = self._pick(now)
+            if job is not None:
+                self.latency.setdefault(job.priority, LatencyStats()).record(now - job.enqueued)
+                if self.metrics is not None:
+                    self.metrics.scheduler_wait.observe(now - job.enqueued, (str(job.priority),))
+                task = asyncio.get_running_loop().create_task(self._execute(job))
+                self.running.add(task)
+                task.add_done_callback(self.running.discard)
+                continue
+            try:
+                async with asyncio.timeout(wait):
+                    await self.wakeup.wait()
+            except TimeoutError:
+                pass
+
+    async def _execute(self, job: _Job):
+        try:
+            response = await job.call()
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(response)
+
+    async def disconnect(self):
+        if self.scheduler is not None:
+            self.scheduler.cancel()
+            await asyncio.gather(self.scheduler, return_exceptions=True)
+            self.scheduler = None
+        for queues in self.queues.values():
+            for queue in queues.values():
+                for job in queue:
+                    if not job.future.done():
+                        job.future.set_exception(ConnectionError("Session disconnected before request was sent"))
+        self.queues.clear()
+        await super().disconnect()
@@ -0,0 +1,224 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import sqlite3
+from typing import Optional
+
+from ..api.public import GetForwardMsgReq, GetForwardMsgResp, GetMsgGroupResp, GetMsgPrivateResp, GetMsgReq, GetMsgResp
+from ..api.shared import APIRequest
+from ..event import Event
+from ..event.message import GroupMessageEvent, PrivateMessageEvent
+from ..event.notice import FriendRecallNoticeEvent, GroupRecallNoticeEvent
+from ..message import Message
+from .base import CommunicationSessionBase, EventHandler, SessionLayer
+from .codec import dump_model
+
+
+def _message_key(selfId: Optional[int], messageId: int) -> str:
+    return f"msg:{selfId}:{messageId}"
+
+
+def _forward_key(selfId: Optional[int], forwardId: str) -> str:
+    return f"fwd:{selfId}:{forwardId}"
+
+
+class MessageStore:
+    """
+    按 message_id 索引的近期消息，内容以 get_msg / get_forward_msg 响应的 JSON 保存
+
+    不同账号的 message_id 可能重复，因此条目还按 selfId（机器人的 QQ 号）区分，多个账号可以共享一个 store
+
+    内存层最多保存 max_entries 条、共 max_bytes 字节，超出时淘汰最久未使用的条目；
+    指定 path 时淘汰的条目转存到该 SQLite 数据库，数据库最多保存 disk_max_entries 条，
+    数据库操作在单独的线程中进行，不阻塞事件循环
+    从数据库读到的条目会重新放入内存层
+    撤回的消息会从两层中删除，最近撤回的 (selfId, message_id) 记录在 recalled 中，之后不再保存
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 32 << 20, path: Optional[str] = None,
+                 disk_max_entries: int = 1_000_000, max_recalled: int = 10000) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_max_entries = disk_max_entries
+        self.max_recalled = max_recalled
+        self.entries: OrderedDict[str, bytes] = OrderedDict()
+        self.bytes = 0
+        self.recalled: OrderedDict[tuple[Optional[int], int], None] = OrderedDict()
+        # 每次 remove 加一，用于判断读取数据库期间条目是否被删除
+        self.removals = 0
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.database: Optional[sqlite3.Connection] = None
+        self.spilled = 0
+        if path is not None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="message-store")
+            self.executor.submit(self._open, path).result()
+
+    def _open(self, path: str):
+        self.database = sqlite3.connect(path, check_same_thread=False)
+        self.database.execute("PRAGMA journal_mode=WAL")
+        self.database.execute("PRAGMA synchronous=NORMAL")
+        self.database.execute("CREATE TABLE IF NOT EXISTS entries "
+                              "(seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT UNIQUE NOT NULL, data BLOB NOT NULL)")
+        self.database.commit()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def put(self, key: str, data: bytes):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= len(old)
+        self.entries[key] = data
+        self.bytes += len(data)
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            evictedKey, evicted = self.entries.popitem(last=False)
+            self.bytes -= len(evicted)
+            if self.executor is not None:
+                self.spilled += 1
+                self.executor.submit(self._disk_put, evictedKey, evicted)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        data = self.entries.get(key)
+        if data is not None:
+            self.entries.move_to_end(key)
+            return data
+        if self.executor is None:
+            return None
+        removals = self.removals
+        data = await asyncio.get_running_loop().run_in_executor(self.executor, self._disk_get, key)
+        if data is not None and removals == self.removals and key not in self.entries:
+            self.put(key, data)
+        return data
+
+    def remove(self, key: str):
+        self.removals += 1
+        data = self.entries.pop(key, None)
+        if data is not None:
+            self.bytes -= len(data)
+        if self.executor is not None:
+            self.executor.submit(self._disk_remove, key)
+
+    def _disk_put(self, key: str, data: bytes):
+        try:
+            cursor = self.database.execute("INSERT OR REPLACE INTO entries (key, data) VALUES (?, ?)", (key, data))
+            if cursor.lastrowid % 1000 == 0:
+                self.database.execute("DELETE FROM entries WHERE seq <= ?", (cursor.lastrowid - self.disk_max_entries,))
+            self.database.commit()
+        except sqlite3.Error as e:
+            print(f"Cannot store {key} to database: {e!r}")
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        try:
+            row = self.database.execute("SELECT data FROM entries WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Cannot load {key} from database: {e!r}")
+            return None
+        return row[0] if row is not None else None
+
+    def _disk_remove(self, key: str):
+        try:
+            self.database.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.database.commit()
+        except sqlite3.Error as e:
+            print(f"Cannot remove {key} from database: {e!r}")
+
+    def add_message(self, response: GetMsgPrivateResp | GetMsgGroupResp, selfId: Optional[int] = None):
+        if (selfId, response.message_id) not in self.recalled:
+            self.put(_message_key(selfId, response.message_id), dump_model(response))
+
+    def add_event(self, event: PrivateMessageEvent | GroupMessageEvent):
+        """以消息事件构造 get_msg 的响应并保存，不经过校验"""
+        responseType = GetMsgGroupResp if isinstance(event, GroupMessageEvent) else GetMsgPrivateResp
+        self.add_message(responseType.model_construct(
+            time=event.time, message_type=event.message_type, message_id=event.message_id, real_id=event.message_id,
+            sender=event.sender, message=event.message), event.self_id)
+
+    def add_forward(self, forwardId: str, response: GetForwardMsgResp, selfId: Optional[int] = None):
+        self.put(_forward_key(selfId, forwardId), dump_model(response))
+
+    def recall(self, messageId: int, selfId: Optional[int] = None):
+        self.remove(_message_key(selfId, messageId))
+        self.recalled[(selfId, messageId)] = None
+        if len(self.recalled) > self.max_recalled:
+            self.recalled.popitem(last=False)
+
+    def is_recalled(self, messageId: int, selfId: Optional[int] = None) -> bool:
+        return (selfId, messageId) in self.recalled
+
+    async def get_message(self, messageId: int, selfId: Optional[int] = None) -> Optional[GetMsgResp]:
+        data = await self.get(_message_key(selfId, messageId))
+        return GetMsgResp.model_validate_json(data) if data is not None else None
+
+    async def get_forward(self, forwardId: str, selfId: Optional[int] = None) -> Optional[GetForwardMsgResp]:
+        data = await self.get(_forward_key(selfId, forwardId))
+        return GetForwardMsgResp.model_validate_json(data) if data is not None else None
+
+    def close(self):
+        """等待未完成的写入并关闭数据库"""
+        if self.executor is not None:
+            self.executor.submit(self.database.close)
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+class MessageStoreSession(SessionLayer):
+    """
+    用本地的 MessageStore 响应 get_msg 与 get_forward_msg 的 session 中间层
+
+    收到的消息事件存入 store，群与好友的撤回通知将其删除；
+    get_msg 与 get_forward_msg 先查 store，未命中时再调用 api，并保存响应
+    合并转发的内容不会改变，因此 get_forward_msg 的响应可以一直保存
+    条目按 self_id 区分，self_id 取自 inner（如反向 WebSocket 的 session）或收到的事件
+    close_store 为 True 时 disconnect 会关闭 store，多个 session 共享 store 时应当传入 False 并自行关闭
+    """
+
+    def __init__(self, inner: CommunicationSessionBase, eventHandler: Optional[EventHandler] = None,
+                 store: Optional[MessageStore] = None, close_store: bool = True) -> None:
+        super().__init__(inner, eventHandler)
+        self.store = store or MessageStore()
+        self.close_store = close_store
+        self.self_id: Optional[int] = getattr(inner, "self_id", None)
+        self.hits = 0
+        self.misses = 0
+
+    async def send[Name, RespType](self, request: APIRequest[Name, RespType], **options) -> RespType:
+        if isinstance(request, GetMsgReq):
+            response = await self.store.get_message(request.message_id, self.self_id)
+            if response is not None:
+                self.hits += 1
+                return response
+            self.misses += 1
+            response = await self.inner.send(request, **options)
+            self.store.add_message(response.root, self.self_id)
+            return response
+        if isinstance(request, GetForwardMsgReq):
+            response = await self.store.get_forward(request.id, self.self_id)
+            if response is not None:
+                self.hits += 1
+                return response
+            self.misses += 1
+            response = await self.inner.send(request, **options)
+            self.store.add_forward(request.id, response, self.self_id)
+            return response
+        return await self.inner.send(request, **options)
+
+    async def get_reply(self, message: Message) -> Optional[GetMsgResp]:
+        """message 中回复的消息，没有回复时为 None"""
+        for segment in message:
+            if segment.type == "reply":
+                return await self.send(GetMsgReq(message_id=int(segment.data.id)))
+        return None
+
+    async def on_event(self, session: CommunicationSessionBase, event: Event):
+        self.self_id = event.self_id
+        if isinstance(event, (PrivateMessageEvent, GroupMessageEvent)):
+            self.store.add_event(event)
+        elif isinstance(event, (GroupRecallNoticeEvent, FriendRecallNoticeEvent)):
+            self.store.recall(event.message_id, event.self_id)
+        return await super().on_event(session, event)
+
+    async def disconnect(self):
+        await super().disconnect()
+        if self.close_store:
+            # 等待未完成的写入，不阻塞事件循环
+            await asyncio.get_running_loop().run_in_executor(None, self.store.close)
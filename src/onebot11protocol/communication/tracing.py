@@ -0,0 +1,184 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+import random
+import time
+from typing import Any, Iterator, Optional
+
+
+class Span:
+    """
+    一段被追踪的操作，时间单位为 time.time_ns() 的纳秒
+
+    events 是操作过程中的时间点，如 api 调用的入队、写出与响应匹配
+    """
+
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "start_time", "end_time",
+                 "attributes", "events", "error", "native")
+
+    def __init__(self, tracer: "Tracer", name: str, traceId: int, spanId: int, parentId: Optional[int],
+                 attributes: Optional[dict[str, Any]]) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = traceId
+        self.span_id = spanId
+        self.parent_id = parentId
+        self.start_time = time.time_ns()
+        self.end_time: Optional[int] = None
+        self.attributes = attributes if attributes is not None else {}
+        self.events: list[tuple[str, int, dict[str, Any]]] = []
+        self.error: Optional[BaseException] = None
+        # 适配器（如 OpenTelemetry）对应的原生 span
+        self.native: Any = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        """单位秒，未结束时为 None"""
+        return (self.end_time - self.start_time) / 1e9 if self.end_time is not None else None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes: Any):
+        self.events.append((name, time.time_ns(), attributes))
+
+    def end(self, error: Optional[BaseException] = None):
+        """结束 span，重复调用无效"""
+        if self.end_time is not None:
+            return
+        self.end_time = time.time_ns()
+        self.error = error
+        self.tracer.exporter.on_end(self)
+
+    def __repr__(self) -> str:
+        return f"Span({self.name!r}, trace_id={self.trace_id:032x}, span_id={self.span_id:016x})"
+
+
+class SpanExporter:
+    """span 的开始与结束钩子，默认什么也不做"""
+
+    def on_start(self, span: Span, parent: Optional[Span]):
+        pass
+
+    def on_end(self, span: Span):
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """保存结束的 span，用于测试与调试，max_spans 限制保存的数量，超出时丢弃最早的"""
+
+    def __init__(self, max_spans: int = 10000) -> None:
+        self.max_spans = max_spans
+        self.spans: list[Span] = []
+
+    def on_end(self, span: Span):
+        self.spans.append(span)
+        if len(self.spans) > self.max_spans:
+            del self.spans[:len(self.spans) - self.max_spans]
+
+    def trace(self, traceId: int) -> list[Span]:
+        return [span for span in self.spans if span.trace_id == traceId]
+
+
+class OpenTelemetrySpanExporter(SpanExporter):
+    """
+    将 span 转发给 OpenTelemetry，需要安装 opentelemetry-api（以及配置好的 SDK）
+
+    原生 span 在 on_start 时创建，父子关系与 OpenTelemetry 中一致，属性与事件在 on_end 时写入
+    """
+
+    def __init__(self, tracer: Any = None) -> None:
+        from opentelemetry import trace
+        self.trace = trace
+        self.tracer = tracer or trace.get_tracer("onebot11protocol")
+
+    def on_start(self, span: Span, parent: Optional[Span]):
+        context = self.trace.set_span_in_context(parent.native) if parent is not None and parent.native is not None else None
+        span.native = self.tracer.start_span(span.name, context=context, start_time=span.start_time)
+
+    def on_end(self, span: Span):
+        native = span.native
+        if native is None:
+            return
+        native.set_attributes({key: value for key, value in span.attributes.items() if value is not None})
+        for name, timestamp, attributes in span.events:
+            native.add_event(name, attributes, timestamp)
+        if span.error is not None:
+            native.record_exception(span.error)
+            native.set_status(self.trace.Status(self.trace.StatusCode.ERROR, repr(span.error)))
+        native.end(end_time=span.end_time)
+
+
+class _UnsampledSpan:
+    """未被采样的 trace 的标记，放在上下文中时其下的操作沿用不采样的决定，不再作为新的根 span 采样"""
+
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "UNSAMPLED"
+
+
+UNSAMPLED = _UnsampledSpan()
+
+type ParentSpan = Span | _UnsampledSpan
+
+
+_currentSpan: ContextVar[Optional[ParentSpan]] = ContextVar("onebot_current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """当前上下文中的 span，处理器中为处理该事件的 span，所在的 trace 未被采样时为 None"""
+    span = _currentSpan.get()
+    return span if span is not UNSAMPLED else None
+
+
+def current_parent() -> Optional[ParentSpan]:
+    """作为 Tracer.start_span 的 parent 传入，与 current_span 不同，未被采样的 trace 中为 UNSAMPLED"""
+    return _currentSpan.get()
+
+
+@contextmanager
+def use_span(span: Optional[ParentSpan]) -> Iterator[Optional[ParentSpan]]:
+    """在 with 块内将 span（或 UNSAMPLED）设为当前 span，块内创建的 asyncio 任务会继承它"""
+    token = _currentSpan.set(span)
+    try:
+        yield span
+    finally:
+        _currentSpan.reset(token)
+
+
+class Tracer:
+    """
+    创建 span 并交给 exporter
+
+    没有父 span 的 span 按 sample_rate 采样，未被采样时 start_span 返回 None，
+    调用方将 UNSAMPLED 作为其下操作的 parent，这些操作也不再追踪，因此低采样率下的开销接近于不启用
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, sample_rate: float = 1.0) -> None:
+        assert 0 <= sample_rate <= 1, "Invalid sample rate"
+        self.exporter = exporter or InMemorySpanExporter()
+        self.sample_rate = sample_rate
+        self.random = random.Random()
+
+    def start_span(self, name: str, parent: Optional[ParentSpan] = None, attributes: Optional[dict[str, Any]] = None) -> Optional[Span]:
+        if parent is UNSAMPLED:
+            return None
+        if parent is None:
+            if self.sample_rate < 1 and self.random.random() >= self.sample_rate:
+                return None
+            traceId = self.random.getrandbits(128) or 1
+            parentId = None
+        else:
+            traceId = parent.trace_id
+            parentId = parent.span_id
+        span = Span(self, name, traceId, self.random.getrandbits(64) or 1, parentId, attributes)
+        self.exporter.on_start(span, parent)
+        return span
+
+
+def start_child_span(name: str, attributes: Optional[dict[str, Any]] = None) -> Optional[Span]:
+    """在当前 span 下创建子 span，当前没有被追踪的 span 时返回 None"""
+    parent = current_span()
+    if parent is None:
+        return None
+    return parent.tracer.start_span(name, parent, attributes)
@@ -0,0 +1,114 @@
+import asyncio
+from collections import deque
+from typing import Any, Callable, Optional
+
+from .decoder import Frame
+
+
+PRIORITY_ACTIONS = frozenset({
+    ".handle_quick_operation",
+    "delete_msg",
+    "set_group_kick",
+    "set_group_ban",
+    "set_group_anonymous_ban",
+    "set_group_whole_ban",
+})
+"""默认走优先通道的 api，快速操作与管理操作不应排在批量发送之后"""
+
+
+class FrameWriter:
+    """
+    单写者发送管线
+
+    所有出站帧进入队列，由唯一的写任务按批取出，以 websockets 的公开接口 send 依次写出。
+    排队的字节数超过 high_water 时，普通通道的写入方会等待，直到回落到 low_water 以下；
+    优先通道不受水位限制，并且总是先于普通通道写出
+    """
+
+    def __init__(self, high_water: int = 1 << 20, low_water: int = 1 << 18, max_batch: int = 64) -> None:
+        assert 0 <= low_water <= high_water, "Invalid water marks"
+        self.high_water = high_water
+        self.low_water = low_water
+        self.max_batch = max_batch
+        self.priority_frames: deque[Frame] = deque()
+        self.bulk_frames: deque[Frame] = deque()
+        self.queued_bytes = 0
+        self.readable = asyncio.Event()
+        self.writable = asyncio.Event()
+        self.writable.set()
+        self.task: Optional[asyncio.Task] = None
+        self.error: Optional[BaseException] = None
+        self.batches = 0
+        self.frames = 0
+        # 每批帧写出后调用，用于追踪
+        self.on_written: Optional[Callable[[list[Frame]], None]] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.priority_frames) + len(self.bulk_frames)
+
+    def start(self, websocket: Any):
+        assert self.task is None, "Writer already started"
+        self.error = None
+        self.task = asyncio.get_running_loop().create_task(self._run(websocket))
+
+    async def stop(self):
+        """停止写任务，未写出的帧被丢弃，等待中的写入方会收到 ConnectionError"""
+        task, self.task = self.task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if self.error is None:
+            self.error = ConnectionError("Writer stopped")
+        self.priority_frames.clear()
+        self.bulk_frames.clear()
+        self.queued_bytes = 0
+        self.writable.set()
+
+    async def write(self, frame: Frame, priority: bool = False):
+        """将帧放入队列，普通通道超过高水位时等待"""
+        if not priority:
+            while self.queued_bytes >= self.high_water and self.task is not None:
+                self.writable.clear()
+                await self.writable.wait()
+        if self.task is None:
+            raise ConnectionError("Writer is not running, cannot send") from self.error
+        (self.priority_frames if priority else self.bulk_frames).append(frame)
+        self.queued_bytes += len(frame)
+        self.readable.set()
+
+    def _take_batch(self) -> list[Frame]:
+        batch: list[Frame] = []
+        for frames in (self.priority_frames, self.bulk_frames):
+            while frames and len(batch) < self.max_batch:
+                batch.append(frames.popleft())
+        return batch
+
+    async def _run(self, websocket: Any):
+        try:
+            while True:
+                while not self.priority_frames and not self.bulk_frames:
+                    self.readable.clear()
+                    await self.readable.wait()
+                batch = self._take_batch()
+                await self._write_batch(websocket, batch)
+                if self.on_written is not None:
+                    self.on_written(batch)
+                self.queued_bytes -= sum(len(frame) for frame in batch)
+                self.batches += 1
+                self.frames += len(batch)
+                if self.queued_bytes <= self.low_water:
+                    self.writable.set()
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            self.error = e
+            self.task = None
+            self.writable.set()
+            print(f"Writer stopped on error: {e!r}")
+
+    @staticmethod
+    async def _write_batch(websocket: Any, batch: list[Frame]):
+        for frame in batch:
+            # OneBot 的帧总是文本帧，bytes 以 text=True 发送，不必先解码
+            await websocket.send(frame, text=True)
@@ -1,8 +1,9 @@
 import asyncio
 from dataclasses import dataclass
-import json
-from typing import Any, Optional, TypedDict
-from pydantic import TypeAdapter, ValidationError
+import random
+import time
+from typing import Any, Awaitable, Optional, TypedDict
+from pydantic import BaseModel, ValidationError
 import websockets
 import websockets.connection
 
@@ -10,6 +11,13 @@ from ..event.base import EventQuickOperationMap
 from ..event import Event
 from ..api.shared import APIRequest
 from .base import CommunicationBase, CommunicationSessionBase, EventHandler
+from .codec import JSONCodec, dump_model, encode_api_request, encode_quick_operation_params, get_default_codec
+from .decoder import EventDecoder, Frame, get_default_decoder
+from .dispatch import EventDispatcher
+from .metrics import ProtocolMetrics
+from .recorder import FrameRecorder
+from .tracing import UNSAMPLED, Span, Tracer, current_parent
+from .writer import PRIORITY_ACTIONS, FrameWriter
 
 
 @dataclass
@@ -35,83 +43,300 @@ class BadAPIResponseException(Exception):
         self.response = response
 
 
+def _is_idempotent_action(apiName: str):
+    return apiName.startswith("get_")
+
+
+@dataclass
+class ReconnectPolicy:
+    initial_delay: float = 0.1
+    """首次重连前的等待时间，单位秒"""
+    max_delay: float = 30
+    factor: float = 2
+    jitter: float = 0.5
+    """实际等待时间在 [delay * (1 - jitter), delay] 之间随机，避免大量连接同时重连"""
+    max_attempts: Optional[int] = None
+    """连续失败的最大次数，None 表示不限"""
+    retry_idempotent: bool = True
+    """
+    重连后是否在新连接上重发进行中的只读 api（get_*），为 false 时这些调用与其他调用一样立即失败
+    """
+
+    def delay(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.initial_delay * self.factor ** attempt)
+        return delay * (1 - self.jitter * random.random())
+
+
 class WebSocketSession(CommunicationSessionBase):
-    def __init__(self, loop: asyncio.AbstractEventLoop, endpoint: WebSocketEndpoint, eventHandler: EventHandler) -> None:
+    def __init__(self, loop: asyncio.AbstractEventLoop, endpoint: WebSocketEndpoint, eventHandler: EventHandler,
+                 decoder: Optional[EventDecoder] = None, dispatcher: Optional[EventDispatcher] = None,
+                 writer: Optional[FrameWriter] = None, priority_actions: frozenset[str] = PRIORITY_ACTIONS,
+                 timeout: Optional[float] = 30, action_timeouts: Optional[dict[str, float]] = None,
+                 reconnect_policy: Optional[ReconnectPolicy] = None, codec: Optional[JSONCodec] = None,
+                 metrics: Optional[ProtocolMetrics] = None, tracer: Optional[Tracer] = None,
+                 recorder: Optional[FrameRecorder] = None) -> None:
         super().__init__()
         self.endpoint = endpoint
         self.loop = loop
+        self.decoder = decoder or get_default_decoder()
+        self.codec = codec or get_default_codec()
+        # 为 None 时不记录指标
+        self.metrics = metrics
+        # 为 None 时不追踪，traced_calls 与 traced_frames 记录被追踪的 api 调用的 span
+        self.tracer = tracer
+        self.traced_calls: dict[int, Span] = {}
+        self.traced_frames: dict[int, Span] = {}
+        # 不为 None 时，收到的每一帧都原样录制，可以用 FrameReplayer 回放
+        self.recorder = recorder
+        # 未指定时由 session 自己持有 dispatcher，并在 run 结束时停止它
+        self.owns_dispatcher = dispatcher is None
+        self.dispatcher = dispatcher or EventDispatcher(metrics=metrics)
+        self.writer = writer or FrameWriter()
+        if tracer is not None:
+            self.writer.on_written = self._frames_written
+        self.priority_actions = priority_actions
         self.api_index = 0
         self.waiting_api_map: dict[int, asyncio.Future[RawAPIResponse]] = {}
+        # 单位秒，None 表示不设时限，action_timeouts 按 api 名覆盖默认值
+        self.timeout = timeout
+        self.action_timeouts = action_timeouts or {}
+        self.timeouts = 0
+        self.orphan_responses = 0
+        # reconnect_policy 为 None 时连接断开后 run 直接结束
+        self.reconnect_policy = reconnect_policy
+        self.retry_frames: dict[int, Frame] = {}
+        self.is_closing = False
         self.is_listening = False
         self.event_handler = eventHandler
 
     async def run(self):
         self.is_listening = True
+        self.is_closing = False
         try:
+            self.writer.start(self.websocket)
             while True:
-                data = await self.websocket.recv()
-                jsonData = json.loads(data)
-                if "self_id" in jsonData:
-                    # 是 event
-                    try:
-                        event: Event = TypeAdapter(
-                            Event).validate_python(jsonData)
-                    except ValidationError as e:
-                        print(f"Cannot parse event from data {jsonData}: {e}, discarding")
-                        continue
-                    self.loop.create_task(
-                        self.event_handler.on_event(self, event))
-                else:
-                    # 是 api 的响应
-                    jsonData: RawAPIResponse
-                    try:
-                        apiIndex = int(jsonData["echo"])
-                    except ValueError as e:
-                        print(f"Ill formed echo({jsonData["echo"]}): {e}, discarding")
-                        continue
-                    future = self.waiting_api_map[apiIndex]
-                    future.set_result(jsonData)
-                    del self.waiting_api_map[apiIndex]
+                try:
+                    await self._receive(self.websocket)
+                except websockets.ConnectionClosed as e:
+                    if self.is_closing:
+                        # 由 disconnect 主动关闭
+                        return
+                    if self.reconnect_policy is None:
+                        raise
+                    await self.writer.stop()
+                    if not await self._reconnect(e):
+                        return
+                    self.writer.start(self.websocket)
+                    for frame in list(self.retry_frames.values()):
+                        await self.writer.write(frame)
+                    await self._notify(self.event_handler.on_reconnected(self))
         finally:
             self.is_listening = False
+            await self.writer.stop()
+            self._fail_waiting_apis(ConnectionError("Connection closed before api response"))
+            if self.owns_dispatcher:
+                await self.dispatcher.stop()
+
+    async def _receive(self, websocket: Any):
+        while True:
+            data = await websocket.recv()
+            if self.recorder is not None:
+                self.recorder.record(data)
+            postType = self.decoder.post_type_of(data)
+            if postType is not None:
+                # 是 event
+                metrics = self.metrics
+                if metrics is not None:
+                    start = time.perf_counter()
+                span = decodeSpan = None
+                if self.tracer is not None:
+                    span = self.tracer.start_span("onebot.receive", None, {"post_type": postType, "frame.size": len(data)})
+                    if span is not None:
+                        decodeSpan = self.tracer.start_span("onebot.decode", span)
+                try:
+                    event: Event = self.decoder.decode(data, postType)
+                except ValidationError as e:
+                    if metrics is not None:
+                        metrics.validation_failures.inc((postType,))
+                    if span is not None:
+                        decodeSpan.end(e)
+                        span.end(e)
+                    print(f"Cannot parse event from data {data}: {e}, discarding")
+                    continue
+                if metrics is not None:
+                    metrics.record_event(event, time.perf_counter() - start)
+                if span is not None:
+                    decodeSpan.end()
+                    span.set_attribute("event", type(event).__name__)
+                # 未被采样的事件也传入标记，处理器中的 api 调用不再单独采样
+                await self.dispatcher.submit(self, self.event_handler, event,
+                                             span if span is not None or self.tracer is None else UNSAMPLED)
+                if span is not None:
+                    span.end()
+            else:
+                # 是 api 的响应
+                jsonData: RawAPIResponse = self.codec.loads(data)
+                try:
+                    apiIndex = int(jsonData["echo"])
+                except (KeyError, ValueError) as e:
+                    print(f"Ill formed echo({jsonData.get("echo")}): {e!r}, discarding")
+                    continue
+                future = self.waiting_api_map.pop(apiIndex, None)
+                if future is None or future.done():
+                    # 调用方已超时或取消
+                    self.orphan_responses += 1
+                    continue
+                if self.traced_calls:
+                    span = self.traced_calls.get(apiIndex)
+                    if span is not None:
+                        span.add_event("response_matched", retcode=jsonData.get("retcode"))
+                future.set_result(jsonData)
+
+    async def _reconnect(self, exception: BaseException) -> bool:
+        """按 reconnect_policy 重连，返回 False 表示重连期间 session 被关闭"""
+        # 非只读的请求可能已被执行，重发不安全，立即失败
+        for index in [index for index in self.waiting_api_map if index not in self.retry_frames]:
+            future = self.waiting_api_map.pop(index)
+            if not future.done():
+                future.set_exception(ConnectionError("Connection lost before api response"))
+        await self._notify(self.event_handler.on_disconnected(self, exception))
+
+        attempt = 0
+        while not self.is_closing:
+            await asyncio.sleep(self.reconnect_policy.delay(attempt))
+            try:
+                await self.connect()
+            except (OSError, TimeoutError, websockets.InvalidHandshake) as e:
+                attempt += 1
+                print(f"Reconnect attempt {attempt} to {self.endpoint.url} failed: {e!r}")
+                if self.reconnect_policy.max_attempts is not None and attempt >= self.reconnect_policy.max_attempts:
+                    raise
+                continue
+            if self.is_closing:
+                await self.websocket.close()
+                break
+            return True
+        return False
+
+    async def _notify(self, callback: Awaitable):
+        try:
+            await callback
+        except Exception as e:
+            print(f"Lifecycle callback failed: {e!r}")
+
+    def _fail_waiting_apis(self, exception: BaseException):
+        waitingApis, self.waiting_api_map = self.waiting_api_map, {}
+        self.retry_frames.clear()
+        for future in waitingApis.values():
+            if not future.done():
+                future.set_exception(exception)
 
-    async def send[Name, RespType](self, request: APIRequest[Name, RespType]) -> RespType:
+    async def send[Name, RespType](self, request: APIRequest[Name, RespType], timeout: Optional[float] = None) -> RespType:
+        """timeout 未指定时使用 action_timeouts 中对应的值或 session 的默认值，超时抛出 TimeoutError"""
+        apiNameLiteral, respType = request.typeParameters
+        response = await self._call(apiNameLiteral.__args__[0], dump_model(request), timeout)
+        return respType.model_validate(response["data"])
+
+    async def _call(self, apiName: str, params: bytes, timeout: Optional[float]) -> RawAPIResponse:
         if not self.is_listening:
             raise Exception("Not listening, cannot fetch response")
 
-        apiNameLiteral, respType = request.typeParameters
-        apiName = apiNameLiteral.__args__[0]
         index = self.api_index
         self.api_index += 1
-        content = {
-            "action": apiName,
-            "params": request.model_dump(),
-            "echo": str(index)
-        }
         future: asyncio.Future[RawAPIResponse] = self.loop.create_future()
         self.waiting_api_map[index] = future
-        await self.websocket.send(json.dumps(content))
-        response = await future
+        if timeout is None:
+            timeout = self.action_timeouts.get(apiName, self.timeout)
+        frame = encode_api_request(apiName, params, str(index))
+        if self.reconnect_policy is not None and self.reconnect_policy.retry_idempotent and _is_idempotent_action(apiName):
+            self.retry_frames[index] = frame
+        span = None
+        if self.tracer is not None:
+            # 在处理器中调用时，current_parent 为处理该事件的 span，事件未被采样时为 UNSAMPLED
+            span = self.tracer.start_span("onebot.api", current_parent(), {"action": apiName, "echo": index})
+            if span is not None:
+                self.traced_calls[index] = span
+                self.traced_frames[id(frame)] = span
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.api_in_flight.inc()
+            start = time.perf_counter()
+        try:
+            async with asyncio.timeout(timeout):
+                await self.writer.write(frame, apiName in self.priority_actions)
+                if span is not None:
+                    span.add_event("enqueued")
+                response = await future
+        except TimeoutError:
+            self.timeouts += 1
+            if metrics is not None:
+                metrics.api_failures.inc((apiName, "timeout"))
+            error = TimeoutError(f"Api \"{apiName}\"(#{index}) timed out after {timeout}s")
+            if span is not None:
+                span.end(error)
+            raise error from None
+        except BaseException as e:
+            if span is not None:
+                span.end(e)
+            raise
+        finally:
+            # 超时、取消或出错时移除等待项，避免 future 常驻
+            self.waiting_api_map.pop(index, None)
+            self.retry_frames.pop(index, None)
+            if span is not None:
+                self.traced_calls.pop(index, None)
+                self.traced_frames.pop(id(frame), None)
+            if metrics is not None:
+                metrics.api_in_flight.inc((), -1)
         retcode = response["retcode"]
+        if metrics is not None:
+            metrics.api_latency.observe(time.perf_counter() - start, (apiName,))
+            if _is_bad_retcode(retcode):
+                metrics.api_failures.inc((apiName, "retcode"))
+        if span is not None:
+            span.set_attribute("retcode", retcode)
         if _is_bad_retcode(retcode):
-            raise BadAPIResponseException(
+            error = BadAPIResponseException(
                 f"Api \"{apiName}\"(#{index}) invocation failed with retcode: {retcode}", response=response)
-        return respType.model_validate(response["data"])
+            if span is not None:
+                span.end(error)
+            raise error
+        if span is not None:
+            span.end()
+        return response
+
+    def _frames_written(self, frames: list[Frame]):
+        if self.traced_frames:
+            for frame in frames:
+                span = self.traced_frames.get(id(frame))
+                if span is not None:
+                    span.add_event("written")
+
+    async def quick_operation(self, event: Event, operation: Optional[BaseModel] = None, timeout: Optional[float] = None, **kwargs):
+        """
+        对事件执行快速操作，operation 未指定时由 kwargs 构造事件对应的快速操作模型
 
-    async def quick_operation(self, event: Event, **kwargs):
-        quickOperationType = EventQuickOperationMap[type(event)]
-        quickOperationContent = quickOperationType(**kwargs).model_dump_json()
-        await self.websocket.send(quickOperationContent)
+        以 .handle_quick_operation 调用发送，context 只包含实现需要的字段，见 quick_operation_context
+        """
+        if operation is None:
+            operation = EventQuickOperationMap[type(event)](**kwargs)
+        await self._call(".handle_quick_operation", encode_quick_operation_params(self.codec, event, operation), timeout)
 
     async def connect(self):
         self.websocket = await websockets.connect(self.endpoint.url, additional_headers={
             "Authorization": f"Bearer {self.endpoint.access_token}"} if self.endpoint.access_token else None)
 
     async def disconnect(self):
+        self.is_closing = True
         await self.websocket.close()
 
 
 class WebSocketCommunication(CommunicationBase[WebSocketEndpoint, WebSocketSession]):
+    def __init__(self, **sessionOptions) -> None:
+        """sessionOptions 会原样传给每个创建的 WebSocketSession，如 reconnect_policy、timeout"""
+        super().__init__()
+        self.session_options = sessionOptions
+
     def create(self, endpoint: WebSocketEndpoint, eventHandler: EventHandler) -> WebSocketSession:
         loop = asyncio.get_event_loop()
-        return WebSocketSession(loop, endpoint, eventHandler)
+        return WebSocketSession(loop, endpoint, eventHandler, **self.session_options)
@@ -0,0 +1,90 @@
+from typing import Annotated, Any, Mapping, Optional
+from pydantic import BaseModel, PrivateAttr, TypeAdapter, field_serializer
+
+from .base import EventQuickOperationMap
+from .message import GroupMessageEvent, PrivateMessageEvent
+from .meta import HeartbeatEvent
+
+
+LazyEventMap: dict[type, type] = {}
+"""Event -> LazyEvent"""
+
+
+class _LazyField(property):
+    """
+    字段在实例中保存未校验的原始 JSON 值，首次访问时才校验并缓存结果
+
+    继承 property 使 pydantic 在赋值时调用 __set__，从而让缓存失效
+    """
+
+    def __init__(self, name: str, adapter: TypeAdapter) -> None:
+        super().__init__()
+        self.name = name
+        self.adapter = adapter
+
+    def __get__(self, instance: Any, owner: type) -> Any:
+        if instance is None:
+            return self
+        values = instance._lazy_values
+        try:
+            return values[self.name]
+        except KeyError:
+            value = values[self.name] = self.adapter.validate_python(instance.__dict__[self.name])
+            return value
+
+    def __set__(self, instance: Any, value: Any):
+        instance.__dict__[self.name] = value
+        instance._lazy_values.pop(self.name, None)
+
+
+def LazyEvent(event: type[BaseModel], *lazyFields: str) -> type[BaseModel]:
+    """
+    生成 event 的延迟校验子类
+
+    lazyFields 在解码时只解析为原始 JSON 值，其余字段照常校验，子类与 event 的 isinstance 判断一致，
+    序列化时会先校验这些字段，因此输出与 event 相同
+    """
+    def serializeLazyField(self, value: Any, info) -> Any:
+        return getattr(self, info.field_name)
+
+    def copy(self):
+        # 默认的浅拷贝与原对象共享 _lazy_values，对其中一个字段赋值会使另一个的缓存失效
+        copied = event.__copy__(self)
+        copied.__pydantic_private__["_lazy_values"] = dict(self._lazy_values)
+        return copied
+
+    def modelCopy(self, *, update: Optional[Mapping[str, Any]] = None, deep: bool = False):
+        copied = event.model_copy(self, update=update, deep=deep)
+        if update:
+            # update 直接写入 __dict__，缓存的旧值需要丢弃
+            for name in update:
+                copied._lazy_values.pop(name, None)
+        return copied
+
+    namespace: dict[str, Any] = {
+        "__module__": __name__,
+        "__annotations__": {name: Any for name in lazyFields},
+        "_lazy_values": PrivateAttr(default_factory=dict),
+        "serialize_lazy_field": field_serializer(*lazyFields)(serializeLazyField),
+        "__copy__": copy,
+        "model_copy": modelCopy,
+    }
+    for name in lazyFields:
+        field = event.model_fields[name]
+        if not field.is_required():
+            namespace[name] = field.default
+    lazyEvent = type(f"Lazy{event.__name__}", (event,), namespace)
+    for name in lazyFields:
+        field = event.model_fields[name]
+        annotation = Annotated[field.annotation, *field.metadata] if field.metadata else field.annotation
+        setattr(lazyEvent, name, _LazyField(name, TypeAdapter(annotation)))
+
+    LazyEventMap[event] = lazyEvent
+    if event in EventQuickOperationMap:
+        EventQuickOperationMap[lazyEvent] = EventQuickOperationMap[event]
+    return lazyEvent
+
+
+LazyPrivateMessageEvent = LazyEvent(PrivateMessageEvent, "message", "sender")
+LazyGroupMessageEvent = LazyEvent(GroupMessageEvent, "message", "sender", "anonymous")
+LazyHeartbeatEvent = LazyEvent(HeartbeatEvent, "status")
@@ -1,6 +1,7 @@
 from typing import Annotated, Literal, Optional, Union
 from pydantic import BaseModel, Field
-from ..message import Message
+from ..message.compact import SendingMessage
+from ..message.cqcode import ReceivedMessage
 from .base import EventBase, QuickOperation, Event
 
 
@@ -21,7 +22,7 @@ class PrivateMessageEvent(MessageEventBase):
     sub_type: Literal["friend", "group", "other"]
     message_id: int
     user_id: int
-    message: Message
+    message: ReceivedMessage
     raw_message: str
     font: int
     sender: PrivateSenderInfo
@@ -29,7 +30,7 @@ class PrivateMessageEvent(MessageEventBase):
 
 @QuickOperation(PrivateMessageEvent)
 class PrivateMessageEventQuickOperation(BaseModel):
-    reply: Optional[Message] = None
+    reply: Optional[SendingMessage] = None
     auto_escape: Optional[bool] = None
 
 
@@ -58,7 +59,7 @@ class GroupMessageEvent(MessageEventBase):
     group_id: int
     user_id: int
     anonymous: Optional[AnonymousInfo] = None
-    message: Message
+    message: ReceivedMessage
     raw_message: str
     font: int
     sender: GroupSenderInfo
@@ -66,7 +67,7 @@ class GroupMessageEvent(MessageEventBase):
 
 @QuickOperation(GroupMessageEvent)
 class GroupMessageEventQuickOperation(BaseModel):
-    reply: Optional[Message] = None
+    reply: Optional[SendingMessage] = None
     auto_escape: Optional[bool] = None
     at_sender: Optional[bool] = None
     delete: Optional[bool] = None
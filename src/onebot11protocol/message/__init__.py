@@ -1 +1 @@
-from .segment import Message, Segment
+from .segment import Message, Segment, CompactSegment
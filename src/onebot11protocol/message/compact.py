@@ -0,0 +1,40 @@
+from typing import Annotated, Any
+from pydantic import BaseModel, BeforeValidator, TypeAdapter
+
+from .segment import CompactSegment, Message
+
+
+type CompactMessage = list[CompactSegment]
+
+_messageAdapter: TypeAdapter[Message] = TypeAdapter(Message)
+
+
+def to_compact(message: Message) -> CompactMessage:
+    return [CompactSegment(segment.type, segment.data.model_dump(exclude_none=True)) for segment in message]
+
+
+def from_compact(message: CompactMessage) -> Message:
+    return _messageAdapter.validate_python([segment._asdict() for segment in message])
+
+
+def compact_from_json(value: list[dict[str, Any]]) -> CompactMessage:
+    """从 JSON 解析得到的数组形式消息直接构造，不经过 pydantic 校验"""
+    return [CompactSegment(segment["type"], segment["data"]) for segment in value]
+
+
+def compact_message_of(event: Any) -> CompactMessage:
+    """取得消息事件的紧凑形式，对尚未访问 message 的延迟事件直接使用原始值"""
+    raw = event.__dict__["message"]
+    if isinstance(raw, list) and raw and not isinstance(raw[0], BaseModel):
+        return compact_from_json(raw)
+    return to_compact(event.message)
+
+
+def _expand_compact(value: Any) -> Any:
+    if isinstance(value, list) and any(isinstance(segment, CompactSegment) for segment in value):
+        return [segment._asdict() if isinstance(segment, CompactSegment) else segment for segment in value]
+    return value
+
+
+SendingMessage = Annotated[Message, BeforeValidator(_expand_compact)]
+"""发送用的消息，除 Segment 外也接受 CompactSegment"""
@@ -0,0 +1,165 @@
+from functools import lru_cache
+import re
+from typing import Annotated, Any, Iterable, Iterator, Literal, Union, get_args, get_origin
+from pydantic import AfterValidator, BaseModel, Field
+
+from .segment import DataSegmentMap, Message, Segment, TextData, TextSegment
+
+
+_textEscapeTable = str.maketrans({"&": "&amp;", "[": "&#91;", "]": "&#93;"})
+_paramEscapeTable = str.maketrans({"&": "&amp;", "[": "&#91;", "]": "&#93;", ",": "&#44;"})
+_unescapeMap = {"&amp;": "&", "&#91;": "[", "&#93;": "]", "&#44;": ","}
+_unescapePattern = re.compile("&(?:amp|#91|#93|#44);")
+_cqCodePattern = re.compile(r"\[CQ:([^,\[\]]+)((?:,[^,=\[\]]+=[^,\[\]]*)*)\]")
+
+CACHED_LENGTH_LIMIT = 4096
+"""超过此长度的字符串不进入 LRU 缓存"""
+
+
+def escape(text: str, param: bool = False) -> str:
+    """转义纯文本，param 为 true 时按 CQ 码参数值转义（额外转义逗号）"""
+    return text.translate(_paramEscapeTable if param else _textEscapeTable)
+
+
+def unescape(text: str) -> str:
+    if "&" not in text:
+        return text
+    return _unescapePattern.sub(lambda match: _unescapeMap[match[0]], text)
+
+
+def _int_literal_fields(dataType: type[BaseModel]) -> set[str]:
+    """CQ 码中参数值都是字符串，而 pydantic 不会把 "0" 转换为 Literal[0, 1]，需要事先找出这样的字段"""
+    fields = set()
+    for name, field in dataType.model_fields.items():
+        annotation = field.annotation
+        if get_origin(annotation) is Union:
+            annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+        if get_origin(annotation) is Literal and all(isinstance(arg, int) for arg in get_args(annotation)):
+            fields.add(name)
+    return fields
+
+
+_segmentTypes: dict[str, tuple[type[BaseModel], set[str]]] = {}
+for _dataType, _segmentType in DataSegmentMap.items():
+    _name = get_args(_segmentType.model_fields["type"].annotation)[0]
+    _intFields = _segmentTypes[_name][1] if _name in _segmentTypes else set()
+    _segmentTypes[_name] = (_segmentType, _intFields | _int_literal_fields(_dataType))
+
+
+def _text_segment(text: str) -> TextSegment:
+    return TextSegment(type="text", data=TextData(text=unescape(text)))
+
+
+def _cq_segment(name: str, params: str) -> Segment:
+    try:
+        segmentType, intFields = _segmentTypes[name]
+    except KeyError:
+        raise ValueError(f"Unknown CQ code type: {name}") from None
+    data: dict[str, Any] = {}
+    if params:
+        for param in params[1:].split(","):
+            key, _, value = param.partition("=")
+            value = unescape(value)
+            data[key] = int(value) if key in intFields and value.lstrip("-").isdigit() else value
+    return segmentType.model_validate({"type": name, "data": data})
+
+
+def _parse(text: str) -> Message:
+    if "[" not in text:
+        return [_text_segment(text)] if text else []
+    message: Message = []
+    position = 0
+    for match in _cqCodePattern.finditer(text):
+        if match.start() > position:
+            message.append(_text_segment(text[position:match.start()]))
+        message.append(_cq_segment(match[1], match[2]))
+        position = match.end()
+    if position < len(text):
+        message.append(_text_segment(text[position:]))
+    return message
+
+
+@lru_cache(maxsize=1024)
+def _parse_cached(text: str) -> tuple[Segment, ...]:
+    return tuple(_parse(text))
+
+
+def parse(text: str) -> Message:
+    """
+    将 CQ 码字符串解析为 Message，未知的 CQ 码类型抛出 ValueError，参数不合法时抛出 ValidationError
+
+    较短的字符串会经过 LRU 缓存，返回的是缓存中消息段的副本，可以随意修改
+    """
+    if len(text) > CACHED_LENGTH_LIMIT:
+        return _parse(text)
+    return [segment.model_copy(deep=True) for segment in _parse_cached(text)]
+
+
+def parse_stream(chunks: Iterable[str]) -> Iterator[Segment]:
+    """
+    流式解析分块到达的 CQ 码字符串，每个 CQ 码完整后立即产出
+
+    相邻的纯文本会合并为一个 TextSegment，因此结果与 parse 拼接后的整个字符串相同
+    """
+    text = ""
+    # 以 "[" 开头、还没有 "]" 的部分，只在新的块中查找 "]"，避免反复扫描
+    pending: list[str] = []
+    for chunk in chunks:
+        if pending:
+            pending.append(chunk)
+            if "]" not in chunk:
+                continue
+            buffer = "".join(pending)
+            pending = []
+        else:
+            buffer = chunk
+        position = 0
+        while True:
+            start = buffer.find("[", position)
+            if start < 0:
+                text += buffer[position:]
+                break
+            end = buffer.find("]", start)
+            if end < 0:
+                # CQ 码还不完整，留到下一块
+                text += buffer[position:start]
+                pending.append(buffer[start:])
+                break
+            match = _cqCodePattern.match(buffer, start, end + 1)
+            if match is None:
+                # 不是 CQ 码开头的方括号按文本处理
+                text += buffer[position:start + 1]
+                position = start + 1
+                continue
+            text += buffer[position:start]
+            if text:
+                yield _text_segment(text)
+                text = ""
+            yield _cq_segment(match[1], match[2])
+            position = end + 1
+    text += "".join(pending)
+    if text:
+        yield _text_segment(text)
+
+
+def dumps(message: Iterable[Any]) -> str:
+    """将 Message 序列化为 CQ 码字符串，也接受 CompactSegment"""
+    parts: list[str] = []
+    for segment in message:
+        data = segment.data if isinstance(segment.data, dict) else segment.data.model_dump(exclude_none=True)
+        if segment.type == "text":
+            parts.append(escape(data["text"]))
+            continue
+        parts.append(f"[CQ:{segment.type}")
+        for key, value in data.items():
+            if value is None:
+                continue
+            if isinstance(value, (list, dict)):
+                raise ValueError(f"Segment {segment.type} cannot be represented as CQ code")
+            parts.append(f",{key}={escape(str(value), True)}")
+        parts.append("]")
+    return "".join(parts)
+
+
+ReceivedMessage = Annotated[Union[Message, Annotated[str, AfterValidator(parse)]], Field(union_mode="left_to_right")]
+"""接收到的消息，兼容以字符串格式上报的实现"""
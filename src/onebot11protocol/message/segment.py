@@ -1,5 +1,5 @@
-from typing import Annotated, Literal, Optional, Union
-from pydantic import Field, BaseModel
+from typing import Annotated, Any, Literal, NamedTuple, Optional, Union
+from pydantic import Field, BaseModel, TypeAdapter
 
 DataSegmentMap: dict[type, type] = {}
 
@@ -301,10 +301,28 @@ Segment = Annotated[Union[TextSegment, FaceSegment, ImageSegment, RecordSegment,
 Message = list[Segment]
 
 
+class CompactSegment(NamedTuple):
+    """
+    紧凑的消息段，只有类型标签与 JSON 形式的数据，用于大量保存消息的场合
+
+    与 Segment 之间的转换见 message.compact
+    """
+    type: str
+    data: dict[str, Any]
+
+
+_segmentAdapter: TypeAdapter[Segment] = TypeAdapter(Segment)
+
+
 class MessageBuilder:
-    content = Message()
+    def __init__(self) -> None:
+        self.content = Message()
 
     def add(self, data):
+        """data 可以是各种 Data 模型，也可以是 CompactSegment"""
+        if isinstance(data, CompactSegment):
+            self.content.append(_segmentAdapter.validate_python(data._asdict()))
+            return self
         segmentType = DataSegmentMap[type(data)]
         self.content.append(segmentType(data=data))
         return self
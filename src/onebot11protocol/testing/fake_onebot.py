@@ -0,0 +1,218 @@
+import asyncio
+from collections import OrderedDict
+import copy
+from dataclasses import dataclass, field
+import hmac
+from http import HTTPStatus
+import itertools
+import json
+import random
+import time
+from types import ModuleType
+from typing import Any, Optional
+
+import websockets
+
+from ..api import hidden, public
+from ..event.message import GroupMessageEvent, PrivateMessageEvent
+from .samples import event_types, sample_model
+
+
+def api_request_types(module: ModuleType = public) -> list[type]:
+    """module 中定义的所有 APIRequest 子类"""
+    return [value for value in vars(module).values()
+            if isinstance(value, type) and value.__module__ == module.__name__ and hasattr(value, "typeParameters")]
+
+
+def default_api_data() -> dict[str, Any]:
+    """api 名 -> 符合响应模型的 data，包括 .handle_quick_operation 等隐藏 api"""
+    return {requestType.typeParameters[0].__args__[0]: sample_model(requestType.typeParameters[1])
+            for requestType in api_request_types() + api_request_types(hidden)}
+
+
+@dataclass
+class LoadProfile:
+    rate: float = 100
+    """平均每秒产生的事件数"""
+    burst: int = 1
+    """每次连续发出的事件数，事件以 burst 个为一组，每组间隔 burst / rate 秒"""
+    count: Optional[int] = None
+    """发出的事件总数，None 表示不限"""
+    group_count: int = 10
+    user_count: int = 100
+    message_size: int = 1
+    """消息事件中的消息段数"""
+    text_length: int = 16
+    weights: dict[type, float] = field(default_factory=lambda: {GroupMessageEvent: 20, PrivateMessageEvent: 5})
+    """事件模型 -> 权重，未列出的事件模型权重为 1，权重为 0 时不产生"""
+
+
+class EventGenerator:
+    """
+    按 LoadProfile 产生覆盖所有事件模型的合成事件
+
+    消息事件的 message_id 从 1 开始递增且不重复，可用于在处理器中找到对应的发送时间
+    """
+
+    def __init__(self, profile: LoadProfile, selfId: int = 10000, seed: Optional[int] = None) -> None:
+        self.profile = profile
+        self.self_id = selfId
+        self.random = random.Random(seed)
+        self.templates = {eventType: sample_model(eventType) for eventType in event_types()}
+        weighted = [(eventType, profile.weights.get(eventType, 1)) for eventType in self.templates]
+        self.types = [eventType for eventType, weight in weighted if weight > 0]
+        self.cumulative = list(itertools.accumulate(weight for _, weight in weighted if weight > 0))
+        self.message_ids = itertools.count(1)
+
+    def _message(self) -> tuple[list[dict], str]:
+        segments = []
+        for index in range(self.profile.message_size):
+            if index % 4 == 3:
+                segments.append({"type": "face", "data": {"id": str(self.random.randrange(200))}})
+            else:
+                text = "".join(self.random.choices("abcdefghijklmnopqrstuvwxyz ", k=self.profile.text_length))
+                segments.append({"type": "text", "data": {"text": text}})
+        rawMessage = "".join(segment["data"]["text"] if segment["type"] == "text" else f"[CQ:face,id={segment['data']['id']}]"
+                             for segment in segments)
+        return segments, rawMessage
+
+    def next(self) -> dict[str, Any]:
+        eventType = self.random.choices(self.types, cum_weights=self.cumulative)[0]
+        event = copy.deepcopy(self.templates[eventType])
+        event["time"] = int(time.time())
+        event["self_id"] = self.self_id
+        if "group_id" in event:
+            event["group_id"] = 100000 + self.random.randrange(self.profile.group_count)
+        if "user_id" in event:
+            event["user_id"] = 200000 + self.random.randrange(self.profile.user_count)
+        if "message" in event:
+            event["message_id"] = next(self.message_ids)
+            event["message"], event["raw_message"] = self._message()
+        return event
+
+
+class FakeOneBot:
+    """
+    进程内的 OneBot 11 实现替身
+
+    既可以作为正向 WebSocket 服务端（start），也可以作为客户端连接反向 WebSocket（connect_reverse）
+    连接建立后按 profile 推送合成事件，并在 latency 秒后以 api_data 中的数据响应所有 api 调用，
+    api_data 未包含的 api 以 retcode 1404 响应
+
+    event_sent_times 记录每个消息事件（按 message_id）发出时的 time.perf_counter()，取用后应当 pop，
+    最多保留最近的 max_sent_times 条，不限事件总数时也不会无限增长
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, self_id: int = 10000, access_token: Optional[str] = None,
+                 latency: float = 0, profile: Optional[LoadProfile] = None, api_data: Optional[dict[str, Any]] = None,
+                 seed: Optional[int] = None, max_sent_times: int = 100000) -> None:
+        self.host = host
+        self.requested_port = port
+        self.self_id = self_id
+        self.access_token = access_token
+        self.latency = latency
+        self.profile = profile
+        self.api_data = default_api_data() if api_data is None else api_data
+        self.generator = EventGenerator(profile, self_id, seed) if profile is not None else None
+        self.event_sent_times: OrderedDict[int, float] = OrderedDict()
+        self.max_sent_times = max_sent_times
+        self.events_sent = 0
+        self.api_calls = 0
+        self.events_finished = asyncio.Event()
+        self.server = None
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def _process_request(self, connection: Any, request: Any):
+        if self.access_token is not None:
+            authorization = request.headers.get("Authorization", "")
+            if not hmac.compare_digest(authorization.encode(), f"Bearer {self.access_token}".encode()):
+                return connection.respond(HTTPStatus.UNAUTHORIZED, "Invalid access token\n")
+        return None
+
+    async def start(self):
+        """作为正向 WebSocket 服务端开始监听"""
+        self.server = await websockets.serve(self._handle, self.host, self.requested_port, process_request=self._process_request)
+
+    async def connect_reverse(self, url: str) -> asyncio.Task:
+        """连接反向 WebSocket，返回处理该连接的任务"""
+        headers = {"X-Self-ID": str(self.self_id), "X-Client-Role": "Universal"}
+        if self.access_token is not None:
+            headers["Authorization"] = f"Bearer {self.access_token}"
+        websocket = await websockets.connect(url, additional_headers=headers)
+        return asyncio.get_running_loop().create_task(self._handle(websocket))
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *excInfo):
+        await self.stop()
+
+    async def _handle(self, websocket: Any):
+        streamer = asyncio.get_running_loop().create_task(self._stream_events(websocket)) if self.generator is not None else None
+        responders: set[asyncio.Task] = set()
+        try:
+            async for data in websocket:
+                task = asyncio.get_running_loop().create_task(self._respond(websocket, json.loads(data)))
+                responders.add(task)
+                task.add_done_callback(responders.discard)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if streamer is not None:
+                streamer.cancel()
+            for task in list(responders):
+                task.cancel()
+            await websocket.close()
+
+    async def _respond(self, websocket: Any, request: dict[str, Any]):
+        self.api_calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        action = request.get("action")
+        if action in self.api_data:
+            response = {"status": "ok", "retcode": 0, "data": self.api_data[action]}
+        else:
+            response = {"status": "failed", "retcode": 1404, "data": None}
+        if "echo" in request:
+            response["echo"] = request["echo"]
+        try:
+            await websocket.send(json.dumps(response))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _stream_events(self, websocket: Any):
+        profile = self.profile
+        interval = profile.burst / profile.rate
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        try:
+            while profile.count is None or self.events_sent < profile.count:
+                burst = profile.burst if profile.count is None else min(profile.burst, profile.count - self.events_sent)
+                for _ in range(burst):
+                    event = self.generator.next()
+                    if "message_id" in event and "message" in event:
+                        self.event_sent_times[event["message_id"]] = time.perf_counter()
+                        if len(self.event_sent_times) > self.max_sent_times:
+                            self.event_sent_times.popitem(last=False)
+                    await websocket.send(json.dumps(event))
+                    self.events_sent += 1
+                # 以固定的时间表发送，避免误差累积
+                deadline += interval
+                await asyncio.sleep(max(0, deadline - loop.time()))
+            self.events_finished.set()
+        except websockets.ConnectionClosed:
+            pass
+
@@ -0,0 +1,103 @@
+import asyncio
+import json
+from typing import Any, Callable, Optional
+
+
+type Responder = Callable[[str, dict], Any]
+"""(action, params) -> data，抛出 KeyError 表示 api 不存在"""
+
+
+def default_responder(action: str, params: dict) -> Any:
+    if action.startswith("send_"):
+        return {"message_id": 1}
+    if action == "get_login_info":
+        return {"user_id": 10000, "nickname": "stand-in"}
+    return None
+
+
+class StandInHTTPAPIServer:
+    """
+    本地的 OneBot HTTP API 替身，用于测试与基准
+
+    支持 keep-alive 与 pipelining（同一连接上的请求按顺序处理），每个请求在 latency 秒后响应
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, access_token: Optional[str] = None,
+                 responder: Responder = default_responder, latency: float = 0) -> None:
+        self.host = host
+        self.requested_port = port
+        self.access_token = access_token
+        self.responder = responder
+        self.latency = latency
+        self.server: Optional[asyncio.Server] = None
+        self.request_count = 0
+        self.connection_count = 0
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.requested_port)
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *excInfo):
+        await self.stop()
+
+    def _respond(self, path: str, headers: dict[str, str], body: bytes) -> tuple[int, Any]:
+        if self.access_token is not None:
+            authorization = headers.get("authorization")
+            if authorization is None:
+                return 401, None
+            if authorization != f"Bearer {self.access_token}":
+                return 403, None
+        try:
+            params = json.loads(body) if body else {}
+        except ValueError:
+            return 400, None
+        try:
+            data = self.responder(path.lstrip("/"), params)
+        except KeyError:
+            return 404, None
+        return 200, {"status": "ok", "retcode": 0, "data": data}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connection_count += 1
+        try:
+            while True:
+                requestLine = await reader.readline()
+                if not requestLine:
+                    break
+                _, path, _ = requestLine.decode("latin-1").split(" ", 2)
+                headers: dict[str, str] = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.request_count += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                status, content = self._respond(path, headers, body)
+                responseBody = json.dumps(content).encode() if content is not None else b""
+                keepAlive = headers.get("connection", "keep-alive").lower() != "close"
+                writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(responseBody)}\r\n"
+                             f"Connection: {'keep-alive' if keepAlive else 'close'}\r\n\r\n".encode() + responseBody)
+                await writer.drain()
+                if not keepAlive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
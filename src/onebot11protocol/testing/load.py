@@ -0,0 +1,139 @@
+"""
+对进程内 OneBot 替身的合成负载测试
+
+FakeOneBot 按给定速率与突发形状推送覆盖所有事件模型的合成事件，处理器对其中一部分消息事件调用 api 回复，
+报告消息事件从发出到进入处理器的延迟与 api 往返时间的分位数
+
+用法: python -m onebot11protocol.testing.load [--rate 1000] [--count 5000] [--burst 1] [--reverse] ...
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+import time
+from typing import Optional
+
+from ..api.public import SendGroupMsgReq, SendPrivateMsgReq
+from ..communication.base import CommunicationSessionBase, EventHandler
+from ..communication.reverse_ws import ReverseWebSocketCommunication, ReverseWebSocketEndpoint
+from ..communication.ws import WebSocketCommunication, WebSocketEndpoint
+from ..event import Event
+from ..event.message import GroupMessageEvent
+from ..message.segment import TextData, build_message
+from .fake_onebot import FakeOneBot, LoadProfile
+
+
+def percentiles(samples: list[float], fractions: tuple[float, ...] = (0.5, 0.9, 0.99)) -> list[float]:
+    if not samples:
+        return [0.0 for _ in fractions]
+    ordered = sorted(samples)
+    return [ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] for fraction in fractions]
+
+
+@dataclass
+class LoadReport:
+    events_sent: int = 0
+    events_handled: int = 0
+    duration: float = 0
+    event_latencies: list[float] = field(default_factory=list)
+    """消息事件从 FakeOneBot 发出到进入处理器的秒数"""
+    api_round_trips: list[float] = field(default_factory=list)
+    api_failures: int = 0
+
+    def summary(self) -> str:
+        lines = [f"events: {self.events_sent} sent, {self.events_handled} handled in {self.duration:.2f}s "
+                 f"({self.events_handled / self.duration if self.duration else 0:.0f}/s)"]
+        for name, samples in (("event -> handler", self.event_latencies), ("api round trip", self.api_round_trips)):
+            p50, p90, p99 = percentiles(samples)
+            lines.append(f"{name:<18}n={len(samples):<8}p50={p50 * 1e3:.2f}ms p90={p90 * 1e3:.2f}ms p99={p99 * 1e3:.2f}ms")
+        if self.api_failures:
+            lines.append(f"api failures: {self.api_failures}")
+        return "\n".join(lines)
+
+
+class _LoadHandler(EventHandler):
+    def __init__(self, fake: FakeOneBot, report: LoadReport, replyEvery: int) -> None:
+        self.fake = fake
+        self.report = report
+        self.reply_every = replyEvery
+        self.done = asyncio.Event()
+
+    async def on_event(self, session: CommunicationSessionBase, event: Event):
+        report = self.report
+        report.events_handled += 1
+        messageId = getattr(event, "message_id", None)
+        sentAt = self.fake.event_sent_times.pop(messageId, None) if hasattr(event, "message") else None
+        if sentAt is not None:
+            report.event_latencies.append(time.perf_counter() - sentAt)
+            if self.reply_every and messageId % self.reply_every == 0:
+                message = build_message(TextData(text="pong"))
+                request = (SendGroupMsgReq(group_id=event.group_id, message=message) if isinstance(event, GroupMessageEvent)
+                           else SendPrivateMsgReq(user_id=event.user_id, message=message))
+                start = time.perf_counter()
+                try:
+                    await session.send(request)
+                except Exception:
+                    report.api_failures += 1
+                else:
+                    report.api_round_trips.append(time.perf_counter() - start)
+        if self.fake.profile.count is not None and report.events_handled >= self.fake.profile.count:
+            self.done.set()
+
+
+async def run_load(profile: LoadProfile, latency: float = 0, reply_every: int = 10, reverse: bool = False,
+                   timeout: Optional[float] = None) -> LoadReport:
+    """
+    以 profile 对 FakeOneBot 施加负载，profile.count 必须指定
+    每 reply_every 条消息事件回复一次，为 0 时不调用 api
+    """
+    if profile.count is None:
+        raise ValueError("profile.count must be set for a load run")
+    report = LoadReport()
+    fake = FakeOneBot(latency=latency, profile=profile, seed=0)
+    handler = _LoadHandler(fake, report, reply_every)
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    if reverse:
+        async with ReverseWebSocketCommunication().create(ReverseWebSocketEndpoint(port=0), handler) as server:
+            connection = await fake.connect_reverse(f"ws://127.0.0.1:{server.port}")
+            try:
+                async with asyncio.timeout(timeout):
+                    await handler.done.wait()
+            finally:
+                report.duration = time.perf_counter() - start
+                connection.cancel()
+                await asyncio.gather(connection, return_exceptions=True)
+    else:
+        async with fake:
+            session = WebSocketCommunication().create(WebSocketEndpoint(fake.url), handler)
+            async with session:
+                runner = loop.create_task(session.run())
+                try:
+                    async with asyncio.timeout(timeout):
+                        await handler.done.wait()
+                finally:
+                    report.duration = time.perf_counter() - start
+            await asyncio.gather(runner, return_exceptions=True)
+    report.events_sent = fake.events_sent
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=1000, help="每秒事件数")
+    parser.add_argument("--count", type=int, default=5000, help="事件总数")
+    parser.add_argument("--burst", type=int, default=1, help="每次连续发出的事件数")
+    parser.add_argument("--groups", type=int, default=10, help="群的数量")
+    parser.add_argument("--message-size", type=int, default=1, help="每条消息的消息段数")
+    parser.add_argument("--latency", type=float, default=0, help="api 响应延迟，单位秒")
+    parser.add_argument("--reply-every", type=int, default=10, help="每多少条消息事件调用一次 api，0 表示不调用")
+    parser.add_argument("--reverse", action="store_true", help="使用反向 WebSocket")
+    args = parser.parse_args()
+
+    profile = LoadProfile(rate=args.rate, burst=args.burst, count=args.count, group_count=args.groups,
+                          message_size=args.message_size)
+    report = asyncio.run(run_load(profile, args.latency, args.reply_every, args.reverse))
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
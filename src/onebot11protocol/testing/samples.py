@@ -0,0 +1,57 @@
+import types
+from typing import Annotated, Any, Literal, Union, get_args, get_origin
+from pydantic import BaseModel
+
+from ..event import Event
+
+
+def sample_value(annotation: Any) -> Any:
+    """
+    按类型标注生成一个可以通过校验的 JSON 值
+
+    Union 取第一个非 None 的成员，Literal 取第一个值，模型包含所有字段
+    """
+    origin = get_origin(annotation)
+    if origin is Annotated:
+        return sample_value(get_args(annotation)[0])
+    if origin is Union or origin is types.UnionType:
+        return sample_value(next(arg for arg in get_args(annotation) if arg is not type(None)))
+    if origin is Literal:
+        return get_args(annotation)[0]
+    if origin is list:
+        return [sample_value(get_args(annotation)[0])]
+    if origin is dict:
+        return {}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return sample_model(annotation)
+    if annotation is bool:
+        return True
+    if annotation is int:
+        return 1
+    if annotation is float:
+        return 1.0
+    if annotation is str:
+        return "sample"
+    return None
+
+
+def sample_model(model: type[BaseModel]) -> Any:
+    if "root" in model.model_fields and len(model.model_fields) == 1:
+        # RootModel
+        return sample_value(model.model_fields["root"].annotation)
+    return {name: sample_value(field.annotation) for name, field in model.model_fields.items()}
+
+
+def event_types(annotation: Any = Event) -> list[type[BaseModel]]:
+    """展开 Event 的 discriminated union，返回所有具体的事件模型"""
+    origin = get_origin(annotation)
+    if origin is Annotated:
+        return event_types(get_args(annotation)[0])
+    if origin is Union:
+        return [event for member in get_args(annotation) for event in event_types(member)]
+    return [annotation]
+
+
+def sample_events() -> dict[type[BaseModel], dict[str, Any]]:
+    """每种事件模型的一个样例，以 JSON 值的形式"""
+    return {event: sample_model(event) for event in event_types()}
@@ -0,0 +1,46 @@
+import asyncio
+from typing import Any, Callable, Optional
+
+from onebot11protocol.communication.base import CommunicationSessionBase
+from onebot11protocol.testing.samples import sample_model
+
+
+class FakeSession(CommunicationSessionBase):
+    """
+    记录收到的请求并以 responses 中的数据响应的 session，用于测试 session 中间层
+
+    responses 为 api 名 -> data，或 api 名 -> (请求, 第几个请求) -> data 的函数，
+    未列出的 api 以 sample_model 构造的数据响应，delay 不为 0 时每个请求等待 delay 秒后响应
+    """
+
+    def __init__(self, responses: Optional[dict[str, Any | Callable[[Any, int], Any]]] = None, delay: float = 0) -> None:
+        self.responses = responses or {}
+        self.delay = delay
+        self.requests = []
+        self.quick_operations = []
+        self.event_handler = None
+
+    async def send(self, request, **options):
+        self.requests.append(request)
+        index = len(self.requests)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        apiName, respType = request.typeParameters
+        data = self.responses.get(apiName.__args__[0])
+        if callable(data):
+            data = data(request, index)
+        elif data is None:
+            data = sample_model(respType)
+        return respType.model_validate(data)
+
+    async def quick_operation(self, event, operation=None, timeout=None, **kwargs):
+        self.quick_operations.append(event)
+
+    async def run(self):
+        pass
+
+    async def connect(self):
+        pass
+
+    async def disconnect(self):
+        pass
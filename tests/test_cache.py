@@ -0,0 +1,63 @@
+import asyncio
+from pydantic import TypeAdapter
+
+from onebot11protocol.api.public import GetGroupMemberInfoReq, GetLoginInfoReq, GetStatusReq, GetStrangerInfoReq
+from onebot11protocol.communication.base import EventHandler
+from onebot11protocol.communication.cache import CachedSession
+from onebot11protocol.event import Event
+
+from .fakes import FakeSession
+
+
+MEMBER = {'group_id': 1, 'user_id': 2, 'nickname': 'a', 'card': '', 'sex': 'unknown', 'age': 0, 'area': '', 'join_time': 0,
+          'last_sent_time': 0, 'level': '1', 'role': 'member', 'unfriendly': False, 'title': '', 'title_expire_time': 0, 'card_changable': True}
+
+
+RESPONSES = {'get_login_info': {'user_id': 1, 'nickname': 'bot'},
+             'get_status': {'online': True, 'good': True},
+             'get_stranger_info': lambda request, _: {'user_id': request.user_id, 'nickname': 'a', 'sex': 'unknown', 'age': 0},
+             'get_group_member_info': MEMBER}
+
+
+class RecordingHandler(EventHandler):
+    def __init__(self) -> None:
+        self.sessions = []
+
+    async def on_event(self, session, event):
+        self.sessions.append(session)
+
+
+def test_cache():
+    async def main():
+        inner = FakeSession(RESPONSES)
+        handler = RecordingHandler()
+        session = CachedSession(inner, handler, max_entries=3)
+        assert inner.event_handler is session
+
+        first = await session.send(GetLoginInfoReq())
+        assert await session.send(GetLoginInfoReq()) is first
+        await session.send(GetStatusReq())
+        await session.send(GetStatusReq())
+        assert (session.hits, session.misses, len(inner.requests)) == (1, 1, 3)
+
+        member = GetGroupMemberInfoReq(group_id=1, user_id=2)
+        await session.send(member)
+        await session.send(GetGroupMemberInfoReq(group_id=1, user_id=2, no_cache=False))
+        await session.send(GetGroupMemberInfoReq(group_id=1, user_id=2, no_cache=True))
+        assert len(inner.requests) == 5 and session.hits == 2
+
+        # 超出 max_entries 时淘汰最久未使用的 get_login_info
+        await session.send(GetStrangerInfoReq(user_id=3))
+        await session.send(GetStrangerInfoReq(user_id=4))
+        assert len(session.entries) == 3
+        await session.send(member)
+        await session.send(GetLoginInfoReq())
+        assert len(inner.requests) == 8
+
+        event = TypeAdapter(Event).validate_python({'time': 1, 'self_id': 1, 'post_type': 'notice', 'notice_type': 'group_ban',
+                                                    'sub_type': 'ban', 'group_id': 1, 'operator_id': 5, 'user_id': 2, 'duration': 60})
+        await inner.event_handler.on_event(inner, event)
+        assert handler.sessions == [session]
+        await session.send(member)
+        assert len(inner.requests) == 9
+    asyncio.run(main())
@@ -0,0 +1,40 @@
+import asyncio
+import pytest
+
+from onebot11protocol.api.public import GetGroupMemberInfoReq, GetStrangerInfoReq, SendGroupMsgReq
+from onebot11protocol.communication.coalesce import CoalescingSession
+
+from .fakes import FakeSession
+
+
+RESPONSES = {'send_group_msg': lambda _, index: {'message_id': index},
+             'get_stranger_info': lambda request, _: {'user_id': request.user_id, 'nickname': 'a', 'sex': 'unknown', 'age': 0}}
+
+
+def test_coalesce():
+    async def main():
+        inner = FakeSession(RESPONSES, delay=0.01)
+        session = CoalescingSession(inner)
+        requests = [GetStrangerInfoReq(user_id=i % 2) for i in range(10)]
+        responses = await asyncio.gather(*(session.send(request) for request in requests))
+        assert len(inner.requests) == 2 and session.coalesced == 8
+        assert responses[0] is responses[2] and responses[1].user_id == 1
+        assert not session.in_flight
+
+        # 先发出的调用方被取消时，其余调用方仍能得到结果
+        first = asyncio.create_task(session.send(GetStrangerInfoReq(user_id=5)))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(session.send(GetStrangerInfoReq(user_id=5)))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert (await second).user_id == 5
+
+        sent = await asyncio.gather(*(session.send(SendGroupMsgReq(group_id=1, message=[])) for _ in range(3)))
+        assert len({response.message_id for response in sent}) == 3
+
+        with pytest.raises(ValueError):
+            CoalescingSession(inner, request_types=[SendGroupMsgReq])
+        only = CoalescingSession(inner, request_types=[GetGroupMemberInfoReq])
+        await asyncio.gather(*(only.send(GetStrangerInfoReq(user_id=1)) for _ in range(2)))
+        assert only.coalesced == 0
+    asyncio.run(main())
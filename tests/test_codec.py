@@ -0,0 +1,15 @@
+import json
+
+from onebot11protocol.api.public import SendGroupMsgReq
+from onebot11protocol.communication.codec import StdlibJSONCodec, dump_model, encode_api_request, get_default_codec
+from onebot11protocol.message.segment import FaceData, TextData, build_message
+
+
+def test_codec():
+    request = SendGroupMsgReq(group_id=1, message=build_message(TextData(text="你好\"]"), FaceData(id="1")))
+    frame = encode_api_request("send_group_msg", dump_model(request), "42")
+    expected = {"action": "send_group_msg", "params": request.model_dump(), "echo": "42"}
+    for codec in {StdlibJSONCodec(), get_default_codec()}:
+        assert codec.loads(frame) == expected
+        assert codec.loads(codec.dumps(expected)) == expected
+    assert json.loads(frame) == expected
@@ -0,0 +1,40 @@
+import json
+from pydantic import TypeAdapter
+
+from onebot11protocol.api.public import SendGroupMsgReq
+from onebot11protocol.communication.decoder import EventDecoder
+from onebot11protocol.message import CompactSegment, Message
+from onebot11protocol.message.compact import compact_message_of, from_compact, to_compact
+from onebot11protocol.message.segment import MessageBuilder, TextData, TextSegment
+
+
+RAW_MESSAGE = [
+    {'type': 'reply', 'data': {'id': '123'}},
+    {'type': 'text', 'data': {'text': 'hello'}},
+    {'type': 'image', 'data': {'file': 'a.png', 'url': 'http://example.com/a.png'}},
+    {'type': 'node', 'data': {'user_id': '1', 'nickname': 'a', 'content': [{'type': 'face', 'data': {'id': '14'}}]}},
+]
+
+
+def test_compact_round_trip():
+    message = TypeAdapter(Message).validate_python(RAW_MESSAGE)
+    compact = to_compact(message)
+    assert compact[1] == CompactSegment('text', {'text': 'hello'})
+    assert from_compact(compact) == message
+
+    frame = {'time': 1, 'self_id': 1, 'post_type': 'message', 'message_type': 'private', 'sub_type': 'friend', 'message_id': 1, 'user_id': 2,
+             'message': RAW_MESSAGE, 'raw_message': '', 'font': 0, 'sender': {}}
+    for lazy in (False, True):
+        event = EventDecoder(lazy=lazy).decode(json.dumps(frame))
+        assert from_compact(compact_message_of(event)) == message
+
+
+def test_compact_sending():
+    compact = [CompactSegment('at', {'qq': 'all'}), CompactSegment('text', {'text': ' hi'})]
+    request = SendGroupMsgReq(group_id=1, message=compact)
+    assert request.model_dump()['message'] == [{'type': 'at', 'data': {'qq': 'all'}}, {'type': 'text', 'data': {'text': ' hi'}}]
+
+    content = MessageBuilder().add(compact[0]).add(TextData(text=' hi')).finish()
+    assert content == request.message
+    assert type(content[1]) is TextSegment
+    assert MessageBuilder().finish() == []
@@ -0,0 +1,46 @@
+import json
+
+from onebot11protocol.communication.decoder import EventDecoder
+from onebot11protocol.message import CompactSegment
+from onebot11protocol.message.cqcode import dumps, escape, parse, parse_stream, unescape
+from onebot11protocol.message.segment import AtSegment, ImageSegment, SendingImageData, TextSegment
+
+
+RAW = "[CQ:reply,id=123][CQ:at,qq=10000] a&amp;b&#91;1&#93;[CQ:image,file=a&#44;b.png,cache=0,proxy=1,timeout=5][x[CQ:face,id=14]"
+
+
+def test_parse_and_dump():
+    assert unescape(escape("a&b[,]", True)) == "a&b[,]"
+    assert unescape("&amp;#91;") == "&#91;"
+
+    message = parse(RAW)
+    assert [segment.type for segment in message] == ["reply", "at", "text", "image", "text", "face"]
+    assert type(message[1]) is AtSegment and message[1].data.qq == "10000"
+    assert message[2].data.text == " a&b[1]"
+    assert type(message[3]) is ImageSegment and message[3].data == SendingImageData(file="a,b.png", cache=0, proxy=1, timeout=5)
+    assert message[4].data.text == "[x"
+    assert parse(dumps(message)) == message
+    assert parse(RAW) is not message and parse(RAW) == message
+    # 缓存的消息段不会被调用方的修改影响
+    message[2].data.text = "changed"
+    assert parse(RAW)[2].data.text == " a&b[1]"
+    assert parse("") == [] and parse("plain") == [TextSegment(data={"text": "plain"})]
+    assert dumps([CompactSegment("face", {"id": "1"}), CompactSegment("text", {"text": "[]"})]) == "[CQ:face,id=1]&#91;&#93;"
+
+
+def test_parse_stream():
+    for size in (1, 3, 7, len(RAW)):
+        chunks = [RAW[i:i + size] for i in range(0, len(RAW), size)]
+        assert list(parse_stream(chunks)) == parse(RAW)
+
+    # 未闭合的 "[" 后逐字符到达的长文本
+    longText = "[" + "x" * 100000
+    assert [segment.data.text for segment in parse_stream(longText)] == [longText]
+
+
+def test_string_format_event():
+    frame = {'time': 1, 'self_id': 1, 'post_type': 'message', 'message_type': 'group', 'sub_type': 'normal', 'message_id': 1, 'group_id': 3,
+             'user_id': 2, 'message': RAW, 'raw_message': RAW, 'font': 0, 'sender': {}}
+    for lazy in (False, True):
+        event = EventDecoder(lazy=lazy).decode(json.dumps(frame))
+        assert event.message == parse(RAW)
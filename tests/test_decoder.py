@@ -0,0 +1,64 @@
+import copy
+import json
+from pydantic import TypeAdapter
+
+from onebot11protocol.communication.decoder import EventDecoder
+from onebot11protocol.event import Event
+from onebot11protocol.event.message import GroupMessageEvent, PrivateMessageEvent
+from onebot11protocol.event.meta import HeartbeatEvent
+from onebot11protocol.event.notice import PokeNotifyNoticeEvent
+from onebot11protocol.message.segment import TextData, build_message
+
+
+def test_decoder():
+    decoder = EventDecoder()
+    frames = [
+        {'self_id': 1, 'user_id': 2, 'time': 3, 'message_id': 4, 'message_type': 'group', 'sender': {'user_id': 2, 'nickname': '测试', 'card': '', 'role': 'owner'},
+         'raw_message': '\\"post_type\\":\\"meta_event\\"', 'font': 14, 'sub_type': 'normal', 'message': [{'type': 'text', 'data': {'text': '"post_type":"meta_event"'}}], 'post_type': 'message', 'group_id': 114514},
+        {'time': 1, 'self_id': 1, 'post_type': 'notice', 'notice_type': 'notify',
+            'sub_type': 'poke', 'group_id': 2, 'user_id': 3, 'target_id': 1},
+        {'time': 1, 'self_id': 1, 'post_type': 'meta_event', 'meta_event_type': 'heartbeat',
+            'status': {'online': True, 'good': True}, 'interval': 5000},
+    ]
+    expected = [GroupMessageEvent, PokeNotifyNoticeEvent, HeartbeatEvent]
+    adapter = TypeAdapter(Event)
+    for frame, eventType in zip(frames, expected):
+        data = json.dumps(frame, ensure_ascii=False)
+        event = decoder.decode(data)
+        assert type(event) is eventType
+        assert event == adapter.validate_python(frame)
+        assert decoder.decode(data.encode()) == event
+
+    assert decoder.post_type_of('{"status": "ok", "retcode": 0, "data": null, "echo": "0"}') is None
+    # 响应的 data 中嵌套了完整的事件
+    nested = json.dumps({"status": "ok", "retcode": 0, "data": frames[0], "echo": "3"})
+    assert decoder.post_type_of(nested) is None
+    assert decoder.post_type_of(nested.encode()) is None
+    assert decoder.post_type_of(json.dumps({"data": frames[0], "retcode": 0, "status": "ok"})) is None
+
+
+def test_lazy_decoder():
+    frame = {'time': 1, 'self_id': 1, 'post_type': 'message', 'message_type': 'private', 'sub_type': 'friend', 'message_id': 1, 'user_id': 2,
+             'message': [{'type': 'text', 'data': {'text': 'hi'}}], 'raw_message': 'hi', 'font': 0, 'sender': {'user_id': 2, 'nickname': 'a'}}
+    event = EventDecoder(lazy=True).decode(json.dumps(frame))
+    expected = TypeAdapter(Event).validate_python(frame)
+    assert isinstance(event, PrivateMessageEvent) and type(event) is not PrivateMessageEvent
+    assert event.__dict__['message'] == frame['message']
+    assert event.message == expected.message and event.sender == expected.sender
+    assert event.model_dump() == expected.model_dump()
+
+
+def test_lazy_event_copy():
+    frame = {'time': 1, 'self_id': 1, 'post_type': 'message', 'message_type': 'private', 'sub_type': 'friend', 'message_id': 1, 'user_id': 2,
+             'message': [{'type': 'text', 'data': {'text': 'hi'}}], 'raw_message': 'hi', 'font': 0, 'sender': {'user_id': 2, 'nickname': 'a'}}
+    event = EventDecoder(lazy=True).decode(json.dumps(frame))
+    assert event.message[0].data.text == 'hi'
+    updated = event.model_copy(update={'message': build_message(TextData(text='updated'))})
+    assert updated.message[0].data.text == 'updated' and event.message[0].data.text == 'hi'
+
+    # 复制后各自的缓存互不影响
+    for copied in (event.model_copy(), copy.copy(event), copy.deepcopy(event)):
+        copied.message = build_message(TextData(text='assigned'))
+        assert copied.message[0].data.text == 'assigned' and event.message[0].data.text == 'hi'
+    event.message = build_message(TextData(text='original'))
+    assert updated.message[0].data.text == 'updated'
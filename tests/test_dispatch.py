@@ -0,0 +1,50 @@
+import asyncio
+
+from onebot11protocol.communication.base import EventHandler
+from onebot11protocol.communication.dispatch import EventDispatcher
+from onebot11protocol.event.meta import HeartbeatEvent
+from onebot11protocol.event.notice import GroupRecallNoticeEvent
+from onebot11protocol.api.shared import Status
+
+
+def _recall(groupId: int, messageId: int):
+    return GroupRecallNoticeEvent(notice_type="group_recall", time=0, self_id=0, group_id=groupId, user_id=0, operator_id=0, message_id=messageId)
+
+
+class RecordingHandler(EventHandler):
+    def __init__(self) -> None:
+        self.handled: dict[int, list[int]] = {}
+
+    async def on_event(self, session, event):
+        await asyncio.sleep(0)
+        self.handled.setdefault(event.group_id, []).append(event.message_id)
+
+
+def test_dispatch_order():
+    async def main():
+        handler = RecordingHandler()
+        dispatcher = EventDispatcher(worker_count=4, queue_size=8, overflow_policy="block")
+        for messageId in range(50):
+            for groupId in range(5):
+                await dispatcher.submit(None, handler, _recall(groupId, messageId))
+        await dispatcher.join()
+        await dispatcher.stop()
+        assert handler.handled == {groupId: list(range(50)) for groupId in range(5)}
+    asyncio.run(main())
+
+
+def test_dispatch_overflow():
+    async def main():
+        handler = RecordingHandler()
+        dispatcher = EventDispatcher(worker_count=1, queue_size=2, overflow_policy="drop_meta_first")
+        heartbeat = HeartbeatEvent(meta_event_type="heartbeat", time=0, self_id=0, status=Status(online=True, good=True), interval=1)
+        await dispatcher.submit(None, handler, heartbeat)
+        await dispatcher.submit(None, handler, _recall(0, 0))
+        assert dispatcher.queue_depth == 2
+        assert await dispatcher.submit(None, handler, _recall(0, 1))
+        assert not await dispatcher.submit(None, handler, heartbeat)
+        assert dispatcher.dropped == 2
+        await dispatcher.join()
+        await dispatcher.stop()
+        assert handler.handled == {0: [0, 1]}
+    asyncio.run(main())
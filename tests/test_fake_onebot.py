@@ -0,0 +1,73 @@
+import asyncio
+
+from pydantic import TypeAdapter
+import websockets
+
+from onebot11protocol.api import hidden
+from onebot11protocol.api.public import GetLoginInfoReq
+from onebot11protocol.communication.ws import WebSocketCommunication, WebSocketEndpoint
+from onebot11protocol.event import Event
+from onebot11protocol.event.message import GroupMessageEvent
+from onebot11protocol.testing.fake_onebot import EventGenerator, FakeOneBot, LoadProfile, api_request_types, default_api_data
+from onebot11protocol.testing.load import run_load
+from onebot11protocol.testing.samples import event_types
+
+
+def test_api_data_is_schema_valid():
+    data = default_api_data()
+    requestTypes = api_request_types() + api_request_types(hidden)
+    assert len(data) == len(requestTypes) > 30 and ".handle_quick_operation" in data
+    for requestType in requestTypes:
+        apiName, respType = requestType.typeParameters
+        TypeAdapter(respType).validate_python(data[apiName.__args__[0]])
+
+
+def test_event_generator_covers_all_events():
+    generator = EventGenerator(LoadProfile(group_count=3, message_size=5, weights={}), seed=1)
+    adapter = TypeAdapter(Event)
+    seen = set()
+    for _ in range(2000):
+        event = adapter.validate_python(generator.next())
+        seen.add(type(event))
+        if hasattr(event, "group_id") and hasattr(event, "message"):
+            assert 100000 <= event.group_id < 100003
+            assert len(event.message) == 5
+    assert seen == set(event_types())
+
+
+def test_fake_onebot_api():
+    event = GroupMessageEvent.model_validate({
+        'time': 1, 'self_id': 1, 'post_type': 'message', 'message_type': 'group', 'sub_type': 'normal', 'message_id': 1,
+        'group_id': 1, 'user_id': 2, 'message': [], 'raw_message': '', 'font': 0, 'sender': {'user_id': 2}})
+
+    async def main():
+        async with FakeOneBot(access_token="secret", latency=0.01) as fake:
+            session = WebSocketCommunication().create(WebSocketEndpoint(fake.url, access_token="secret"), None)
+            async with session:
+                runner = asyncio.create_task(session.run())
+                responses = await asyncio.gather(*(session.send(GetLoginInfoReq()) for _ in range(10)))
+                assert all(response.user_id == 1 for response in responses)
+                await session.quick_operation(event, reply=[], timeout=1)
+                assert fake.api_calls == 11
+            await asyncio.gather(runner, return_exceptions=True)
+    asyncio.run(main())
+
+
+def test_event_sent_times_is_bounded():
+    async def main():
+        async with FakeOneBot(profile=LoadProfile(rate=5000, count=100, weights={GroupMessageEvent: 1000}), max_sent_times=10) as fake:
+            async with websockets.connect(fake.url) as websocket:
+                for _ in range(100):
+                    await asyncio.wait_for(websocket.recv(), 5)
+            assert fake.events_sent == 100 and len(fake.event_sent_times) == 10
+    asyncio.run(main())
+
+
+def test_load_run():
+    async def main():
+        for reverse in (False, True):
+            report = await run_load(LoadProfile(rate=2000, burst=20, count=200), reply_every=5, reverse=reverse, timeout=10)
+            assert report.events_sent == report.events_handled == 200
+            assert report.event_latencies and report.api_round_trips
+            assert report.api_failures == 0
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+import socket
+import time
+
+from onebot11protocol.api.public import GetLoginInfoReq, SendPrivateMsgReq
+from onebot11protocol.communication.http import HTTPCommunication, HTTPConnectionPool, HTTPEndpoint
+from onebot11protocol.communication.ws import BadAPIResponseException
+from onebot11protocol.message.segment import TextData, build_message
+from onebot11protocol.testing.http_api import StandInHTTPAPIServer
+
+
+def test_http_session():
+    async def main():
+        async with StandInHTTPAPIServer(access_token="secret") as server:
+            communication = HTTPCommunication(pool=HTTPConnectionPool(max_connections=2))
+            session = communication.create(HTTPEndpoint(server.url, access_token="secret", pipeline_depth=4), None)
+            logins = await asyncio.gather(*(session.send(GetLoginInfoReq()) for _ in range(50)))
+            assert all(login.user_id == 10000 for login in logins)
+            sent = await asyncio.gather(*(session.send(SendPrivateMsgReq(user_id=1, message=build_message(TextData(text="hi"))))
+                                          for _ in range(20)))
+            assert all(response.message_id == 1 for response in sent)
+            assert server.connection_count <= 2 and server.request_count == 70
+
+            badSession = communication.create(HTTPEndpoint(server.url, access_token="wrong"), None)
+            with pytest.raises(BadAPIResponseException) as e:
+                await badSession.send(GetLoginInfoReq())
+            assert e.value.response["retcode"] == 1403
+            await session.pool.close()
+    asyncio.run(main())
+
+
+def test_http_pool_recovers_after_timeout():
+    async def main():
+        async with StandInHTTPAPIServer(latency=1) as server:
+            communication = HTTPCommunication(pool=HTTPConnectionPool(max_connections=1))
+            session = communication.create(HTTPEndpoint(server.url), None)
+            with pytest.raises(TimeoutError):
+                await session.send(SendPrivateMsgReq(user_id=1, message=build_message(TextData(text="hi"))), timeout=0.1)
+            # 超时的请求所在的连接被放弃，后续请求不必等待它的响应
+            server.latency = 0
+            login = await session.send(GetLoginInfoReq(), timeout=0.5)
+            assert login.user_id == 10000 and server.connection_count == 2
+            await session.pool.close()
+    asyncio.run(main())
+
+
+def test_http_pool_refused_host():
+    async def main():
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        communication = HTTPCommunication(pool=HTTPConnectionPool(max_connections=1))
+        session = communication.create(HTTPEndpoint(f"http://127.0.0.1:{port}"), None)
+        start = time.perf_counter()
+        # 等待连接的请求在连接失败后立即重试，而不是等到超时
+        results = await asyncio.gather(*(session.send(GetLoginInfoReq(), timeout=3) for _ in range(2)), return_exceptions=True)
+        assert all(isinstance(result, ConnectionError) for result in results)
+        assert time.perf_counter() - start < 1
+        await session.pool.close()
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+import asyncio
+import hashlib
+import hmac
+import json
+from typing import Optional
+
+from onebot11protocol.communication.base import EventHandler
+from onebot11protocol.communication.http_post import HTTPPostEndpoint, HTTPPostReceiver
+from onebot11protocol.event.message import GroupMessageEventQuickOperation
+from onebot11protocol.message.segment import TextData, build_message
+
+
+class ReplyHandler(EventHandler):
+    async def on_event(self, session, event):
+        if event.post_type == "message":
+            return GroupMessageEventQuickOperation(reply=build_message(TextData(text="pong")), at_sender=False)
+
+
+async def _post(port: int, body: bytes, signature: str, contentLength: Optional[int | str] = None) -> tuple[int, bytes]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"POST / HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\nX-Signature: {signature}\r\n"
+                 f"Content-Length: {len(body) if contentLength is None else contentLength}\r\nConnection: close\r\n\r\n".encode() + body)
+    response = await reader.read()
+    writer.close()
+    head, _, responseBody = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), responseBody
+
+
+def test_http_post():
+    body = json.dumps({"time": 0, "self_id": 1, "post_type": "message", "message_type": "group", "sub_type": "normal", "message_id": 1,
+                       "group_id": 2, "user_id": 3, "message": [{"type": "text", "data": {"text": "ping"}}], "raw_message": "ping",
+                       "font": 0, "sender": {"user_id": 3}}).encode()
+    signature = "sha1=" + hmac.new(b"secret", body, hashlib.sha1).hexdigest()
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        async with HTTPPostReceiver(loop, HTTPPostEndpoint(port=0, secret="secret"), ReplyHandler()) as receiver:
+            status, responseBody = await _post(receiver.port, body, signature)
+            assert status == 200
+            assert json.loads(responseBody) == {"reply": [{"type": "text", "data": {"text": "pong"}}], "at_sender": False}
+            status, _ = await _post(receiver.port, body, "sha1=0000")
+            assert status == 403 and receiver.signature_failures == 1
+    asyncio.run(main())
+
+
+def test_http_post_body_limits():
+    async def main():
+        loop = asyncio.get_running_loop()
+        async with HTTPPostReceiver(loop, HTTPPostEndpoint(port=0, secret="secret"), ReplyHandler(), max_body_size=1024) as receiver:
+            # 过大的请求在读取请求体之前被拒绝
+            status, _ = await _post(receiver.port, b"", "sha1=0000", contentLength=1 << 30)
+            assert status == 413
+            for contentLength in (-1, "abc", "1_0"):
+                status, _ = await _post(receiver.port, b"", "sha1=0000", contentLength=contentLength)
+                assert status == 400
+            assert receiver.signature_failures == 0
+    asyncio.run(main())
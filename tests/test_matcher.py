@@ -0,0 +1,53 @@
+import asyncio
+from pydantic import TypeAdapter
+
+from onebot11protocol.communication.matcher import CommandMatcher
+from onebot11protocol.event import Event
+from onebot11protocol.message import CompactSegment
+
+
+async def _noop(session, event, match):
+    pass
+
+
+def test_matcher():
+    matcher = CommandMatcher()
+    echo = matcher.add_prefix("/echo", _noop)
+    ec = matcher.add_prefix("/ec", _noop)
+    hello = matcher.add_keyword("hello", _noop)
+    hell = matcher.add_keyword("hell", _noop)
+    lo = matcher.add_keyword("lo w", _noop)
+    roll = matcher.add_regex(r"roll (\d+)d(\d+)", _noop)
+    anchored = matcher.add_regex(r"^\s*/", _noop)
+
+    matches = matcher.match("  /echo  say hello world, roll 2d6")
+    assert [match.rule for match in matches] == [echo, ec, hello, hell, lo, roll, anchored]
+    assert matches[0].argument == "say hello world, roll 2d6" and matches[1].argument == "ho  say hello world, roll 2d6"
+    assert matches[2].position == 13 and matches[4].position == 16
+    assert matches[5].match.groups() == ("2", "6")
+
+    assert [match.rule for match in matcher.match("roll xd6 hello")] == [hello, hell]
+
+    matcher.remove(hello)
+    matcher.remove(ec)
+    matcher.remove(roll)
+    assert [match.rule for match in matcher.match("/echo hello roll 1d2")] == [echo, hell, anchored]
+    assert matcher.match([CompactSegment("at", {"qq": "1"}), CompactSegment("text", {"text": "hell"})])[0].rule is hell
+    matcher.remove(hell)
+    matcher.remove(lo)
+    assert not matcher.automaton.root.children
+
+
+def test_matcher_handler():
+    matcher = CommandMatcher()
+    arguments = []
+
+    async def echo(session, event, match):
+        arguments.append(match.argument)
+    matcher.add_prefix("/echo", echo)
+
+    event = TypeAdapter(Event).validate_python({
+        'time': 1, 'self_id': 1, 'post_type': 'message', 'message_type': 'private', 'sub_type': 'friend', 'message_id': 1, 'user_id': 2,
+        'message': '[CQ:face,id=1]/echo a [CQ:face,id=2]b', 'raw_message': '', 'font': 0, 'sender': {}})
+    asyncio.run(matcher.on_event(None, event))
+    assert arguments == ["a b"]
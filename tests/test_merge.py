@@ -0,0 +1,47 @@
+import asyncio
+
+from onebot11protocol.api.public import GetLoginInfoReq, SendGroupMsgReq
+from onebot11protocol.communication.merge import MessageMergingSession
+from onebot11protocol.message import CompactSegment
+from onebot11protocol.message.segment import NodeSegment
+
+from .fakes import FakeSession
+
+
+RESPONSES = {'get_login_info': {'user_id': 10000, 'nickname': 'bot'},
+             'send_group_msg': lambda _, index: {'message_id': index}}
+
+
+def _text(group, text):
+    return SendGroupMsgReq(group_id=group, message=[CompactSegment('text', {'text': text})])
+
+
+def test_merge():
+    async def main():
+        inner = FakeSession(RESPONSES)
+        session = MessageMergingSession(inner, window=0.1, max_length=20)
+
+        # 第一条立即发出，随后的两条合并
+        responses = await asyncio.gather(session.send(_text(1, 'a')), session.send(_text(1, 'b')), session.send(_text(1, 'c')),
+                                         session.send(_text(2, 'd')))
+        assert [response.message_id for response in responses] == [1, 3, 3, 2]
+        assert [segment.data.text for segment in inner.requests[2].message] == ['b', '\n', 'c']
+        assert session.merged == 1
+
+        # 含有不可合并消息段的消息单独发送，并排在之前的消息后面
+        reply = SendGroupMsgReq(group_id=1, message=[CompactSegment('reply', {'id': '1'}), CompactSegment('text', {'text': 'e'})])
+        await asyncio.gather(session.send(_text(1, 'x')), session.send(reply))
+        assert inner.requests[-1] is reply and inner.requests[-2].message[0].data.text == 'x'
+
+        # 过长时以合并转发发送
+        inner.requests.clear()
+        await asyncio.gather(*(session.send(_text(1, 'long text ' * 2)) for _ in range(3)))
+        message = inner.requests[-1].message
+        assert isinstance(inner.requests[-2], GetLoginInfoReq) and session.forwarded == 1
+        assert len(message) == 3 and all(isinstance(segment, NodeSegment) and segment.data.user_id == '10000' for segment in message)
+
+        # 超过 window 的发送记录被清除
+        await asyncio.sleep(0.1)
+        await session.send(_text(3, 'f'))
+        assert len(session.last_sent) == 1
+    asyncio.run(main())
@@ -0,0 +1,131 @@
+import asyncio
+
+from onebot11protocol.api.public import GetLoginInfoReq, GetMsgReq, SendGroupMsgReq
+from onebot11protocol.communication.base import EventHandler
+from onebot11protocol.communication.dispatch import EventDispatcher
+from onebot11protocol.communication.metrics import MetricsRegistry, MetricsServer, ProtocolMetrics
+from onebot11protocol.communication.scheduler import RateLimit, ScheduledSession
+from onebot11protocol.communication.ws import BadAPIResponseException, WebSocketCommunication, WebSocketEndpoint
+from onebot11protocol.event.message import GroupMessageEvent
+from onebot11protocol.testing.fake_onebot import FakeOneBot, LoadProfile
+from onebot11protocol.testing.samples import sample_model
+
+from .fakes import FakeSession
+
+
+def test_prometheus_export():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("action",))
+    requests.inc(("get_msg",))
+    requests.inc(("get_msg",), 2)
+    requests.inc(("say \"hi\"\n",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 5):
+        latency.observe(value)
+    registry.gauge("depth", "Depth", callback=lambda: 7)
+
+    text = registry.to_prometheus()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{action="get_msg"} 3' in text
+    assert 'requests_total{action="say \\"hi\\"\\n"} 1' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 3' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in text
+    assert "latency_seconds_count 4" in text
+    assert "depth 7" in text
+    # 同名指标的 callback 相加
+    registry.gauge("depth", "Depth", callback=lambda: 3)
+    assert "depth 10" in registry.to_prometheus()
+
+    snapshot = registry.snapshot()
+    histogram = snapshot["latency_seconds"]["samples"][0]["value"]
+    assert histogram["count"] == 4 and 0.1 < histogram["p50"] <= 1
+    assert snapshot["requests_total"]["samples"][0] == {"labels": {"action": "get_msg"}, "value": 3}
+
+
+class _Handler(EventHandler):
+    def __init__(self) -> None:
+        self.count = 0
+
+    async def on_event(self, session, event):
+        self.count += 1
+
+
+def test_session_metrics():
+    async def main():
+        metrics = ProtocolMetrics()
+        handler = _Handler()
+        profile = LoadProfile(rate=5000, burst=50, count=100)
+        async with FakeOneBot(profile=profile, api_data={"get_login_info": {"user_id": 1, "nickname": "bot"}}) as fake:
+            session = WebSocketCommunication(metrics=metrics).create(WebSocketEndpoint(fake.url), handler)
+            async with session:
+                runner = asyncio.create_task(session.run())
+                await asyncio.gather(*(session.send(GetLoginInfoReq()) for _ in range(5)))
+                try:
+                    await session.send(GetMsgReq(message_id=1))
+                except BadAPIResponseException:
+                    pass
+                await fake.events_finished.wait()
+                while handler.count < 100:
+                    await asyncio.sleep(0.01)
+            await asyncio.gather(runner, return_exceptions=True)
+
+        snapshot = metrics.registry.snapshot()
+        events = sum(sample["value"] for sample in snapshot["onebot_events_total"]["samples"])
+        assert events == 100
+        assert {sample["labels"]["post_type"] for sample in snapshot["onebot_events_total"]["samples"]} >= {"message", "notice"}
+        latencies = {sample["labels"]["action"]: sample["value"]["count"] for sample in snapshot["onebot_api_latency_seconds"]["samples"]}
+        assert latencies == {"get_login_info": 5, "get_msg": 1}
+        assert snapshot["onebot_api_failures_total"]["samples"] == [{"labels": {"action": "get_msg", "reason": "retcode"}, "value": 1}]
+        assert snapshot["onebot_api_in_flight"]["samples"][0]["value"] == 0
+        handled = sum(sample["value"]["count"] for sample in snapshot["onebot_handler_duration_seconds"]["samples"])
+        assert handled == 100
+        decoded = sum(sample["value"]["count"] for sample in snapshot["onebot_event_decode_seconds"]["samples"])
+        assert decoded == 100
+
+        async with MetricsServer(metrics.registry, port=0) as server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+        assert response.startswith(b"HTTP/1.1 200 OK")
+        assert b'onebot_api_latency_seconds_count{action="get_login_info"} 5' in response
+    asyncio.run(main())
+
+
+class _BlockingHandler(EventHandler):
+    def __init__(self) -> None:
+        self.release = asyncio.Event()
+
+    async def on_event(self, session, event):
+        await self.release.wait()
+
+
+def test_shared_queue_depth_gauges():
+    async def main():
+        metrics = ProtocolMetrics()
+        handler = _BlockingHandler()
+        event = GroupMessageEvent.model_validate(sample_model(GroupMessageEvent))
+        dispatchers = [EventDispatcher(worker_count=1, metrics=metrics) for _ in range(2)]
+        for dispatcher, count in zip(dispatchers, (3, 2)):
+            for _ in range(count):
+                await dispatcher.submit(None, handler, event)
+        schedulers = [ScheduledSession(FakeSession(), account_limit=None, target_limit=RateLimit(rate=0.01, burst=1), metrics=metrics)
+                      for _ in range(2)]
+        pending = [asyncio.create_task(scheduler.send(SendGroupMsgReq(group_id=1, message=[])))
+                   for scheduler in schedulers for _ in range(2)]
+        await asyncio.sleep(0.01)
+
+        # 每个 dispatcher 的 worker 取走一个事件，每个 scheduler 发出一个请求
+        snapshot = metrics.registry.snapshot()
+        assert snapshot["onebot_dispatch_queue_depth"]["samples"][0]["value"] == 3
+        assert snapshot["onebot_scheduler_queue_depth"]["samples"][0]["value"] == 2
+
+        handler.release.set()
+        for dispatcher in dispatchers:
+            await dispatcher.join()
+            await dispatcher.stop()
+        for scheduler in schedulers:
+            await scheduler.disconnect()
+        await asyncio.gather(*pending, return_exceptions=True)
+    asyncio.run(main())
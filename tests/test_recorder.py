@@ -0,0 +1,64 @@
+import asyncio
+import json
+import os
+
+from onebot11protocol.communication.base import EventHandler
+from onebot11protocol.communication.recorder import FrameRecorder, FrameReplayer, read_segment, segment_paths
+from onebot11protocol.communication.ws import WebSocketCommunication, WebSocketEndpoint
+from onebot11protocol.testing.fake_onebot import FakeOneBot, LoadProfile
+
+
+class CountingHandler(EventHandler):
+    def __init__(self) -> None:
+        self.message_ids: list[int] = []
+
+    async def on_event(self, session, event):
+        self.message_ids.append(getattr(event, "message_id", 0))
+
+
+def test_segments_and_partial_block(tmp_path):
+    frames = [json.dumps({"echo": str(i), "data": "x" * 100}) for i in range(500)]
+    with FrameRecorder(str(tmp_path), segment_size=4096, block_size=2048) as recorder:
+        for frame in frames:
+            recorder.record(frame)
+    paths = segment_paths(str(tmp_path))
+    assert len(paths) > 1
+    assert [frame.decode() for path in paths for _, frame in read_segment(path)] == frames
+
+    # 追加写入新的分段，末尾被截断的块被忽略
+    with FrameRecorder(str(tmp_path)) as recorder:
+        recorder.record(b"tail")
+    last = segment_paths(str(tmp_path))[-1]
+    assert last not in paths
+    with open(last, "ab") as file:
+        file.write(b"OBF1\xff\xff\x00\x00")
+    replayed = [frame for _, frame in FrameReplayer(str(tmp_path)).frames()]
+    assert len(replayed) == 501 and replayed[-1] == b"tail"
+
+
+def test_record_and_replay(tmp_path):
+    async def main():
+        recorder = FrameRecorder(str(tmp_path), block_size=4096)
+        live = CountingHandler()
+        async with FakeOneBot(profile=LoadProfile(rate=1000, count=200), seed=3) as fake:
+            session = WebSocketCommunication(recorder=recorder).create(WebSocketEndpoint(fake.url), live)
+            async with session:
+                runner = asyncio.create_task(session.run())
+                while len(live.message_ids) < 200:
+                    await asyncio.sleep(0.01)
+            await asyncio.gather(runner, return_exceptions=True)
+        await recorder.aclose()
+        assert recorder.frames == 200 and recorder.timer is None and recorder.file is None and os.listdir(tmp_path)
+
+        replayer = FrameReplayer(str(tmp_path))
+        fast = CountingHandler()
+        stats = await replayer.replay(fast, speed=None)
+        assert stats.events == 200 and stats.invalid == 0
+        assert sorted(fast.message_ids) == sorted(live.message_ids)
+
+        timed = CountingHandler()
+        stats = await replayer.replay(timed, speed=4)
+        assert stats.events == 200
+        # 录制约 0.2 秒，4 倍速约 0.05 秒
+        assert 0.03 < stats.duration < 0.5
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+import asyncio
+import json
+import pytest
+import websockets
+
+from onebot11protocol.api.public import SendGroupMsgReq
+from onebot11protocol.communication.base import EventHandler
+from onebot11protocol.communication.reverse_ws import ReverseWebSocketCommunication, ReverseWebSocketEndpoint
+from onebot11protocol.communication.ws import ReconnectPolicy
+from onebot11protocol.message.segment import TextData, build_message
+
+
+class EchoHandler(EventHandler):
+    def __init__(self) -> None:
+        self.replies: list[tuple[int, int]] = []
+
+    async def on_event(self, session, event):
+        response = await session.send(SendGroupMsgReq(group_id=event.group_id, message=build_message(TextData(text="pong"))))
+        self.replies.append((session.self_id, response.message_id))
+
+
+async def _implementation(port: int, selfId: int, token: str):
+    headers = {"X-Self-ID": str(selfId), "X-Client-Role": "Universal", "Authorization": f"Bearer {token}"}
+    async with websockets.connect(f"ws://127.0.0.1:{port}", additional_headers=headers) as websocket:
+        await websocket.send(json.dumps({"time": 0, "self_id": selfId, "post_type": "notice", "notice_type": "group_recall",
+                                         "group_id": 1, "user_id": 2, "operator_id": 2, "message_id": 3}))
+        request = json.loads(await websocket.recv())
+        assert request["action"] == "send_group_msg"
+        await websocket.send(json.dumps({"status": "ok", "retcode": 0, "data": {"message_id": selfId * 10}, "echo": request["echo"]}))
+        await asyncio.sleep(0.05)
+
+
+def test_reverse_ws():
+    async def main():
+        handler = EchoHandler()
+        server = ReverseWebSocketCommunication().create(ReverseWebSocketEndpoint(port=0, access_token="secret"), handler)
+        async with server:
+            await asyncio.gather(*(_implementation(server.port, selfId, "secret") for selfId in (1, 2, 3)))
+            with pytest.raises(websockets.InvalidStatus):
+                await _implementation(server.port, 4, "wrong")
+        assert sorted(handler.replies) == [(1, 10), (2, 20), (3, 30)]
+        assert sorted(server.sessions) == [1, 2, 3]
+    asyncio.run(main())
+
+
+def test_reverse_ws_rejects_reconnect_policy():
+    async def main():
+        with pytest.raises(ValueError):
+            ReverseWebSocketCommunication(reconnect_policy=ReconnectPolicy()).create(ReverseWebSocketEndpoint(port=0), EchoHandler())
+    asyncio.run(main())
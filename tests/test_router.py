@@ -0,0 +1,53 @@
+import asyncio
+from pydantic import TypeAdapter
+
+from onebot11protocol.communication.router import EventRouter
+from onebot11protocol.event import Event
+
+
+def _event(**fields):
+    return TypeAdapter(Event).validate_python({'time': 1, 'self_id': 1, **fields})
+
+
+GROUP_MESSAGE = _event(post_type='message', message_type='group', sub_type='normal', message_id=1, group_id=10, user_id=20,
+                       message=[], raw_message='', font=0, sender={})
+POKE = _event(post_type='notice', notice_type='notify', sub_type='poke', group_id=11, user_id=20, target_id=1)
+HEARTBEAT = _event(post_type='meta_event', meta_event_type='heartbeat', status={'online': True, 'good': True}, interval=5000)
+
+
+def test_router():
+    router = EventRouter()
+    calls = []
+
+    def record(name, result=None):
+        async def handler(session, event):
+            calls.append(name)
+            return result
+        return handler
+
+    router.add(record('any'))
+    router.add(record('message', 'reply'), 'message')
+    router.add(record('group 10', 'later'), 'message', 'group', group_ids=[10])
+    router.add(record('group 11'), 'message', 'group', group_ids=[11])
+    router.add(record('user 20 in group 10'), 'message', group_ids=[10], user_ids=[20])
+    router.add(record('user 21 in group 10'), 'message', group_ids=[10], user_ids=[21])
+    poke = router.add(record('poke'), 'notice', 'notify', 'poke')
+    router.add(record('user 20'), user_ids=[20])
+
+    @router.on('message', 'private')
+    async def private(session, event):
+        calls.append('private')
+
+    async def failing(session, event):
+        raise RuntimeError('boom')
+    router.add(failing, 'meta_event', 'heartbeat')
+
+    assert asyncio.run(router.on_event(None, GROUP_MESSAGE)) == 'reply'
+    assert calls == ['any', 'message', 'group 10', 'user 20 in group 10', 'user 20']
+
+    calls.clear()
+    asyncio.run(router.on_event(None, POKE))
+    router.remove(poke)
+    asyncio.run(router.on_event(None, POKE))
+    asyncio.run(router.on_event(None, HEARTBEAT))
+    assert calls == ['any', 'poke', 'user 20', 'any', 'user 20', 'any']
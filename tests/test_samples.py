@@ -0,0 +1,12 @@
+from pydantic import TypeAdapter
+
+from onebot11protocol.event import Event
+from onebot11protocol.testing.samples import event_types, sample_events
+
+
+def test_sample_events():
+    adapter = TypeAdapter(Event)
+    samples = sample_events()
+    assert set(samples) == set(event_types()) and len(samples) > 10
+    for eventType, sample in samples.items():
+        assert type(adapter.validate_python(sample)) is eventType
@@ -0,0 +1,80 @@
+import asyncio
+
+from onebot11protocol.api.public import DeleteMsgReq, GetGroupInfoReq, GetStatusReq, SendGroupMsgReq, SendLikeReq
+from onebot11protocol.communication.metrics import ProtocolMetrics
+from onebot11protocol.communication.scheduler import HIGH_PRIORITY, NORMAL_PRIORITY, RateLimit, ScheduledSession
+from onebot11protocol.event.message import GroupMessageEvent
+
+from .fakes import FakeSession
+
+
+RESPONSES = {'send_group_msg': {'message_id': 1}, 'get_status': {'online': True, 'good': True}}
+
+
+def test_scheduler():
+    async def main():
+        inner = FakeSession(RESPONSES)
+        session = ScheduledSession(inner, account_limit=RateLimit(rate=1000, burst=1000), target_limit=RateLimit(rate=50, burst=2),
+                                   action_limits={"send_like": RateLimit(rate=1, burst=1)})
+        # 群 1 的大量消息不会阻塞群 2、3
+        flood = [session.send(SendGroupMsgReq(group_id=1, message=[])) for _ in range(6)]
+        others = [session.send(SendGroupMsgReq(group_id=group, message=[])) for group in (2, 3)]
+        reads = [session.send(GetStatusReq()) for _ in range(5)]
+        await asyncio.gather(*flood, *others, *reads)
+        order = [getattr(request, 'group_id', None) for request in inner.requests]
+        assert order.index(3) < 4 and order.count(None) == 5
+        assert session.latency[NORMAL_PRIORITY].count == 13 and session.latency[NORMAL_PRIORITY].max > 0.05
+
+        inner.requests.clear()
+        await session.send(SendLikeReq(user_id=1))
+        like = asyncio.create_task(session.send(SendLikeReq(user_id=2)))
+        await asyncio.sleep(0.05)
+        assert not like.done()
+        await session.send(DeleteMsgReq(message_id=1))
+        assert session.priority_of("delete_msg") == HIGH_PRIORITY
+        await session.disconnect()
+        assert isinstance(await asyncio.gather(like, return_exceptions=True), list) and like.exception() is not None
+        assert len(inner.requests) == 2
+    asyncio.run(main())
+
+
+def test_scheduler_bypass_and_quick_operation():
+    event = GroupMessageEvent.model_validate({
+        'time': 1, 'self_id': 1, 'post_type': 'message', 'message_type': 'group', 'sub_type': 'normal', 'message_id': 1,
+        'group_id': 1, 'user_id': 2, 'message': [], 'raw_message': '', 'font': 0, 'sender': {'user_id': 2}})
+
+    async def main():
+        inner = FakeSession(RESPONSES)
+        metrics = ProtocolMetrics()
+        session = ScheduledSession(inner, account_limit=None, target_limit=RateLimit(rate=0.01, burst=1), metrics=metrics)
+        await session.send(SendGroupMsgReq(group_id=1, message=[]))
+        # 群 1 的令牌已耗尽，快速操作同样要等待令牌
+        throttled = [asyncio.create_task(session.quick_operation(event, reply=[])),
+                     asyncio.create_task(session.send(SendGroupMsgReq(group_id=1, message=[])))]
+        await asyncio.sleep(0)
+        # 只读请求越过等待令牌的请求
+        await asyncio.wait_for(session.send(GetGroupInfoReq(group_id=1)), 1)
+        assert not any(task.done() for task in throttled) and session.queue_depth == 2
+        snapshot = metrics.registry.snapshot()
+        assert snapshot["onebot_scheduler_queue_depth"]["samples"][0]["value"] == 2
+        assert sum(sample["value"]["count"] for sample in snapshot["onebot_scheduler_wait_seconds"]["samples"]) == 2
+        await session.disconnect()
+        await asyncio.gather(*throttled, return_exceptions=True)
+        assert len(inner.requests) == 2 and not inner.quick_operations
+    asyncio.run(main())
+
+
+def test_scheduler_prunes_idle_buckets():
+    async def main():
+        session = ScheduledSession(FakeSession(RESPONSES), account_limit=None, target_limit=RateLimit(rate=100, burst=1),
+                                   action_limits={"send_like": RateLimit(rate=100, burst=1)})
+        await asyncio.gather(*(session.send(SendGroupMsgReq(group_id=group, message=[])) for group in range(50)))
+        await session.send(SendLikeReq(user_id=1))
+        assert len(session.target_buckets) == 51 and len(session.action_buckets) == 1
+        # 补满后的桶在下一次调度时被丢弃
+        session.sweep_interval = 0
+        await asyncio.sleep(0.02)
+        await session.send(GetStatusReq())
+        assert not session.target_buckets and not session.action_buckets
+        await session.disconnect()
+    asyncio.run(main())
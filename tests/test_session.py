@@ -0,0 +1,151 @@
+import asyncio
+import json
+import pytest
+import websockets
+
+from onebot11protocol.api.public import GetLoginInfoReq, GetMsgReq, GetStatusReq, SendGroupMsgReq
+from onebot11protocol.communication.base import EventHandler
+from onebot11protocol.communication.decoder import EventDecoder
+from onebot11protocol.communication.ws import ReconnectPolicy, WebSocketCommunication, WebSocketEndpoint
+from onebot11protocol.message import CompactSegment
+from onebot11protocol.message.segment import TextData, build_message
+
+
+QUICK_OPERATIONS = []
+
+
+class NullHandler(EventHandler):
+    async def on_event(self, session, event):
+        pass
+
+
+async def _serve_api(websocket):
+    async for data in websocket:
+        request = json.loads(data)
+        if request["action"] == "get_status":
+            # 模拟不响应的实现
+            continue
+        if request["action"] == "get_login_info":
+            responseData = {"user_id": 10000, "nickname": "bot"}
+        elif request["action"] == "get_msg":
+            # 部分实现返回完整的事件，data 中带有 post_type
+            responseData = {"time": 1, "self_id": 1, "post_type": "message", "message_type": "private", "sub_type": "friend",
+                            "message_id": request["params"]["message_id"], "real_id": 1, "user_id": 2,
+                            "message": [], "raw_message": "", "font": 0, "sender": {"user_id": 2}}
+        elif request["action"] == ".handle_quick_operation":
+            QUICK_OPERATIONS.append(request["params"])
+            responseData = None
+        else:
+            responseData = {"message_id": int(request["echo"])}
+        await websocket.send(json.dumps({"status": "ok", "retcode": 0, "data": responseData, "echo": request["echo"]}))
+
+
+def test_session_round_trip():
+    async def main():
+        async with websockets.serve(_serve_api, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            session = WebSocketCommunication().create(WebSocketEndpoint(f"ws://127.0.0.1:{port}"), NullHandler())
+            async with session:
+                runner = asyncio.create_task(session.run())
+                await asyncio.sleep(0)
+                login = await session.send(GetLoginInfoReq())
+                assert login.user_id == 10000
+                message = await session.send(GetMsgReq(message_id=7), timeout=1)
+                assert message.root.message_id == 7
+                responses = await asyncio.gather(*(session.send(SendGroupMsgReq(group_id=1, message=build_message(TextData(text=str(i)))))
+                                                   for i in range(100)))
+                assert sorted(response.message_id for response in responses) == list(range(2, 102))
+                assert session.writer.batches < session.writer.frames
+            await asyncio.gather(runner, return_exceptions=True)
+    asyncio.run(main())
+
+
+def test_quick_operation():
+    frame = {'time': 1, 'self_id': 1, 'post_type': 'message', 'message_type': 'group', 'sub_type': 'normal', 'message_id': 5, 'group_id': 3,
+             'user_id': 2, 'anonymous': None, 'message': [{'type': 'text', 'data': {'text': 'x' * 1000}}], 'raw_message': 'x' * 1000, 'font': 0,
+             'sender': {'user_id': 2, 'nickname': 'a'}}
+    event = EventDecoder(lazy=True).decode(json.dumps(frame))
+
+    async def main():
+        async with websockets.serve(_serve_api, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            session = WebSocketCommunication().create(WebSocketEndpoint(f"ws://127.0.0.1:{port}"), NullHandler())
+            async with session:
+                runner = asyncio.create_task(session.run())
+                await asyncio.sleep(0)
+                await session.quick_operation(event, reply=[CompactSegment("text", {"text": "hi"})], at_sender=False)
+                await session.quick_operation(event, reply=[CompactSegment("text", {"text": "hi"})], at_sender=True)
+                assert session.orphan_responses == 0
+            await asyncio.gather(runner, return_exceptions=True)
+    asyncio.run(main())
+
+    context = {"time": 1, "self_id": 1, "post_type": "message", "message_type": "group", "sub_type": "normal",
+               "message_id": 5, "group_id": 3, "user_id": 2, "sender": {"user_id": 2}}
+    assert QUICK_OPERATIONS[-2:] == [
+        {"context": context, "operation": {"reply": [{"type": "text", "data": {"text": "hi"}}], "at_sender": False}},
+        # at_sender 时实现从 context.sender.user_id 取得被 at 的用户
+        {"context": context, "operation": {"reply": [{"type": "text", "data": {"text": "hi"}}], "at_sender": True}},
+    ]
+    assert not event._lazy_values
+
+
+def test_session_timeout():
+    async def main():
+        async with websockets.serve(_serve_api, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            session = WebSocketCommunication().create(WebSocketEndpoint(f"ws://127.0.0.1:{port}"), NullHandler())
+            session.action_timeouts["get_status"] = 0.05
+            async with session:
+                runner = asyncio.create_task(session.run())
+                await asyncio.sleep(0)
+                with pytest.raises(TimeoutError):
+                    await session.send(GetStatusReq())
+                assert session.timeouts == 1 and not session.waiting_api_map
+                pending = asyncio.create_task(session.send(GetStatusReq(), timeout=10))
+                await asyncio.sleep(0.05)
+            with pytest.raises(ConnectionError):
+                await pending
+            assert not session.waiting_api_map
+            await asyncio.gather(runner, return_exceptions=True)
+    asyncio.run(main())
+
+
+class LifecycleHandler(NullHandler):
+    def __init__(self) -> None:
+        self.lifecycle: list[str] = []
+
+    async def on_disconnected(self, session, exception):
+        self.lifecycle.append("disconnected")
+
+    async def on_reconnected(self, session):
+        self.lifecycle.append("reconnected")
+
+
+def test_session_reconnect():
+    connections = []
+
+    async def flaky(websocket):
+        connections.append(websocket)
+        if len(connections) == 1:
+            # 第一个连接收到请求后直接断开
+            await websocket.recv()
+            await websocket.close()
+            return
+        await _serve_api(websocket)
+
+    async def main():
+        async with websockets.serve(flaky, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            handler = LifecycleHandler()
+            communication = WebSocketCommunication(reconnect_policy=ReconnectPolicy(initial_delay=0.01))
+            session = communication.create(WebSocketEndpoint(f"ws://127.0.0.1:{port}"), handler)
+            async with session:
+                runner = asyncio.create_task(session.run())
+                await asyncio.sleep(0)
+                login = await session.send(GetLoginInfoReq())
+                assert login.user_id == 10000
+                assert handler.lifecycle == ["disconnected", "reconnected"]
+                assert not session.waiting_api_map and not session.retry_frames
+            await runner
+            assert len(connections) == 2
+    asyncio.run(main())
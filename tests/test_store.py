@@ -0,0 +1,97 @@
+import asyncio
+
+from onebot11protocol.api.public import GetForwardMsgReq, GetLoginInfoReq, GetMsgReq
+from onebot11protocol.communication.base import EventHandler
+from onebot11protocol.communication.store import MessageStore, MessageStoreSession
+from onebot11protocol.event.message import GroupMessageEvent, PrivateMessageEvent
+from onebot11protocol.event.notice import GroupRecallNoticeEvent
+from onebot11protocol.message.segment import ReplyData, TextData, build_message
+from onebot11protocol.testing.samples import sample_model
+
+from .fakes import FakeSession
+
+
+def _group_message(messageId: int, text: str) -> GroupMessageEvent:
+    data = sample_model(GroupMessageEvent)
+    data.update(message_id=messageId, group_id=1, user_id=2, message=[{"type": "text", "data": {"text": text}}])
+    return GroupMessageEvent.model_validate(data)
+
+
+RESPONSES = {"get_msg": lambda request, _: {**sample_model(PrivateMessageEvent), "real_id": request.message_id,
+                                            "message_id": request.message_id},
+             "get_forward_msg": {"message": [{"type": "text", "data": {"text": "forwarded"}}]},
+             "get_login_info": {"user_id": 1, "nickname": "bot"}}
+
+
+class NullHandler(EventHandler):
+    async def on_event(self, session, event):
+        pass
+
+
+def test_message_store_session():
+    async def main():
+        wire = FakeSession(RESPONSES)
+        session = MessageStoreSession(wire, NullHandler())
+        await session.on_event(wire, _group_message(10, "hello"))
+        response = await session.send(GetMsgReq(message_id=10))
+        assert response.root.message_type == "group" and response.root.message[0].data.text == "hello"
+        reply = await session.get_reply(build_message(ReplyData(id="10"), TextData(text="re")))
+        assert reply.root.message_id == 10
+        assert wire.requests == []
+
+        # 未命中时调用 api 并保存
+        await session.send(GetMsgReq(message_id=20))
+        await session.send(GetMsgReq(message_id=20))
+        await session.send(GetForwardMsgReq(id="abc"))
+        forward = await session.send(GetForwardMsgReq(id="abc"))
+        assert forward.message[0].data.text == "forwarded"
+        await session.send(GetLoginInfoReq())
+        assert [type(request).__name__ for request in wire.requests] == ["GetMsgReq", "GetForwardMsgReq", "GetLoginInfoReq"]
+        assert (session.hits, session.misses) == (4, 2)
+
+        recall = sample_model(GroupRecallNoticeEvent)
+        recall.update(message_id=10)
+        await session.on_event(wire, GroupRecallNoticeEvent.model_validate(recall))
+        assert session.store.is_recalled(10, 1) and not session.store.is_recalled(10, 2)
+        await session.send(GetMsgReq(message_id=10))
+        assert len(wire.requests) == 4
+        # 撤回的消息不再保存
+        await session.on_event(wire, _group_message(10, "hello"))
+        assert await session.store.get_message(10, 1) is None
+
+        # 同一个 store 中其他账号的同号消息互不影响
+        other = _group_message(10, "other account")
+        other.self_id = 2
+        session.store.add_event(other)
+        assert (await session.store.get_message(10, 2)).root.message[0].data.text == "other account"
+        await session.disconnect()
+    asyncio.run(main())
+
+
+def test_sqlite_tier(tmp_path):
+    async def main():
+        path = str(tmp_path / "messages.db")
+        store = MessageStore(max_entries=5, path=path)
+        for messageId in range(20):
+            store.add_event(_group_message(messageId, f"message {messageId}"))
+        assert len(store) == 5 and store.spilled == 15
+        assert (await store.get_message(0, 1)).root.message[0].data.text == "message 0"
+        # 数据库中读到的条目放回内存层
+        assert "msg:1:0" in store.entries and store.spilled == 16
+        assert (await store.get_message(19, 1)).root.message[0].data.text == "message 19"
+        store.recall(3, 1)
+        assert await store.get_message(3, 1) is None
+        session = MessageStoreSession(FakeSession(RESPONSES), NullHandler(), store)
+        await session.disconnect()
+        assert store.executor is None
+
+        reopened = MessageStore(path=path)
+        assert (await reopened.get_message(7, 1)).root.message_id == 7
+        assert await reopened.get_message(3, 1) is None
+        reopened.close()
+
+        bounded = MessageStore(max_bytes=1000)
+        for messageId in range(20):
+            bounded.add_event(_group_message(messageId, "x" * 100))
+        assert bounded.bytes <= 1000 and 0 < len(bounded) < 20
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+import asyncio
+
+from onebot11protocol.api.public import SendGroupMsgReq
+from onebot11protocol.communication.base import EventHandler
+from onebot11protocol.communication.tracing import UNSAMPLED, InMemorySpanExporter, Tracer, current_span, start_child_span, use_span
+from onebot11protocol.communication.ws import WebSocketCommunication, WebSocketEndpoint
+from onebot11protocol.event.message import GroupMessageEvent
+from onebot11protocol.message.segment import TextData, build_message
+from onebot11protocol.testing.fake_onebot import FakeOneBot, LoadProfile
+
+
+class ReplyHandler(EventHandler):
+    def __init__(self) -> None:
+        self.count = 0
+
+    async def on_event(self, session, event):
+        if isinstance(event, GroupMessageEvent):
+            # 处理器创建的任务继承当前 span
+            child = await asyncio.create_task(asyncio.sleep(0, start_child_span("work")))
+            if child is not None:
+                child.end()
+            await session.send(SendGroupMsgReq(group_id=event.group_id, message=build_message(TextData(text="pong"))))
+        self.count += 1
+
+
+async def _run(tracer: Tracer, count: int) -> ReplyHandler:
+    handler = ReplyHandler()
+    profile = LoadProfile(rate=1000, count=count, weights={GroupMessageEvent: 1000})
+    async with FakeOneBot(profile=profile, seed=1) as fake:
+        session = WebSocketCommunication(tracer=tracer).create(WebSocketEndpoint(fake.url), handler)
+        async with session:
+            runner = asyncio.create_task(session.run())
+            while handler.count < count:
+                await asyncio.sleep(0.01)
+        await asyncio.gather(runner, return_exceptions=True)
+    return handler
+
+
+def test_trace_from_frame_to_response():
+    exporter = InMemorySpanExporter()
+    asyncio.run(_run(Tracer(exporter), 3))
+    roots = [span for span in exporter.spans if span.name == "onebot.receive"]
+    assert len(roots) == 3
+    group = next(root for root in roots if root.attributes["event"] == "GroupMessageEvent")
+    spans = {span.name: span for span in exporter.trace(group.trace_id)}
+    assert set(spans) == {"onebot.receive", "onebot.decode", "onebot.handle", "work", "onebot.api"}
+    assert spans["onebot.decode"].parent_id == group.span_id
+    assert spans["onebot.handle"].parent_id == group.span_id
+    assert spans["work"].parent_id == spans["onebot.handle"].span_id
+    api = spans["onebot.api"]
+    assert api.parent_id == spans["onebot.handle"].span_id
+    assert api.attributes["action"] == "send_group_msg" and api.attributes["retcode"] == 0
+    assert [name for name, _, _ in api.events] == ["enqueued", "written", "response_matched"]
+    assert api.error is None and api.duration >= 0
+    assert current_span() is None
+
+
+def test_sampling():
+    exporter = InMemorySpanExporter()
+    asyncio.run(_run(Tracer(exporter, sample_rate=0), 3))
+    assert exporter.spans == []
+
+
+def test_unsampled_trace_is_inherited():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer(exporter, sample_rate=0.5)
+    tracer.random.seed(0)
+    asyncio.run(_run(tracer, 20))
+    roots = [span for span in exporter.spans if span.parent_id is None]
+    # 只有接收事件的 span 是根 span，未被采样的事件中的 api 调用不会单独开始新的 trace
+    assert 0 < len(roots) < 20 and all(root.name == "onebot.receive" for root in roots)
+    assert sum(span.name == "onebot.api" for span in exporter.spans) == len(roots)
+
+    with use_span(UNSAMPLED):
+        assert current_span() is None and start_child_span("work") is None
+        assert Tracer(exporter).start_span("onebot.api", UNSAMPLED) is None